@@ -0,0 +1,171 @@
+"""Primary/replica database routing.
+
+Writes always go to ``default``. Reads are spread over the aliases in
+``DATABASE_READ_REPLICAS`` unless the current request must see its own
+writes: unsafe methods (POST, PUT, DELETE...) read from the primary, and
+after a user writes through ``PostRepository`` or ``CommentRepository``
+their reads stay on the primary for ``DATABASE_PRIMARY_STICKY_SECONDS``.
+
+A request reads from one replica, chosen on its first read, so its queries
+(including those run while a streamed body is sent) see one snapshot.
+
+The pin is kept in the ``DATABASE_STICKY_CACHE_ALIAS`` cache. It only holds
+across worker processes when that alias is a shared backend (Redis,
+Memcached, database cache); with a ``LocMemCache`` each process has its own.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+
+PRIMARY = "default"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_state = contextvars.ContextVar("db_routing", default=None)
+
+
+class RoutingState:
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.user_id = None
+        self.replica = None
+        self._pinned = None
+
+    def use_primary(self):
+        if self.primary:
+            return True
+        if self._pinned is None:
+            self._pinned = self.user_id is not None and _pin_cache().get(
+                _pin_key(self.user_id)) is not None
+        return self._pinned
+
+    def read_alias(self, replicas):
+        if self.use_primary():
+            return PRIMARY
+        if self.replica not in replicas:
+            self.replica = random.choice(replicas)
+        return self.replica
+
+
+def _pin_cache():
+    return caches[getattr(settings, "DATABASE_STICKY_CACHE_ALIAS", "default")]
+
+
+def _pin_key(user_id):
+    return f"db-primary-pin:{user_id}"
+
+
+def set_user(user_id):
+    """Record the authenticated user, whose pin decides where reads go."""
+    state = _state.get()
+    if state is not None and state.user_id != user_id:
+        state.user_id = user_id
+        state._pinned = None
+
+
+def pin_to_primary():
+    """Keep the current user's reads on the primary after a write."""
+    state = _state.get()
+    if state is None:
+        return
+    state.primary = True
+    window = getattr(settings, "DATABASE_PRIMARY_STICKY_SECONDS", 5)
+    if state.user_id is not None and window:
+        _pin_cache().set(_pin_key(state.user_id), True, window)
+
+
+@contextmanager
+def primary_reads():
+    """Send every read inside the block to the primary."""
+    token = _state.set(RoutingState(primary=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "DATABASE_READ_REPLICAS", [])
+        if not replicas:
+            return PRIMARY
+        state = _state.get()
+        if state is None:
+            return random.choice(replicas)
+        return state.read_alias(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+def _routed(chunks, state):
+    # A streamed body is consumed after the middleware returns; route the
+    # queries it runs with the request's state.
+    iterator = iter(chunks)
+    while True:
+        token = _state.set(state)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _state.reset(token)
+        yield chunk
+
+
+async def _arouted(chunks, state):
+    iterator = aiter(chunks)
+    while True:
+        token = _state.set(state)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _state.reset(token)
+        yield chunk
+
+
+def _bind_stream(response, state):
+    if response.streaming:
+        wrap = _arouted if response.is_async else _routed
+        response.streaming_content = wrap(response.streaming_content, state)
+    return response
+
+
+class DatabaseRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(primary=request.method not in SAFE_METHODS)
+        token = _state.set(state)
+        try:
+            return _bind_stream(self.get_response(request), state)
+        finally:
+            _state.reset(token)
+
+    async def __acall__(self, request):
+        state = RoutingState(primary=request.method not in SAFE_METHODS)
+        token = _state.set(state)
+        try:
+            return _bind_stream(await self.get_response(request), state)
+        finally:
+            _state.reset(token)
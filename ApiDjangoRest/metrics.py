@@ -0,0 +1,287 @@
+"""Per-request performance instrumentation.
+
+``PerformanceMetricsMiddleware`` measures, for every DRF view, the SQL
+queries issued (through a database execute wrapper), the time spent in
+authentication, serializers and rendering, and the total view time. The
+numbers are sent back in a ``Server-Timing`` header and aggregated into
+per-route histograms exposed in Prometheus text format by ``MetricsView``.
+
+The DRF hooks and the SQL timer are installed once per process by
+``install_instrumentation()``, from ``PrincipalConfig.ready()``, and only
+when the middleware is listed in ``MIDDLEWARE``.
+"""
+import contextvars
+import functools
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework import serializers
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema, OpenApiResponse
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.phases = {"db": 0.0, "auth": 0.0, "serialize": 0.0, "render": 0.0}
+        self._depth = {}
+
+    def enter(self, phase):
+        depth = self._depth.get(phase, 0)
+        self._depth[phase] = depth + 1
+        return depth == 0
+
+    def exit(self, phase, elapsed, outermost):
+        self._depth[phase] -= 1
+        if outermost:
+            self.phases[phase] += elapsed
+
+
+def timed(phase):
+    """Add the wrapped call's duration to ``phase`` of the current request.
+
+    Nested calls (a serializer rendering another serializer) are only
+    counted once, at the outermost level.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = _current.get()
+            if metrics is None:
+                return func(*args, **kwargs)
+            outermost = metrics.enter(phase)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.exit(phase, time.perf_counter() - start, outermost)
+
+        wrapper.__wrapped_for_metrics__ = True
+        return wrapper
+
+    return decorator
+
+
+def _instrument_property(cls, name, phase):
+    prop = cls.__dict__[name]
+    if getattr(prop.fget, "__wrapped_for_metrics__", False):
+        return
+    setattr(cls, name, property(timed(phase)(prop.fget), prop.fset, prop.fdel, prop.__doc__))
+
+
+def _instrument_method(cls, name, phase):
+    method = cls.__dict__[name]
+    if getattr(method, "__wrapped_for_metrics__", False):
+        return
+    setattr(cls, name, timed(phase)(method))
+
+
+def install_drf_instrumentation():
+    _instrument_property(serializers.Serializer, "data", "serialize")
+    _instrument_property(serializers.ListSerializer, "data", "serialize")
+    _instrument_method(APIView, "perform_authentication", "auth")
+
+
+def _install_sql_timer(connection, **kwargs):
+    if _sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql_timer)
+
+
+def install_sql_timer():
+    """Time the queries of every database connection, present and future.
+
+    Installed on the connections rather than per request: async requests
+    run their queries in sync_to_async threads, on connection objects the
+    middleware never sees. Outside a request the wrapper does nothing.
+    """
+    connection_created.connect(_install_sql_timer, dispatch_uid="metrics-sql-timer")
+    for connection in connections.all(initialized_only=True):
+        _install_sql_timer(connection)
+
+
+def metrics_enabled():
+    return f"{__name__}.PerformanceMetricsMiddleware" in settings.MIDDLEWARE
+
+
+def install_instrumentation():
+    install_drf_instrumentation()
+    install_sql_timer()
+
+
+def _sql_timer(execute, sql, params, many, context):
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.phases["db"] += time.perf_counter() - start
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    metrics = {
+        "http_request_duration_seconds": ("Total view time per route", DURATION_BUCKETS),
+        "http_request_db_duration_seconds": ("SQL time per route", DURATION_BUCKETS),
+        "http_request_db_queries": ("SQL queries per request", QUERY_BUCKETS),
+        "http_request_auth_duration_seconds": ("Authentication time per route", DURATION_BUCKETS),
+        "http_request_serialize_duration_seconds": ("Serializer time per route", DURATION_BUCKETS),
+        "http_request_render_duration_seconds": ("Rendering time per route", DURATION_BUCKETS),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, route, method, total, metrics):
+        values = {
+            "http_request_duration_seconds": total,
+            "http_request_db_duration_seconds": metrics.phases["db"],
+            "http_request_db_queries": metrics.queries,
+            "http_request_auth_duration_seconds": metrics.phases["auth"],
+            "http_request_serialize_duration_seconds": metrics.phases["serialize"],
+            "http_request_render_duration_seconds": metrics.phases["render"],
+        }
+        with self._lock:
+            for name, value in values.items():
+                key = (name, route, method)
+                if key not in self._histograms:
+                    self._histograms[key] = Histogram(self.metrics[name][1])
+                self._histograms[key].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (description, _) in self.metrics.items():
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, route, method), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    labels = f'route="{route}",method="{method}"'
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _drf_route(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, "cls", None)
+    if view_class is None or not issubclass(view_class, APIView):
+        return None
+    return "/" + match.route
+
+
+class PerformanceMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        # The request's metrics reach sync_to_async threads through the
+        # context variable, so their queries are timed by _sql_timer too.
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, time.perf_counter() - start)
+
+    def finish(self, request, response, metrics, total):
+        route = _drf_route(request)
+        if route is None:
+            return response
+        registry.observe(route, request.method, total, metrics)
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={metrics.phases["db"] * 1000:.2f};desc="{metrics.queries} queries"',
+            f'auth;dur={metrics.phases["auth"] * 1000:.2f}',
+            f'serialize;dur={metrics.phases["serialize"] * 1000:.2f}',
+            f'render;dur={metrics.phases["render"] * 1000:.2f}',
+            f"total;dur={total * 1000:.2f}",
+        ])
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; time it with a
+        # post-render callback.
+        metrics = _current.get()
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def record(rendered):
+                metrics.phases["render"] += time.perf_counter() - start
+
+            response.add_post_render_callback(record)
+        return response
+
+
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=["Metrics"],
+        summary="Per-route performance histograms in Prometheus text format",
+        responses={200: OpenApiResponse(description="Prometheus text exposition")},
+    )
+    def get(self, request):
+        return HttpResponse(
+            registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
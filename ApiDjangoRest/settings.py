@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from ApiDjangoRest.sqlite_backend.profiles import sqlite_database
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,7 +49,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -69,9 +72,44 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Embeds a hash of the password in tokens; CachedJWTAuthentication keys
+    # cached users on it so tokens stop working after a password change.
+    'CHECK_REVOKE_TOKEN': True,
+    # Rotated and logged-out refresh tokens go to authentication.revocation
+    # instead of the token_blacklist app.
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.RevocableTokenRefreshSerializer',
+    'TOKEN_OBTAIN_SERIALIZER': 'authentication.serializers.OffloadedTokenObtainPairSerializer',
+}
+
+TOKEN_REVOCATION_FILTER_CAPACITY = 1_000_000
+TOKEN_REVOCATION_FILTER_ERROR_RATE = 0.001
+TOKEN_REVOCATION_SYNC_INTERVAL = 1.0
+TOKEN_REVOCATION_PRUNE_INTERVAL = 3600
+
+# Password hashing runs in a bounded pool; when it is full, login, register
+# and password endpoints answer 503 with Retry-After. 0 workers hashes inline.
+PASSWORD_HASHING_WORKERS = 4
+PASSWORD_HASHING_QUEUE_SIZE = 16
+PASSWORD_HASHING_RETRY_AFTER = 1
+
+# Sliding-window limits for the credential endpoints, per client IP and per
+# submitted username (email for password reset). Over the limit they answer
+# 429 with Retry-After before touching the database or the hashing pool.
+AUTH_THROTTLE_CACHE_ALIAS = 'auth_throttle'
+AUTH_THROTTLE_RATES = {
+    'login': {'ip': '30/min', 'username': '10/min'},
+    'register': {'ip': '10/min', 'username': '5/min'},
+    'password-reset': {'ip': '10/min', 'username': '3/min'},
 }
 
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TIMEOUT = 300
+# Let views with `authenticate_from_claims = True` skip loading the user.
+AUTH_USER_FROM_CLAIMS = False
+
 MIDDLEWARE = [
+    'ApiDjangoRest.metrics.PerformanceMetricsMiddleware',
+    'ApiDjangoRest.db_router.DatabaseRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,13 +143,81 @@ WSGI_APPLICATION = 'ApiDjangoRest.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# `concurrent` turns on WAL, mmap, relaxed fsync, a larger page cache,
+# persistent connections and a serialized write queue with retries (see
+# ApiDjangoRest/sqlite_backend/profiles.py); `stock` is Django's default.
+SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'concurrent')
+
 DATABASES = {
+    'default': sqlite_database(BASE_DIR / 'db.sqlite3', SQLITE_PROFILE),
+}
+
+# Locally, extra SQLite files stand in for read replicas; refresh them from
+# the primary with `python manage.py sync_sqlite_replicas`. Under test they
+# mirror the test database.
+SQLITE_REPLICAS = int(os.environ.get('SQLITE_REPLICAS', 1))
+for i in range(1, SQLITE_REPLICAS + 1):
+    DATABASES[f'replica{i}'] = sqlite_database(
+        BASE_DIR / f'db.replica{i}.sqlite3', SQLITE_PROFILE, TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['ApiDjangoRest.db_router.PrimaryReplicaRouter']
+# Aliases that serve reads, e.g. DATABASE_READ_REPLICAS=replica1,replica2.
+# Empty sends every query to the primary.
+DATABASE_READ_REPLICAS = [
+    alias for alias in os.environ.get('DATABASE_READ_REPLICAS', '').split(',') if alias
+]
+# After a write through the repositories, the user's reads stay on the
+# primary for this many seconds so they see their own changes.
+DATABASE_PRIMARY_STICKY_SECONDS = 5
+# Cache holding those pins. Point it at a shared backend (Redis, Memcached)
+# when running several workers; the local-memory default is per process.
+DATABASE_STICKY_CACHE_ALIAS = 'default'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'post_detail': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'post-detail',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+    # Point this at Redis/Memcached in production so all workers share one budget.
+    'auth_throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth-throttle',
+    },
 }
 
+POST_DETAIL_CACHE_ALIAS = 'post_detail'
+POST_DETAIL_CACHE_TIMEOUT = 300
+# Comments embedded in a post detail; the rest are paged from /api/post/<pk>/comments/.
+POST_DETAIL_EMBEDDED_COMMENTS = 20
+
+# Home timelines (principal/repositories/feed_repository.py). Posts are copied
+# to followers' timelines in batches; authors with this many followers are
+# merged into feeds at read time instead. A new follow backfills that many of
+# the author's latest posts.
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_FANOUT_ON_READ_FOLLOWERS = 10000
+FEED_BACKFILL_POSTS = 50
+
+# Blog read views encode JSON incrementally (ApiDjangoRest/streaming.py): bodies
+# larger than one chunk are streamed, and bodies of at least the gzip minimum
+# are compressed for clients that accept it.
+STREAMING_JSON_CHUNK_SIZE = 64 * 1024
+STREAMING_JSON_GZIP_MIN_BYTES = 1024
+
+# Render principal read endpoints from values() rows instead of ModelSerializers.
+FAST_READ_SERIALIZERS = False
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -0,0 +1,107 @@
+"""SQLite backend with a per-process write queue.
+
+SQLite allows one writer per database file. When several threads write at
+once, the losers sleep inside SQLite's busy handler with growing back-off
+and, past the timeout, fail with "database is locked". With
+``OPTIONS["serialize_writes"]`` the threads of one process instead wait on
+a lock per database file: a transaction takes it at ``BEGIN`` and releases
+it on commit or rollback, and a write outside a transaction holds it for
+that one statement. Writers from other processes are still handled by the
+busy timeout. If ``BEGIN`` or an autocommit write still hits a lock, it is
+retried ``OPTIONS["write_retries"]`` times with exponential back-off.
+"""
+import threading
+import time
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def _write_lock(name):
+    with _write_locks_guard:
+        return _write_locks.setdefault(str(name), threading.Lock())
+
+
+def _is_locked_error(error):
+    return "locked" in str(error) or "busy" in str(error)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict["OPTIONS"]
+        self.serialize_writes = options.get("serialize_writes", False)
+        self.write_retries = options.get("write_retries", 0)
+        self.write_retry_delay = options.get("write_retry_delay", 0.05)
+        self.write_lock_timeout = options.get("timeout", 5)
+        self._holds_write_lock = False
+        self.execute_wrappers.append(self._autocommit_write)
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in ("serialize_writes", "write_retries", "write_retry_delay"):
+            kwargs.pop(option, None)
+        return kwargs
+
+    def _acquire_write_lock(self):
+        if not self.serialize_writes or self._holds_write_lock:
+            return False
+        if not _write_lock(self.settings_dict["NAME"]).acquire(timeout=self.write_lock_timeout):
+            raise OperationalError("database is locked (write queue timeout)")
+        self._holds_write_lock = True
+        return True
+
+    def _release_write_lock(self):
+        if self._holds_write_lock:
+            self._holds_write_lock = False
+            _write_lock(self.settings_dict["NAME"]).release()
+
+    def _with_retries(self, func, *args):
+        for attempt in range(self.write_retries + 1):
+            try:
+                return func(*args)
+            except OperationalError as e:
+                if attempt == self.write_retries or not _is_locked_error(e):
+                    raise
+                time.sleep(self.write_retry_delay * 2 ** attempt)
+
+    def _start_transaction_under_autocommit(self):
+        self._acquire_write_lock()
+        try:
+            self._with_retries(super()._start_transaction_under_autocommit)
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _commit(self):
+        # A failed COMMIT leaves the transaction open; the rollback that
+        # follows releases the lock.
+        super()._commit()
+        self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_write_lock()
+
+    def _autocommit_write(self, execute, sql, params, many, context):
+        if not self.get_autocommit() or not sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            return execute(sql, params, many, context)
+        acquired = self._acquire_write_lock()
+        try:
+            return self._with_retries(execute, sql, params, many, context)
+        finally:
+            if acquired:
+                self._release_write_lock()
@@ -0,0 +1,55 @@
+"""SQLite connection profiles.
+
+``stock`` is Django's default SQLite setup. ``concurrent`` is tuned for a
+server with several request threads or processes writing to one file:
+
+- WAL journaling, so readers never block the writer and vice versa;
+- ``synchronous=NORMAL`` (safe with WAL: only the last transactions before
+  a power loss can be lost, never corruption), memory-mapped reads, a larger
+  page cache and in-memory temporary tables;
+- persistent connections with health checks, so requests do not pay for
+  opening the file and running the pragmas;
+- ``BEGIN IMMEDIATE`` transactions, a busy timeout and, through
+  ``ApiDjangoRest.sqlite_backend``, a per-process write queue with retries.
+"""
+
+PROFILES = {
+    "stock": {
+        "ENGINE": "django.db.backends.sqlite3",
+    },
+    "concurrent": {
+        "ENGINE": "ApiDjangoRest.sqlite_backend",
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+        "PRAGMAS": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,
+            "temp_store": "MEMORY",
+        },
+        "OPTIONS": {
+            "timeout": 20,
+            "transaction_mode": "IMMEDIATE",
+            "serialize_writes": True,
+            "write_retries": 3,
+            "write_retry_delay": 0.05,
+        },
+    },
+}
+
+
+def sqlite_database(name, profile="concurrent", **extra):
+    """Build a ``DATABASES`` entry for the SQLite file ``name``."""
+    config = PROFILES[profile]
+    database = {
+        key: value for key, value in config.items() if key not in ("PRAGMAS", "OPTIONS")
+    }
+    options = dict(config.get("OPTIONS", {}))
+    pragmas = config.get("PRAGMAS", {})
+    if pragmas:
+        options["init_command"] = ";".join(
+            f"PRAGMA {pragma}={value}" for pragma, value in pragmas.items())
+    database.update(NAME=name, OPTIONS=options)
+    database.update(extra)
+    return database
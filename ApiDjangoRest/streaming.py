@@ -0,0 +1,157 @@
+"""Incremental JSON rendering with negotiated gzip.
+
+``StreamingJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer``
+but encodes list items and dict values one at a time (each with the C
+encoder) and yields them in ``STREAMING_JSON_CHUNK_SIZE`` pieces, so a large
+page is never held as one string. ``StreamingJSONMixin`` turns a view's
+successful JSON responses into:
+
+- a plain response with ``Content-Length`` when the body fits in one chunk;
+- otherwise a ``StreamingHttpResponse`` fed by the encoder.
+
+Either one is gzipped when the client sends ``Accept-Encoding: gzip`` and the
+body reaches ``STREAMING_JSON_GZIP_MIN_BYTES``. Compression is opt-in per
+view rather than ``GZipMiddleware``: responses that mix secrets (tokens)
+with request input stay uncompressed (BREACH).
+"""
+import itertools
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+
+from ApiDjangoRest.metrics import timed
+
+_accepts_gzip = re.compile(r"\bgzip\b")
+
+
+def chunk_size():
+    return getattr(settings, "STREAMING_JSON_CHUNK_SIZE", 64 * 1024)
+
+
+def gzip_min_bytes():
+    return getattr(settings, "STREAMING_JSON_GZIP_MIN_BYTES", 1024)
+
+
+class StreamingJSONRenderer(JSONRenderer):
+    # Containers this many levels deep are streamed item by item; a page
+    # dict -> its results list -> one encoded post per piece.
+    stream_depth = 2
+
+    def _encoder(self):
+        return self.encoder_class(
+            ensure_ascii=self.ensure_ascii,
+            allow_nan=not self.strict,
+            separators=(",", ":") if self.compact else (", ", ": "),
+        )
+
+    def _pieces(self, data, encode, depth):
+        if depth and isinstance(data, (list, tuple)):
+            yield "["
+            for i, item in enumerate(data):
+                if i:
+                    yield ","
+                yield from self._pieces(item, encode, depth - 1)
+            yield "]"
+        elif depth and isinstance(data, dict) and all(isinstance(key, str) for key in data):
+            yield "{"
+            for i, (key, value) in enumerate(data.items()):
+                yield ("," if i else "") + encode(key) + ":"
+                yield from self._pieces(value, encode, depth - 1)
+            yield "}"
+        else:
+            yield encode(data)
+
+    def iter_render(self, data):
+        """Yield the encoded ``data`` in pieces of about ``chunk_size()`` bytes."""
+        if data is None:
+            return
+        encode = self._encoder().encode
+        size = chunk_size()
+        buffer, buffered = [], 0
+        for piece in self._pieces(data, encode, self.stream_depth):
+            # Same escaping as JSONRenderer.render; both are single characters
+            # so per-piece replacement is safe.
+            piece = piece.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+            buffer.append(piece)
+            buffered += len(piece)
+            if buffered >= size:
+                yield "".join(buffer).encode()
+                buffer, buffered = [], 0
+        if buffer:
+            yield "".join(buffer).encode()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return b"".join(self.iter_render(data))
+
+
+def accepts_gzip(request):
+    return bool(_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+
+
+@timed("render")
+def _head(chunks):
+    # Encode up to the first full chunk inside the request's render phase.
+    first = next(chunks, b"")
+    second = next(chunks, None)
+    return first, second
+
+
+def stream_response(request, response):
+    """Replace a DRF ``Response`` rendered by ``StreamingJSONRenderer``.
+
+    Anything else (errors, 304s, the browsable API, indented JSON) is
+    returned untouched.
+    """
+    renderer = getattr(response, "accepted_renderer", None)
+    if (
+        not isinstance(response, Response)
+        or response.status_code != 200
+        or not isinstance(renderer, StreamingJSONRenderer)
+        or renderer.get_indent(response.accepted_media_type, {}) is not None
+    ):
+        return response
+
+    gzip = accepts_gzip(request)
+    chunks = renderer.iter_render(response.data)
+    first, second = _head(chunks)
+    if second is None:
+        body = first
+        if gzip and len(body) >= gzip_min_bytes():
+            body = compress_string(body)
+        else:
+            gzip = False
+        replacement = HttpResponse(body, status=response.status_code)
+    else:
+        stream = itertools.chain((first, second), chunks)
+        replacement = StreamingHttpResponse(
+            compress_sequence(stream) if gzip else stream, status=response.status_code)
+
+    for header, value in response.items():
+        replacement[header] = value
+    replacement["Content-Type"] = (
+        f"{response.accepted_media_type}; charset={renderer.charset}"
+        if renderer.charset else response.accepted_media_type)
+    if gzip:
+        replacement["Content-Encoding"] = "gzip"
+    patch_vary_headers(replacement, ("Accept-Encoding",))
+    # Keep the payload reachable for callers that inspect it (tests).
+    replacement.data = response.data
+    return replacement
+
+
+class StreamingJSONMixin:
+    """Serve a view's JSON through ``stream_response``."""
+
+    renderer_classes = [StreamingJSONRenderer, BrowsableAPIRenderer]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        return stream_response(request, response)
@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from .metrics import MetricsView
 
 
 urlpatterns = [
@@ -24,6 +25,7 @@ urlpatterns = [
     path('api/auth/', include('authentication.urls')),
     path('api/', include('principal.urls')),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
     
     # Documentación Swagger
     path('api/docs/swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+# Registration and password reset look users up by email, which
+# django.contrib.auth leaves unindexed.
+USER_EMAIL_INDEX = "CREATE INDEX IF NOT EXISTS auth_user_email_idx ON auth_user (email)"
+
+
+def create_user_email_index(sender, using, **kwargs):
+    from django.db import connections
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(USER_EMAIL_INDEX)
 
 
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from . import schema, signals  # noqa: F401
+
+        post_migrate.connect(create_user_email_index, sender=self)
@@ -0,0 +1,120 @@
+"""Async variants of the hashing-heavy authentication endpoints.
+
+Served natively under ASGI (``ApiDjangoRest/asgi.py``): while the password
+is hashed in the bounded pool the event loop keeps serving other requests,
+instead of a worker thread blocking on the hash.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .credentials import aauthenticate_credentials
+from .hashing import HashingBusy, ahash_password
+from .serializers import RegisterSerializer, RegisterResponseSerializer
+from .throttling import AuthRateThrottle, auth_limiter, submitted_username
+
+
+def _request_data(request):
+    """The submitted form or JSON object, or ``None`` for any other body."""
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+        # Arrays and scalars are valid JSON, but not a set of fields.
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _invalid_body():
+    return JsonResponse(
+        {"detail": "Expected a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _busy_response(exc):
+    response = JsonResponse(
+        {"detail": str(exc.detail)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response["Retry-After"] = str(exc.wait)
+    return response
+
+
+async def _throttle(request, scope, data):
+    # Same budget as the DRF views, checked before any database or hashing work.
+    wait = await sync_to_async(auth_limiter.hit)(
+        scope, AuthRateThrottle().get_ident(request), submitted_username(data))
+    if wait is None:
+        return None
+    response = JsonResponse(
+        {"detail": f"Request was throttled. Expected available in {wait} seconds."},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response["Retry-After"] = str(wait)
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    data = _request_data(request)
+    if data is None:
+        return _invalid_body()
+    throttled = await _throttle(request, "register", data)
+    if throttled:
+        return throttled
+    input_serializer = RegisterSerializer(data=data)
+    if not await sync_to_async(input_serializer.is_valid)():
+        return JsonResponse(input_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        password = await ahash_password(input_serializer.validated_data["password"])
+    except HashingBusy as e:
+        return _busy_response(e)
+    user = await User.objects.acreate(
+        username=User.normalize_username(input_serializer.validated_data["username"]),
+        password=password,
+        email=User.objects.normalize_email(input_serializer.validated_data["email"]),
+    )
+    output_serializer = RegisterResponseSerializer({
+        "message": "User created successfully",
+        "username": user.username,
+        "email": user.email,
+        "date_joined": user.date_joined,
+    })
+    return JsonResponse(output_serializer.data, status=status.HTTP_201_CREATED)
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    data = _request_data(request)
+    if data is None:
+        return _invalid_body()
+    throttled = await _throttle(request, "login", data)
+    if throttled:
+        return throttled
+    errors = {}
+    for field in ("username", "password"):
+        if not data.get(field):
+            errors[field] = ["This field is required."]
+        elif not isinstance(data[field], str):
+            errors[field] = ["Not a valid string."]
+    if errors:
+        return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = await aauthenticate_credentials(request, data["username"], data["password"])
+    except HashingBusy as e:
+        return _busy_response(e)
+    if not api_settings.USER_AUTHENTICATION_RULE(user):
+        return JsonResponse(
+            {"detail": "No active account found with the given credentials"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+    refresh = RefreshToken.for_user(user)
+    return JsonResponse({"refresh": str(refresh), "access": str(refresh.access_token)})
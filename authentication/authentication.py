@@ -0,0 +1,103 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from ApiDjangoRest import db_router
+
+
+def _user_cache():
+    return caches[getattr(settings, "AUTH_USER_CACHE_ALIAS", "default")]
+
+
+def _user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    _user_cache().delete(_user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that avoids loading the user row on every request.
+
+    Validated users are cached by user id together with the token's
+    ``REVOKE_TOKEN_CLAIM`` (a hash of the password the token was issued
+    for), so a token minted before a password change never matches the
+    cached entry. Entries are dropped whenever the user is saved or deleted.
+
+    Views that only need an authenticated identity can set
+    ``authenticate_from_claims = True``; with ``AUTH_USER_FROM_CLAIMS``
+    enabled they receive a ``TokenUser`` built from the token alone.
+    """
+
+    def get_user(self, validated_token):
+        if self.from_claims_allowed():
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+        if user_id is not None and version is not None:
+            entry = _user_cache().get(_user_cache_key(user_id))
+            if entry is not None and entry["version"] == version:
+                return entry["user"]
+
+        user = super().get_user(validated_token)
+        if version is not None:
+            _user_cache().set(
+                _user_cache_key(user_id),
+                {"version": version, "user": user},
+                getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 300),
+            )
+        return user
+
+    def authenticate(self, request):
+        self.request = request
+        result = super().authenticate(request)
+        if result is not None:
+            db_router.set_user(result[1].get(api_settings.USER_ID_CLAIM))
+        return result
+
+    async def aauthenticate(self, request, from_claims=False):
+        """``authenticate`` for plain async Django views.
+
+        Token validation is CPU only and the user comes from the cache; only
+        a cache miss loads the user row, through the regular sync path.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        db_router.set_user(validated_token.get(api_settings.USER_ID_CLAIM))
+        return await self.aget_user(validated_token, from_claims), validated_token
+
+    async def aget_user(self, validated_token, from_claims=False):
+        if from_claims and getattr(settings, "AUTH_USER_FROM_CLAIMS", False):
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+        if user_id is not None and version is not None:
+            entry = await _user_cache().aget(_user_cache_key(user_id))
+            if entry is not None and entry["version"] == version:
+                return entry["user"]
+
+        user = await sync_to_async(super().get_user)(validated_token)
+        if version is not None:
+            await _user_cache().aset(
+                _user_cache_key(user_id),
+                {"version": version, "user": user},
+                getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 300),
+            )
+        return user
+
+    def from_claims_allowed(self):
+        if not getattr(settings, "AUTH_USER_FROM_CLAIMS", False):
+            return False
+        request = getattr(self, "request", None)
+        view = request.parser_context.get("view") if request is not None else None
+        return getattr(view, "authenticate_from_claims", False)
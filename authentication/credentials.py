@@ -0,0 +1,58 @@
+"""Username/password authentication with the hash check in the hashing pool.
+
+``authenticate_credentials`` behaves like ``django.contrib.auth.authenticate``
+for the login endpoints: with the stock ``ModelBackend`` it performs the same
+lookup, ``is_active`` check, hash upgrade and ``user_login_failed`` signal,
+but verifies the password through ``hashing_pool``. Any other
+``AUTHENTICATION_BACKENDS`` setup is delegated to ``authenticate()`` itself,
+since custom backends may not check a local hash at all.
+"""
+from django.conf import settings
+from django.contrib.auth import aauthenticate, authenticate, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_login_failed
+
+from .hashing import acheck_user_password, averify_password, check_user_password, verify_password
+
+MODEL_BACKEND = "django.contrib.auth.backends.ModelBackend"
+
+
+def _model_backend_only():
+    return list(settings.AUTHENTICATION_BACKENDS) == [MODEL_BACKEND]
+
+
+def _lookup(username):
+    UserModel = get_user_model()
+    return UserModel._default_manager.filter(**{UserModel.USERNAME_FIELD: username})
+
+
+def _cleansed(username):
+    # What authenticate() sends: the password is never passed to receivers.
+    return {"username": username, "password": "********************"}
+
+
+def authenticate_credentials(request, username, password):
+    """The active user with these credentials, or ``None``."""
+    if not _model_backend_only():
+        return authenticate(request, username=username, password=password)
+    user = _lookup(username).first()
+    if user is None:
+        verify_password(password, None)
+    elif check_user_password(user, password) and ModelBackend().user_can_authenticate(user):
+        return user
+    user_login_failed.send(sender=__name__, credentials=_cleansed(username), request=request)
+    return None
+
+
+async def aauthenticate_credentials(request, username, password):
+    if not _model_backend_only():
+        return await aauthenticate(request, username=username, password=password)
+    user = await _lookup(username).afirst()
+    if user is None:
+        await averify_password(password, None)
+    elif (await acheck_user_password(user, password)
+            and ModelBackend().user_can_authenticate(user)):
+        return user
+    await user_login_failed.asend(
+        sender=__name__, credentials=_cleansed(username), request=request)
+    return None
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    """Raised when the hashing queue is full; rendered as 503 with Retry-After."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many authentication requests, try again shortly."
+    default_code = "hashing_busy"
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF's exception handler turns `wait` into a Retry-After header.
+        self.wait = wait
+
+
+class HashingPool:
+    """Bounded pool that runs password hashing off the request thread.
+
+    At most ``PASSWORD_HASHING_WORKERS`` hashes run at once and at most
+    ``PASSWORD_HASHING_QUEUE_SIZE`` more may wait; anything beyond that is
+    rejected immediately with ``HashingBusy`` so request workers are not
+    tied up behind a burst of logins. With zero workers hashing runs inline.
+    Only pure functions are submitted, never database work.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._executor is None:
+                workers = getattr(settings, "PASSWORD_HASHING_WORKERS", 4)
+                queue_size = getattr(settings, "PASSWORD_HASHING_QUEUE_SIZE", 16)
+                if workers:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix="password-hashing")
+                    self._slots = threading.BoundedSemaphore(workers + queue_size)
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            self._executor = None
+            self._slots = None
+
+    def submit(self, func, *args):
+        executor = self._ensure_started()
+        if executor is None:
+            return _completed(func, *args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy(getattr(settings, "PASSWORD_HASHING_RETRY_AFTER", 1))
+        future = executor.submit(func, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, func, *args):
+        return self.submit(func, *args).result()
+
+    async def arun(self, func, *args):
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+
+def _completed(func, *args):
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except BaseException as e:
+        future.set_exception(e)
+    return future
+
+
+hashing_pool = HashingPool()
+
+
+def hash_password(raw_password):
+    return hashing_pool.run(make_password, raw_password)
+
+
+def _check(raw_password, encoded):
+    # check_password only calls the setter for a correct password whose hash
+    # uses an outdated hasher or work factor; the rehash and save happen in
+    # the caller, outside the pool.
+    outdated = []
+    valid = check_password(raw_password, encoded, setter=lambda _: outdated.append(True))
+    return valid, bool(outdated)
+
+
+def verify_password(raw_password, encoded):
+    # Mirrors ModelBackend: without a stored hash, still spend the time of
+    # one hash so response time does not reveal whether the user exists.
+    if encoded is None:
+        hashing_pool.run(make_password, raw_password)
+        return False
+    return hashing_pool.run(check_password, raw_password, encoded)
+
+
+async def ahash_password(raw_password):
+    return await hashing_pool.arun(make_password, raw_password)
+
+
+async def averify_password(raw_password, encoded):
+    if encoded is None:
+        await hashing_pool.arun(make_password, raw_password)
+        return False
+    return await hashing_pool.arun(check_password, raw_password, encoded)
+
+
+def check_user_password(user, raw_password):
+    """``user.check_password()`` through the pool, saving an upgraded hash."""
+    valid, outdated = hashing_pool.run(_check, raw_password, user.password)
+    if valid and outdated:
+        user.password = hash_password(raw_password)
+        user.save(update_fields=["password"])
+    return valid
+
+
+async def acheck_user_password(user, raw_password):
+    valid, outdated = await hashing_pool.arun(_check, raw_password, user.password)
+    if valid and outdated:
+        user.password = await ahash_password(raw_password)
+        await user.asave(update_fields=["password"])
+    return valid
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authentication.revocation import revocation_store
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens that have already expired"
+
+    def handle(self, *args, **options):
+        deleted = revocation_store.prune()
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} revoked tokens"))
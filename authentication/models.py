@@ -1,3 +1,21 @@
 from django.db import models
 
-# Create your models here.
+
+class RevokedToken(models.Model):
+    """Refresh tokens revoked by logout or rotation, until they expire.
+
+    Rows are looked up by ``jti`` only when the in-process filter in
+    ``authentication.revocation`` reports a possible match, and pruned in
+    ``expires_at`` ranges once the tokens could no longer verify anyway.
+    """
+
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["expires_at"], name="revoked_token_expires_idx"),
+        ]
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .serializers import PersonalDateViewSerializer
+
+
+def _profile_cache():
+    return caches[getattr(settings, "AUTH_USER_CACHE_ALIAS", "default")]
+
+
+def _profile_cache_key(user_id):
+    return f"auth-profile:{user_id}"
+
+
+def personal_data(user, permissions=None):
+    """Serialized profile and effective permissions of ``user``.
+
+    The payload is cached per user, so repeat calls skip the
+    user-permission and group-permission queries behind
+    ``get_all_permissions()``. Pass ``permissions`` to rebuild the payload
+    after a profile change without recomputing them.
+    """
+    key = _profile_cache_key(user.pk)
+    if permissions is None:
+        data = _profile_cache().get(key)
+        if data is not None:
+            return data
+        permissions = sorted(user.get_all_permissions())
+
+    data = dict(PersonalDateViewSerializer({
+        "username": user.username,
+        "email": user.email,
+        "date_joined": user.date_joined,
+        "is_superuser": user.is_superuser,
+        "user_permissions": permissions,
+        "first_name": user.first_name if user.first_name else None,
+        "last_name": user.last_name if user.last_name else None
+    }).data)
+    _profile_cache().set(key, data, getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 300))
+    return data
+
+
+def cached_permissions(user):
+    data = _profile_cache().get(_profile_cache_key(user.pk))
+    return data["user_permissions"] if data is not None else None
+
+
+def invalidate_personal_data(user_ids):
+    # Drop the entries now and again once the surrounding transaction
+    # commits, so a concurrent reader cannot re-cache the old permissions.
+    keys = [_profile_cache_key(user_id) for user_id in user_ids]
+    if keys:
+        _profile_cache().delete_many(keys)
+        transaction.on_commit(lambda: _profile_cache().delete_many(keys))
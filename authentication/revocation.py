@@ -0,0 +1,139 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings. No false negatives."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class RevocationStore:
+    """Revoked refresh token ids, checked in O(1) in the common case.
+
+    A Bloom filter answers "definitely not revoked" without touching the
+    database; only possible matches are confirmed against ``RevokedToken``.
+    Revocations made by other processes are picked up by reading rows past
+    the last seen id, at most once every ``TOKEN_REVOCATION_SYNC_INTERVAL``
+    seconds. Expired rows are pruned by a background thread, after which the
+    filter is rebuilt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._watermark = 0
+        self._synced_at = 0.0
+        self._pruner = None
+
+    @staticmethod
+    def _setting(name, default):
+        return getattr(settings, name, default)
+
+    def _rebuild(self):
+        bloom = BloomFilter(
+            self._setting("TOKEN_REVOCATION_FILTER_CAPACITY", 1_000_000),
+            self._setting("TOKEN_REVOCATION_FILTER_ERROR_RATE", 0.001),
+        )
+        watermark = 0
+        rows = RevokedToken.objects.filter(expires_at__gt=timezone.now()).values_list("id", "jti")
+        for pk, jti in rows.iterator(chunk_size=10_000):
+            bloom.add(jti)
+            watermark = max(watermark, pk)
+        self._filter = bloom
+        self._watermark = watermark
+        self._synced_at = time.monotonic()
+
+    def _sync(self):
+        if self._filter is None:
+            self._rebuild()
+            self._start_pruner()
+            return
+        interval = self._setting("TOKEN_REVOCATION_SYNC_INTERVAL", 1.0)
+        if time.monotonic() - self._synced_at < interval:
+            return
+        rows = RevokedToken.objects.filter(id__gt=self._watermark).values_list("id", "jti")
+        for pk, jti in rows.order_by("id"):
+            self._filter.add(jti)
+            self._watermark = pk
+        self._synced_at = time.monotonic()
+
+    def revoke(self, jti, exp):
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=datetime_from_epoch(exp))
+        except IntegrityError:
+            pass
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+    def is_revoked(self, jti):
+        with self._lock:
+            self._sync()
+            maybe = jti in self._filter
+        return maybe and RevokedToken.objects.filter(jti=jti).exists()
+
+    def prune(self):
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        if deleted:
+            with self._lock:
+                self._rebuild()
+        return deleted
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+            self._watermark = 0
+
+    def _start_pruner(self):
+        interval = self._setting("TOKEN_REVOCATION_PRUNE_INTERVAL", 3600)
+        if self._pruner is not None or not interval:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.prune()
+                except Exception:
+                    # Keep pruning on the next tick; a failed prune only
+                    # leaves expired rows behind.
+                    pass
+                finally:
+                    close_old_connections()
+
+        self._pruner = threading.Thread(target=run, name="token-revocation-pruner", daemon=True)
+        self._pruner.start()
+
+
+revocation_store = RevocationStore()
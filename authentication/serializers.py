@@ -1,5 +1,11 @@
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth.models import User
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from django.contrib.auth.models import update_last_login
+from .tokens import RevocableRefreshToken
+from .credentials import authenticate_credentials
 
 
 class RegisterSerializer(serializers.Serializer):
@@ -50,4 +56,26 @@ class RequestPasswordResetViewSerializer(serializers.Serializer):
     def validate_email(self, value):
         if not User.objects.filter(email=value).exists():
             raise serializers.ValidationError("Email does not exist")
-        return value
\ No newline at end of file
+        return value
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RevocableRefreshToken
+
+
+
+class OffloadedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """TokenObtainPairSerializer that checks the password in the hashing pool."""
+
+    def validate(self, attrs):
+        self.user = authenticate_credentials(
+            self.context.get("request"), attrs[self.username_field], attrs["password"])
+        if not api_settings.USER_AUTHENTICATION_RULE(self.user):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account")
+
+        refresh = self.get_token(self.user)
+        data = {"refresh": str(refresh), "access": str(refresh.access_token)}
+        if api_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
+        return data
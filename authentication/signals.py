@@ -0,0 +1,55 @@
+from django.contrib.auth.models import Group, Permission, User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .profiles import invalidate_personal_data
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    # Covers profile updates, password changes and resets, and deactivation.
+    invalidate_cached_user(instance.pk)
+    invalidate_personal_data([instance.pk])
+
+
+def _member_ids(group_ids):
+    return list(User.objects.filter(groups__in=group_ids).values_list("pk", flat=True).distinct())
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def drop_personal_data_on_user_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        invalidate_personal_data([instance.pk])
+    else:
+        # instance is a Group or Permission; pk_set holds user ids, except
+        # on clear, where the members are read before they are removed.
+        invalidate_personal_data(
+            pk_set if pk_set is not None else instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def drop_personal_data_on_group_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        group_ids = [instance.pk]
+    else:
+        group_ids = pk_set if pk_set is not None else instance.group_set.values_list("pk", flat=True)
+    invalidate_personal_data(_member_ids(list(group_ids)))
+
+
+@receiver(pre_delete, sender=Group)
+def drop_personal_data_on_group_delete(sender, instance, **kwargs):
+    invalidate_personal_data(_member_ids([instance.pk]))
+
+
+@receiver(pre_delete, sender=Permission)
+def drop_personal_data_on_permission_delete(sender, instance, **kwargs):
+    user_ids = set(instance.user_set.values_list("pk", flat=True))
+    user_ids.update(_member_ids(list(instance.group_set.values_list("pk", flat=True))))
+    invalidate_personal_data(user_ids)
@@ -1,3 +1,415 @@
-from django.test import TestCase
+import json
+import threading
+from contextlib import redirect_stderr
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, Permission, User
+from django.contrib.auth.signals import user_login_failed
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from principal.models import Post
+from principal.query_plans import QueryPlanAssertions
+
+from .hashing import hashing_pool
+from .models import RevokedToken
+from .revocation import revocation_store
+from .throttling import auth_limiter
+from .tokens import RevocableRefreshToken
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="password123")
+        self.authenticate()
+
+    def authenticate(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_repeat_requests_skip_the_user_query(self):
+        Post.objects.create(author=self.user, title="Title", content="Content")
+        url = reverse("get_posts") + "?view=summary"
+        self.client.get(url)
+        # Validators, then the page of posts; no auth query.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_update_is_visible_on_next_request(self):
+        self.client.get(reverse("personal_data"))
+        self.client.put(reverse("update_profile"), {"firstName": "Ada"})
+        response = self.client.get(reverse("personal_data"))
+        self.assertEqual(response.data["first_name"], "Ada")
+
+    def test_password_change_revokes_existing_tokens(self):
+        self.client.get(reverse("personal_data"))
+        response = self.client.put(reverse("change_password"), {
+            "old_password": "password123",
+            "new_password": "newpassword123",
+            "new_password_confirmation": "newpassword123",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse("personal_data")).status_code, 401)
+        self.user.refresh_from_db()
+        self.authenticate()
+        self.assertEqual(self.client.get(reverse("personal_data")).status_code, 200)
+
+    def test_password_reset_revokes_existing_tokens(self):
+        self.client.get(reverse("personal_data"))
+        url = reverse("password-reset-confirm", kwargs={
+            "uidb64": urlsafe_base64_encode(force_bytes(self.user.pk)),
+            "token": default_token_generator.make_token(self.user),
+        })
+        self.client.post(url, {
+            "new_password": "newpassword123", "confirm_password": "newpassword123"})
+        self.assertEqual(self.client.get(reverse("personal_data")).status_code, 401)
+
+    def test_deactivation_rejects_cached_user(self):
+        self.client.get(reverse("personal_data"))
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse("personal_data")).status_code, 401)
+
+    def test_claims_only_user_for_opted_in_views(self):
+        url = reverse("get_posts") + "?view=summary"
+        with self.settings(AUTH_USER_FROM_CLAIMS=True):
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            # Views that did not opt in still load the full user.
+            response = self.client.get(reverse("personal_data"))
+            self.assertEqual(response.data["email"], "reader@example.com")
+
+    def test_schema_documents_the_bearer_scheme(self):
+        with redirect_stderr(StringIO()):
+            response = self.client.get(reverse("schema") + "?format=json")
+        schema = json.loads(response.content)
+        self.assertEqual(schema["components"]["securitySchemes"]["jwtAuth"]["scheme"], "bearer")
+        self.assertIn({"jwtAuth": []}, schema["paths"]["/api/auth/personal-data/"]["get"]["security"])
+
+
+class TokenRevocationTests(APITestCase):
+    def setUp(self):
+        revocation_store.reset()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+
+    def refresh(self, token):
+        return self.client.post(reverse("token_refresh"), {"refresh": token})
+
+    def test_rotation_revokes_the_previous_refresh_token(self):
+        original = str(RefreshToken.for_user(self.user))
+        response = self.refresh(original)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(response.data["refresh"]).status_code, 200)
+        self.assertEqual(self.refresh(original).status_code, 401)
+
+    def test_logout_revokes_the_refresh_token(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.post(
+            reverse("logout"), {"refresh_token": str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(str(refresh)).status_code, 401)
+
+    def test_unrevoked_refresh_skips_the_database(self):
+        revocation_store.is_revoked("warm-up")
+        token = RevocableRefreshToken.for_user(self.user)
+        with self.assertNumQueries(0):
+            self.assertFalse(revocation_store.is_revoked(token["jti"]))
+
+    def test_revocations_from_other_processes_are_synced(self):
+        revocation_store.is_revoked("warm-up")
+        RevokedToken.objects.create(
+            jti="elsewhere", expires_at=timezone.now() + timedelta(days=1))
+        with self.settings(TOKEN_REVOCATION_SYNC_INTERVAL=0):
+            self.assertTrue(revocation_store.is_revoked("elsewhere"))
+
+    def test_prune_removes_expired_rows(self):
+        RevokedToken.objects.create(
+            jti="old", expires_at=timezone.now() - timedelta(seconds=1))
+        RevokedToken.objects.create(
+            jti="live", expires_at=timezone.now() + timedelta(days=1))
+        call_command("prune_revoked_tokens", stdout=StringIO())
+        self.assertEqual(
+            list(RevokedToken.objects.values_list("jti", flat=True)), ["live"])
+
+
+class PasswordHashingPoolTests(APITestCase):
+    def setUp(self):
+        hashing_pool.shutdown()
+        self.addCleanup(hashing_pool.shutdown)
+        auth_limiter.reset()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+
+    def login(self, url_name):
+        return self.client.post(
+            reverse(url_name), {"username": "reader", "password": "password123"},
+            format="json")
+
+    def test_login_and_register_through_the_pool(self):
+        self.assertEqual(self.login("login").status_code, 200)
+        self.assertEqual(self.login("async-login").status_code, 200)
+        self.assertEqual(
+            self.client.post(reverse("async-login"), {
+                "username": "reader", "password": "wrong"}, format="json").status_code,
+            401)
+        response = self.client.post(reverse("async-register"), {
+            "username": "newuser", "email": "new@example.com", "password": "password123",
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.get(username="newuser").check_password("password123"))
+
+    def test_register_normalizes_the_username(self):
+        for url_name, username in (("register", "\uff53yncuser"), ("async-register", "\uff41syncuser")):
+            response = self.client.post(reverse(url_name), {
+                "username": username, "email": f"{url_name}@example.com",
+                "password": "password123",
+            }, format="json")
+            self.assertEqual(response.status_code, 201)
+        self.assertTrue(User.objects.filter(username="syncuser").exists())
+        self.assertTrue(User.objects.filter(username="asyncuser").exists())
+
+    def test_async_views_reject_bodies_that_are_not_objects(self):
+        for url_name in ("async-login", "async-register"):
+            for body in ("[]", "1", '"reader"', "{"):
+                response = self.client.post(
+                    reverse(url_name), body, content_type="application/json")
+                self.assertEqual(response.status_code, 400, (url_name, body))
+        response = self.client.post(reverse("async-login"), {
+            "username": ["reader"], "password": "password123"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_full_queue_returns_503_with_retry_after(self):
+        release = threading.Event()
+        with self.settings(PASSWORD_HASHING_WORKERS=1, PASSWORD_HASHING_QUEUE_SIZE=0,
+                           PASSWORD_HASHING_RETRY_AFTER=2):
+            blocker = hashing_pool.submit(release.wait)
+            try:
+                for url_name in ("login", "async-login"):
+                    response = self.login(url_name)
+                    self.assertEqual(response.status_code, 503)
+                    self.assertEqual(response["Retry-After"], "2")
+            finally:
+                release.set()
+                blocker.result()
+            self.assertEqual(self.login("login").status_code, 200)
+
+    def test_login_upgrades_outdated_password_hashes(self):
+        hashers = [
+            "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+            "django.contrib.auth.hashers.MD5PasswordHasher",
+        ]
+        with self.settings(PASSWORD_HASHERS=hashers):
+            for url_name in ("login", "async-login"):
+                self.user.password = make_password("password123", hasher="md5")
+                self.user.save()
+                self.assertEqual(self.login(url_name).status_code, 200)
+                self.user.refresh_from_db()
+                self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"), url_name)
+                self.assertTrue(self.user.check_password("password123"))
+
+    def test_inactive_users_and_failed_logins(self):
+        failures = []
+
+        def receiver(sender, credentials, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        for url_name in ("login", "async-login"):
+            response = self.client.post(
+                reverse(url_name), {"username": "reader", "password": "wrong"}, format="json")
+            self.assertEqual(response.status_code, 401)
+        self.assertEqual([c["username"] for c in failures], ["reader", "reader"])
+        self.assertNotIn("wrong", str(failures))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        for url_name in ("login", "async-login"):
+            self.assertEqual(self.login(url_name).status_code, 401)
+
+    def test_inline_hashing_when_pool_is_disabled(self):
+        with self.settings(PASSWORD_HASHING_WORKERS=0):
+            self.assertEqual(self.login("login").status_code, 200)
+
+
+class AuthThrottleTests(APITestCase):
+    rates = {
+        "login": {"ip": "5/min", "username": "2/min"},
+        "register": {"ip": "2/min"},
+        "password-reset": {"username": "1/min"},
+    }
+
+    def setUp(self):
+        auth_limiter.reset()
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="password123")
+
+    def login(self, url_name, username="reader", **extra):
+        return self.client.post(
+            reverse(url_name), {"username": username, "password": "password123"},
+            format="json", **extra)
+
+    def test_username_budget_is_shared_by_sync_and_async_login(self):
+        with self.settings(AUTH_THROTTLE_RATES=self.rates):
+            self.assertEqual(self.login("login").status_code, 200)
+            self.assertEqual(self.login("async-login").status_code, 200)
+            for url_name in ("login", "async-login"):
+                response = self.login(url_name)
+                self.assertEqual(response.status_code, 429)
+                self.assertGreaterEqual(int(response["Retry-After"]), 1)
+            # Another account from the same address still has budget.
+            self.assertEqual(self.login("login", username="someone").status_code, 401)
+
+    def test_ip_budget_spans_usernames(self):
+        with self.settings(AUTH_THROTTLE_RATES=self.rates):
+            for i in range(5):
+                self.login("login", username=f"guess{i}")
+            self.assertEqual(self.login("login", username="fresh").status_code, 429)
+            response = self.login("login", username="fresh", REMOTE_ADDR="10.0.0.2")
+            self.assertEqual(response.status_code, 401)
+
+    def test_forwarded_for_does_not_reset_the_ip_budget(self):
+        with self.settings(AUTH_THROTTLE_RATES=self.rates):
+            for i in range(5):
+                self.login("login", username=f"guess{i}", HTTP_X_FORWARDED_FOR=f"203.0.113.{i}")
+            for url_name in ("login", "async-login"):
+                response = self.login(
+                    url_name, username="fresh", HTTP_X_FORWARDED_FOR="203.0.113.99")
+                self.assertEqual(response.status_code, 429)
+
+    def test_forwarded_for_is_used_behind_declared_proxies(self):
+        rest_framework = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+        with self.settings(AUTH_THROTTLE_RATES=self.rates, REST_FRAMEWORK=rest_framework):
+            for i in range(5):
+                self.login("login", username=f"guess{i}", HTTP_X_FORWARDED_FOR="203.0.113.1")
+            response = self.login(
+                "login", username="fresh", HTTP_X_FORWARDED_FOR="203.0.113.2")
+            self.assertEqual(response.status_code, 401)
+
+    def test_rejected_requests_skip_the_database(self):
+        with self.settings(AUTH_THROTTLE_RATES=self.rates):
+            self.client.post(reverse("request-reset-email"), {"email": "reader@example.com"})
+            with self.assertNumQueries(0):
+                response = self.client.post(
+                    reverse("request-reset-email"), {"email": "Reader@example.com "})
+            self.assertEqual(response.status_code, 429)
+            for url_name in ("register", "async-register"):
+                self.client.post(reverse(url_name), {}, format="json")
+            with self.assertNumQueries(0):
+                response = self.client.post(reverse("register"), {
+                    "username": "newuser", "email": "new@example.com", "password": "password123",
+                }, format="json")
+            self.assertEqual(response.status_code, 429)
+            self.assertFalse(User.objects.filter(username="newuser").exists())
+
+    def test_scopes_without_rates_are_unlimited(self):
+        with self.settings(AUTH_THROTTLE_RATES={}):
+            for _ in range(15):
+                self.assertEqual(self.login("login").status_code, 200)
+
+
+class PersonalDataCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="password123")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        self.group = Group.objects.create(name="editors")
+        self.view_post = Permission.objects.get(codename="view_post")
+        self.add_post = Permission.objects.get(codename="add_post")
+
+    def permissions(self):
+        return self.client.get(reverse("personal_data")).data["user_permissions"]
+
+    def test_repeat_requests_answer_from_cache(self):
+        self.client.get(reverse("personal_data"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("personal_data"))
+        self.assertEqual(response.data["email"], "reader@example.com")
+
+    def test_profile_update_keeps_cached_permissions(self):
+        self.user.user_permissions.add(self.view_post)
+        self.client.get(reverse("personal_data"))
+        response = self.client.put(reverse("update_profile"), {"firstName": "Ada"})
+        self.assertEqual(response.data["user_permissions"], ["principal.view_post"])
+        # Only the user row is reloaded after the save, not the permissions.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("personal_data"))
+        self.assertEqual(response.data["first_name"], "Ada")
+
+    def test_user_permission_changes_invalidate(self):
+        self.assertEqual(self.permissions(), [])
+        self.user.user_permissions.add(self.view_post)
+        self.assertEqual(self.permissions(), ["principal.view_post"])
+        self.view_post.user_set.clear()
+        self.assertEqual(self.permissions(), [])
+
+    def test_group_changes_invalidate(self):
+        self.group.permissions.add(self.add_post)
+        self.assertEqual(self.permissions(), [])
+        self.group.user_set.add(self.user)
+        self.assertEqual(self.permissions(), ["principal.add_post"])
+        self.group.permissions.add(self.view_post)
+        self.assertEqual(self.permissions(), ["principal.add_post", "principal.view_post"])
+        self.view_post.group_set.remove(self.group)
+        self.assertEqual(self.permissions(), ["principal.add_post"])
+        self.group.delete()
+        self.assertEqual(self.permissions(), [])
+
+
+class QueryPlanTests(QueryPlanAssertions, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="password123")
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def test_account_views(self):
+        for url_name in ("register", "async-register"):
+            self.assert_indexed("post", reverse(url_name), {
+                "username": f"new-{url_name}", "email": f"{url_name}@example.com",
+                "password": "password123",
+            }, format="json")
+        for url_name in ("login", "async-login"):
+            self.assert_indexed(
+                "post", reverse(url_name), {"username": "reader", "password": "password123"},
+                format="json")
+        self.assert_indexed("get", reverse("personal_data"))
+        self.assert_indexed("put", reverse("update_profile"), {"firstName": "Ada"})
+        self.assert_indexed("post", reverse("token_refresh"), {"refresh": str(self.refresh)})
+
+    def test_password_views(self):
+        self.assert_indexed("post", reverse("request-reset-email"), {"email": "reader@example.com"})
+        self.assert_indexed("post", reverse("password-reset-confirm", kwargs={
+            "uidb64": urlsafe_base64_encode(force_bytes(self.user.pk)),
+            "token": default_token_generator.make_token(self.user),
+        }), {"new_password": "newpassword123", "confirm_password": "newpassword123"})
+        self.user.refresh_from_db()
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+        self.assert_indexed("put", reverse("change_password"), {
+            "old_password": "newpassword123",
+            "new_password": "password123",
+            "new_password_confirmation": "password123",
+        })
+        self.user.refresh_from_db()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.assert_indexed("post", reverse("logout"), {"refresh_token": str(refresh)})
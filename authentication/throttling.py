@@ -0,0 +1,135 @@
+"""Sliding-window rate limiting for the credential endpoints.
+
+Login, register and password-reset requests are counted per client IP and
+per submitted username (or email) in a shared cache, so every worker
+process draws from the same budget when ``AUTH_THROTTLE_CACHE_ALIAS`` points
+at a cross-process backend (Redis, Memcached, database). The check only
+touches the cache: a rejected request never reaches a ``User`` lookup or a
+password hash.
+"""
+import hashlib
+import math
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """``"10/min"`` -> ``(10, 60)``, using the same syntax as DRF throttle rates."""
+    if rate is None:
+        return None
+    count, period = rate.split("/")
+    return int(count), PERIODS[period[0]]
+
+
+class SlidingWindowLimiter:
+    """Approximate sliding window built from two fixed-window counters.
+
+    Each key keeps one counter per window; a request is allowed while
+    ``previous * (1 - elapsed_fraction) + current`` stays within the limit.
+    Counters are only ever incremented, which every cache backend does
+    atomically, so concurrent workers cannot lose updates. Rejected attempts
+    are counted too: a client that keeps hammering stays locked out until its
+    rate actually drops.
+    """
+
+    key_prefix = "auth-throttle"
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "AUTH_THROTTLE_CACHE_ALIAS", "default")]
+
+    def rates(self, scope):
+        return getattr(settings, "AUTH_THROTTLE_RATES", {}).get(scope, {})
+
+    def hit(self, scope, ip, username=None):
+        """Count one request; return ``None`` if allowed, else seconds to wait."""
+        identities = [("ip", ip)]
+        if username:
+            identities.append(("username", hashlib.md5(
+                username.strip().lower().encode()).hexdigest()))
+
+        now = time.time()
+        checks = []
+        for kind, value in identities:
+            rate = parse_rate(self.rates(scope).get(kind))
+            if rate is None or not value:
+                continue
+            limit, window = rate
+            index = int(now // window)
+            key = f"{self.key_prefix}:{scope}:{kind}:{value}:{window}"
+            checks.append((limit, window, f"{key}:{index}", f"{key}:{index - 1}"))
+        if not checks:
+            return None
+
+        previous = self.cache.get_many([prev for _, _, _, prev in checks])
+        wait = None
+        for limit, window, current_key, previous_key in checks:
+            current = self._incr(current_key, window * 2)
+            elapsed = (now % window) / window
+            before = previous.get(previous_key, 0)
+            if before * (1 - elapsed) + current > limit:
+                wait = max(wait or 0, self._wait(limit, window, current, before, now))
+        return wait
+
+    def _incr(self, key, timeout):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            if self.cache.add(key, 1, timeout):
+                return 1
+            return self.cache.incr(key)
+
+    @staticmethod
+    def _wait(limit, window, current, before, now):
+        remaining = window - now % window
+        if current < limit and before:
+            # The previous window's weight decays enough within this window.
+            seconds = window * (1 - (limit - current) / before) - now % window
+        else:
+            seconds = remaining + window * max(0.0, 1 - limit / current)
+        return max(1, math.ceil(seconds))
+
+    def reset(self):
+        self.cache.clear()
+
+
+auth_limiter = SlidingWindowLimiter()
+
+
+class AuthRateThrottle(BaseThrottle):
+    """DRF throttle over ``auth_limiter``.
+
+    Views set ``throttle_scope`` (a key of ``AUTH_THROTTLE_RATES``) and
+    optionally ``throttle_username_field`` (defaults to ``"username"``).
+    """
+
+    def get_ident(self, request):
+        # DRF trusts the whole client-supplied X-Forwarded-For when
+        # NUM_PROXIES is unset, which would let a client pick a fresh IP
+        # budget per request. Only honour it behind a declared proxy count.
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get("REMOTE_ADDR")
+        return super().get_ident(request)
+
+    def allow_request(self, request, view):
+        field = getattr(view, "throttle_username_field", "username")
+        self.wait_seconds = auth_limiter.hit(
+            view.throttle_scope, self.get_ident(request), submitted_username(request.data, field))
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def submitted_username(data, field="username"):
+    if not isinstance(data, Mapping):
+        return None
+    value = data.get(field)
+    return value if isinstance(value, str) else None
@@ -0,0 +1,18 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .revocation import revocation_store
+
+
+class RevocableRefreshToken(RefreshToken):
+    """RefreshToken backed by the revocation store instead of token_blacklist."""
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        if revocation_store.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        revocation_store.revoke(self.payload[api_settings.JTI_CLAIM], self.payload["exp"])
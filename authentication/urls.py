@@ -1,10 +1,13 @@
 from django.urls import path
 from .views import RegisterView, LoginView, PersonalDataView, UpdateProfileView, LogoutView, ChangePasswordView, RefreshView, RequestPasswordResetView,ConfirmPasswordResetView
 from rest_framework_simplejwt.views import TokenRefreshView
+from . import async_views
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('async/register/', async_views.register, name='async-register'),
+    path('async/login/', async_views.login, name='async-login'),
     path('refresh/', RefreshView.as_view(), name='token_refresh'),
     path('personal-data/', PersonalDataView.as_view(), name='personal_data'),
     path('update-profile/', UpdateProfileView.as_view(), name='update_profile'),
@@ -4,7 +4,10 @@ from rest_framework import status
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import RevocableRefreshToken
+from .hashing import hash_password, verify_password
+from .throttling import AuthRateThrottle
+from .profiles import cached_permissions, personal_data
 from django.core.mail import send_mail
 from django.utils.crypto import get_random_string
 from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
@@ -18,6 +21,8 @@ from django.contrib.auth.models import User
 
 class RegisterView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = "register"
 
     @extend_schema(
         tags=["Authentication"],
@@ -45,10 +50,10 @@ class RegisterView(APIView):
         input_serializer = RegisterSerializer(data=request.data)
         
         if input_serializer.is_valid():
-            user = User.objects.create_user(
-                username=input_serializer.validated_data["username"],
-                password=input_serializer.validated_data["password"],
-                email=input_serializer.validated_data["email"]
+            user = User.objects.create(
+                username=User.normalize_username(input_serializer.validated_data["username"]),
+                password=hash_password(input_serializer.validated_data["password"]),
+                email=User.objects.normalize_email(input_serializer.validated_data["email"])
             )
             output_serializer = RegisterResponseSerializer({
                 "message": "User created successfully",
@@ -62,6 +67,9 @@ class RegisterView(APIView):
 
 
 class LoginView(TokenObtainPairView):
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = "login"
+
     @extend_schema(
         tags=["Authentication"],
         summary="Login user"
@@ -109,21 +117,7 @@ class PersonalDataView(APIView):
         },
     )
     def get(self, request):
-        # Obtener al usuario autenticado
-        user = request.user
-
-        # Preparar los datos del usuario
-        user_data = PersonalDateViewSerializer({
-            "username": user.username,
-            "email": user.email,
-            "date_joined": user.date_joined,
-            "is_superuser": user.is_superuser,
-            "user_permissions": list(user.get_all_permissions()),
-            "first_name": user.first_name if user.first_name else None,
-            "last_name": user.last_name if user.last_name else None
-        }).data
-
-        return Response(user_data, status=status.HTTP_200_OK)
+        return Response(personal_data(request.user), status=status.HTTP_200_OK)
 
 class UpdateProfileView(APIView):
     permission_classes = [IsAuthenticated]
@@ -145,16 +139,11 @@ class UpdateProfileView(APIView):
         if lastName:
             user.last_name = lastName
 
+        # A profile edit never changes permissions; carry them over so the
+        # response is rebuilt without the permission queries.
+        permissions = cached_permissions(user)
         user.save()
-        return Response(PersonalDateViewSerializer({
-            "username": user.username,
-            "email": user.email,
-            "date_joined": user.date_joined,
-            "is_superuser": user.is_superuser,
-            "user_permissions": list(user.get_all_permissions()),
-            "first_name": user.first_name if user.first_name else None,
-            "last_name": user.last_name if user.last_name else None
-        }).data, status=status.HTTP_200_OK)
+        return Response(personal_data(user, permissions), status=status.HTTP_200_OK)
         
     
 class ChangePasswordView(APIView):
@@ -175,10 +164,10 @@ class ChangePasswordView(APIView):
                 return Response({'error': 'Passwords do not match'}, status=status.HTTP_400_BAD_REQUEST)
             return Response({'error': 'All fields are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not user.check_password(old_password):
+        if not verify_password(old_password, user.password):
             return Response({'error': 'Incorrect old password'}, status=status.HTTP_400_BAD_REQUEST)
 
-        user.set_password(new_password)
+        user.password = hash_password(new_password)
         user.save()
         return Response({'message': 'Password changed successfully'})
     
@@ -193,7 +182,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data["refresh_token"]
-            token = RefreshToken(refresh_token)
+            token = RevocableRefreshToken(refresh_token)
             token.blacklist()
             return Response({'message': 'Logged out successfully'})
         except Exception as e:
@@ -203,6 +192,9 @@ class LogoutView(APIView):
 ## Reset Password
 class RequestPasswordResetView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = "password-reset"
+    throttle_username_field = "email"
     @extend_schema(
         tags=["Authentication"],
         summary="Request password reset",
@@ -291,7 +283,7 @@ class ConfirmPasswordResetView(APIView):
         if user is not None and default_token_generator.check_token(user, token):
             serializer = PasswordResetConfirmSerializer(data=request.data)
             if serializer.is_valid():
-                user.set_password(serializer.validated_data['new_password'])
+                user.password = hash_password(serializer.validated_data['new_password'])
                 user.save()
                 return Response({"message": "Password reset confirmed successfully"}, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
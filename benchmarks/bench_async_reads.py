@@ -0,0 +1,93 @@
+"""Sync versus async blog reads at high concurrency.
+
+Run with::
+
+    python manage.py test benchmarks.bench_async_reads --pattern="bench_*.py"
+
+``BENCH_REQUESTS`` requests per route are issued through Django's ASGI
+request handler (``AsyncClient``), at most ``BENCH_CONCURRENCY`` at a time
+on one event loop, as an ASGI server would. Sync views run through
+``sync_to_async``; the async views in ``principal.async_views`` use the async
+ORM. Requests per second and tail latency for each pair go to the
+``async_reads`` report.
+"""
+import asyncio
+import os
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from principal.cache import post_detail_cache
+from principal.models import Comment, Post
+
+from .report import write_report
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", 200))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", 50))
+POSTS = int(os.environ.get("BENCH_POSTS", 100))
+COMMENTS_PER_POST = int(os.environ.get("BENCH_COMMENTS_PER_POST", 4))
+
+
+def summarize(samples, elapsed):
+    samples = sorted(samples)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+    return (f"rps={len(samples) / elapsed:.0f} p50={statistics.median(samples):.1f}ms "
+            f"p95={pct(0.95):.1f}ms p99={pct(0.99):.1f}ms")
+
+
+class AsyncReadBenchmark(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(username="benchuser", password="benchmark")
+        posts = Post.objects.bulk_create(
+            Post(author=self.user, title=f"Post {i}", content=f"Content {i}")
+            for i in range(POSTS)
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.user, content=f"Comment {j}")
+            for post in posts
+            for j in range(COMMENTS_PER_POST)
+        )
+        self.post = posts[0]
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    async def burst(self, url):
+        client = AsyncClient()
+        headers = {"Authorization": f"Bearer {self.token}"}
+        slots = asyncio.Semaphore(CONCURRENCY)
+        latencies = []
+
+        async def one():
+            async with slots:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.status_code
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(REQUESTS)))
+        return latencies, time.perf_counter() - start
+
+    def test_sync_versus_async_reads(self):
+        pairs = [
+            ("list", "get_posts", "async-get-posts", {}, ""),
+            ("summary", "get_posts", "async-get-posts", {}, "?view=summary"),
+            ("detail", "get_post", "async-get-post", {"pk": self.post.pk}, ""),
+        ]
+        lines = []
+        for label, sync_route, async_route, kwargs, query in pairs:
+            for kind, route in (("sync", sync_route), ("async", async_route)):
+                url = reverse(route, kwargs=kwargs) + query
+                latencies, elapsed = async_to_sync(self.burst)(url)
+                lines.append(f"{label:<8} {kind:<6} {summarize(latencies, elapsed)}")
+        write_report("async_reads", lines)
@@ -0,0 +1,349 @@
+"""Endpoint benchmarks for the principal and authentication APIs.
+
+Run with::
+
+    python manage.py test benchmarks --pattern="bench_*.py"
+
+Volumes and iterations come from the environment (``BENCH_USERS``,
+``BENCH_POSTS``, ``BENCH_COMMENTS``, ``BENCH_ITERATIONS``). Query counts
+and peak memory are compared with ``benchmarks/baselines.json``; set
+``BENCH_UPDATE_BASELINES=1`` to rewrite it instead. Latency depends on the
+machine, so p50/p95/p99 only go to the ``endpoints`` report.
+"""
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication import urls as authentication_urls
+from authentication.throttling import auth_limiter
+from principal import urls as principal_urls
+from principal.cache import post_detail_cache
+from principal.models import Comment, Follow, Post
+from principal.repositories.feed_repository import FeedRepository
+
+from .report import write_report
+
+BASELINES_PATH = Path(__file__).resolve().parent / "baselines.json"
+PASSWORD = "benchmark-password"
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+VOLUMES = {
+    "users": env_int("BENCH_USERS", 50),
+    "posts": env_int("BENCH_POSTS", 500),
+    "comments": env_int("BENCH_COMMENTS", 2000),
+}
+ITERATIONS = env_int("BENCH_ITERATIONS", 15)
+# Peak memory regresses when it exceeds baseline * (1 + tolerance) + slack.
+MEMORY_TOLERANCE = env_float("BENCH_MEMORY_TOLERANCE", 0.5)
+MEMORY_SLACK_KB = env_float("BENCH_MEMORY_SLACK_KB", 64.0)
+GATED_METRICS = ("queries", "peak_kb")
+
+
+class Scenario:
+    """One timed request. ``prepare`` runs untimed before every iteration and
+    returns the URL kwargs and request body for that iteration."""
+
+    def __init__(self, route, method, auth="user", prepare=None, format="json",
+                 content_type=None, query=""):
+        self.route = route
+        self.method = method
+        self.auth = auth
+        self.prepare = prepare or (lambda bench: ({}, None))
+        self.format = format
+        self.content_type = content_type
+        self.query = query
+
+    @property
+    def name(self):
+        return f"{self.method.upper()} {self.route}{self.query}"
+
+
+def new_post(bench):
+    post = Post.objects.create(author=bench.user, title="Disposable", content="Disposable")
+    return {"pk": post.pk}, None
+
+
+def new_comment(bench):
+    comment = Comment.objects.create(post=bench.post, author=bench.user, content="Disposable")
+    return {"pk": comment.pk}, None
+
+
+def unfollowed_user(bench):
+    FeedRepository.unfollow(bench.user, bench.followee)
+    return {"pk": bench.followee.pk}, None
+
+
+def followed_user(bench):
+    FeedRepository.follow(bench.user, bench.followee)
+    return {"pk": bench.followee.pk}, None
+
+
+def new_account(bench):
+    bench.counter += 1
+    return {}, {
+        "username": f"newuser{bench.counter}",
+        "email": f"newuser{bench.counter}@example.com",
+        "password": PASSWORD,
+    }
+
+
+def reset_link(bench):
+    # The token is bound to the current password hash, which other scenarios change.
+    bench.user.refresh_from_db()
+    return {
+        "uidb64": urlsafe_base64_encode(force_bytes(bench.user.pk)),
+        "token": default_token_generator.make_token(bench.user),
+    }, {"new_password": PASSWORD, "confirm_password": PASSWORD}
+
+
+SCENARIOS = [
+    Scenario("get_posts", "get"),
+    Scenario("get_posts", "get", query="?view=summary"),
+    Scenario("get_posts", "get", query="?pagination=cursor"),
+    Scenario("get_posts", "get", query="?fields=id,title"),
+    Scenario("get_post", "get", prepare=lambda b: ({"pk": b.post.pk}, None)),
+    Scenario("post-comments", "get", prepare=lambda b: ({"pk": b.post.pk}, None)),
+    Scenario("feed", "get"),
+    Scenario("user-follow", "post", prepare=unfollowed_user),
+    Scenario("user-follow", "delete", prepare=followed_user),
+    Scenario("async-get-posts", "get"),
+    Scenario("async-get-posts", "get", query="?view=summary"),
+    Scenario("async-get-posts", "get", query="?pagination=cursor"),
+    Scenario("async-get-post", "get", prepare=lambda b: ({"pk": b.post.pk}, None)),
+    Scenario("search_posts", "get", query="?q=benchmark"),
+    Scenario("export_posts", "get", auth="admin"),
+    Scenario("post_cache_stats", "get", auth="admin"),
+    Scenario("post", "post", prepare=lambda b: ({}, {"title": "New", "content": "New"})),
+    Scenario(
+        "post-import", "post", format=None, content_type="application/x-ndjson",
+        prepare=lambda b: ({}, '{"title": "Imported", "content": "Imported"}\n' * 50),
+    ),
+    Scenario(
+        "update_post", "put",
+        prepare=lambda b: ({"pk": b.post.pk}, {"title": "Edited", "content": "Edited"}),
+    ),
+    Scenario("delete_post", "delete", prepare=new_post),
+    Scenario(
+        "comment-create", "post",
+        prepare=lambda b: ({}, {"content": "New", "post": b.post.pk}),
+    ),
+    Scenario(
+        "comment-bulk-create", "post",
+        prepare=lambda b: ({}, {"comments": [{"content": "New", "post": b.post.pk}] * 50}),
+    ),
+    Scenario(
+        "comment-update", "put",
+        prepare=lambda b: ({"pk": b.comment.pk}, {"content": "Edited"}),
+    ),
+    Scenario("comment-delete", "delete", prepare=new_comment),
+    Scenario("register", "post", auth=None, prepare=new_account),
+    Scenario(
+        "login", "post", auth=None,
+        prepare=lambda b: ({}, {"username": b.user.username, "password": PASSWORD}),
+    ),
+    Scenario("async-register", "post", auth=None, prepare=new_account),
+    Scenario(
+        "async-login", "post", auth=None,
+        prepare=lambda b: ({}, {"username": b.user.username, "password": PASSWORD}),
+    ),
+    Scenario(
+        "token_refresh", "post", auth=None,
+        prepare=lambda b: ({}, {"refresh": str(RefreshToken.for_user(b.user))}),
+    ),
+    Scenario("personal_data", "get"),
+    Scenario("update_profile", "put", prepare=lambda b: ({}, {"firstName": "Bench"})),
+    Scenario(
+        "logout", "post",
+        prepare=lambda b: ({}, {"refresh_token": str(RefreshToken.for_user(b.user))}),
+    ),
+    Scenario(
+        "change_password", "put",
+        prepare=lambda b: ({}, {
+            "old_password": PASSWORD,
+            "new_password": PASSWORD,
+            "new_password_confirmation": PASSWORD,
+        }),
+    ),
+    Scenario(
+        "request-reset-email", "post", auth=None,
+        prepare=lambda b: ({}, {"email": b.user.email}),
+    ),
+    Scenario("password-reset-confirm", "post", auth=None, prepare=reset_link),
+]
+
+
+def percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+class EndpointBenchmarks(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            User(username=f"benchuser{i}", email=f"benchuser{i}@example.com", password=password)
+            for i in range(VOLUMES["users"])
+        )
+        cls.user = User.objects.get(username="benchuser0")
+        cls.admin = User.objects.create_superuser(
+            username="benchadmin", email="benchadmin@example.com", password=PASSWORD)
+        users = list(User.objects.all())
+        posts = Post.objects.bulk_create(
+            Post(
+                author=users[i % len(users)],
+                title=f"Benchmark post {i}",
+                content=f"Seeded benchmark content number {i}",
+            )
+            for i in range(VOLUMES["posts"])
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                post=posts[i % len(posts)],
+                author=users[i % len(users)],
+                content=f"Seeded comment {i}",
+            )
+            for i in range(VOLUMES["comments"])
+        )
+        call_command("backfill_post_counters", stdout=open(os.devnull, "w"))
+        # Every user follows the next ten, so each home feed spans ten authors.
+        Follow.objects.bulk_create(
+            Follow(follower=user, followee=users[(i + j) % len(users)])
+            for i, user in enumerate(users)
+            for j in range(1, 11)
+        )
+        call_command("rebuild_timelines", stdout=open(os.devnull, "w"))
+        cls.followee = users[-1]
+        cls.post = Post.objects.filter(author=cls.user).first()
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.user, content="Mine")
+
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.counter = 0
+        self.users = {"user": self.user, "admin": self.admin}
+        self.clients = {None: APIClient(), "user": APIClient(), "admin": APIClient()}
+
+    def authenticate(self, auth):
+        # Password changes and resets revoke earlier tokens, so every
+        # iteration gets one minted for the current password.
+        if auth is not None:
+            user = self.users[auth]
+            user.refresh_from_db()
+            self.clients[auth].credentials(
+                HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return self.clients[auth]
+
+    def request(self, scenario):
+        # Every iteration pays for the throttle check but never trips it.
+        auth_limiter.reset()
+        kwargs, data = scenario.prepare(self)
+        url = reverse(scenario.route, kwargs=kwargs) + scenario.query
+        call = getattr(self.authenticate(scenario.auth), scenario.method)
+        options = {}
+        if scenario.content_type:
+            options["content_type"] = scenario.content_type
+        elif scenario.format:
+            options["format"] = scenario.format
+        return lambda: call(url, data, **options)
+
+    def measure(self, scenario):
+        latencies = []
+        queries = 0
+        for _ in range(ITERATIONS):
+            send = self.request(scenario)
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = send()
+                if getattr(response, "streaming", False):
+                    b"".join(response.streaming_content)
+                latencies.append((time.perf_counter() - start) * 1000)
+            self.assertTrue(
+                200 <= response.status_code < 300, f"{scenario.name}: {response.status_code}")
+            queries = max(queries, len(ctx.captured_queries))
+
+        send = self.request(scenario)
+        tracemalloc.start()
+        response = send()
+        if getattr(response, "streaming", False):
+            b"".join(response.streaming_content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "queries": queries,
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def regressions(self, name, result, baseline):
+        found = []
+        if result["queries"] > baseline["queries"]:
+            found.append(f"{name}: queries {result['queries']} > {baseline['queries']}")
+        limit = baseline["peak_kb"] * (1 + MEMORY_TOLERANCE) + MEMORY_SLACK_KB
+        if result["peak_kb"] > limit:
+            found.append(f"{name}: peak_kb {result['peak_kb']} > {limit:.1f}")
+        return found
+
+    def test_every_route_has_a_scenario(self):
+        routes = {
+            pattern.name
+            for module in (principal_urls, authentication_urls)
+            for pattern in module.urlpatterns
+        }
+        self.assertEqual(routes - {s.route for s in SCENARIOS}, set())
+
+    def test_endpoints_against_baselines(self):
+        update = bool(os.environ.get("BENCH_UPDATE_BASELINES"))
+        baselines = {}
+        if not update:
+            if not BASELINES_PATH.exists():
+                self.skipTest("No baselines recorded; run with BENCH_UPDATE_BASELINES=1")
+            recorded = json.loads(BASELINES_PATH.read_text())
+            if recorded["volumes"] != VOLUMES:
+                self.skipTest(f"Baselines were recorded for {recorded['volumes']}")
+            baselines = recorded["endpoints"]
+
+        results, found = {}, []
+        for scenario in SCENARIOS:
+            result = results[scenario.name] = self.measure(scenario)
+            if scenario.name in baselines:
+                found.extend(self.regressions(scenario.name, result, baselines[scenario.name]))
+        report = write_report("endpoints", [
+            f"{name:<45} {json.dumps(result)}" for name, result in results.items()])
+
+        if update:
+            gated = {
+                name: {metric: result[metric] for metric in GATED_METRICS}
+                for name, result in results.items()
+            }
+            BASELINES_PATH.write_text(json.dumps(
+                {"volumes": VOLUMES, "endpoints": gated}, indent=2) + "\n")
+            return
+        self.assertEqual(found, [], "\n".join(found + [f"All results: {report}"]))
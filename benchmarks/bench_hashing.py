@@ -0,0 +1,81 @@
+"""Mixed read/login traffic against a fixed number of request workers.
+
+Run with::
+
+    python manage.py test benchmarks.bench_hashing --pattern="bench_*.py"
+
+A burst of logins and cheap authenticated reads is queued on
+``BENCH_REQUEST_WORKERS`` threads, once with inline hashing and once with
+the bounded hashing pool. With the pool, logins beyond its capacity are
+rejected with 503 instead of occupying request workers, so reads queued
+behind them finish sooner. Both runs go to the ``hashing`` report.
+"""
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.hashing import hashing_pool
+
+from .report import write_report
+
+PASSWORD = "benchmark-password"
+REQUEST_WORKERS = int(os.environ.get("BENCH_REQUEST_WORKERS", 4))
+LOGINS = int(os.environ.get("BENCH_LOGINS", 24))
+READS = int(os.environ.get("BENCH_READS", 200))
+
+
+def summarize(samples):
+    if not samples:
+        return "n=0"
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"n={len(samples)} p50={statistics.median(samples):.1f}ms p95={p95:.1f}ms"
+
+
+class MixedTrafficBenchmark(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="benchuser", password=PASSWORD)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.addCleanup(hashing_pool.shutdown)
+
+    def send(self, kind, queued_at):
+        client = APIClient()
+        if kind == "login":
+            response = client.post(
+                reverse("login"), {"username": "benchuser", "password": PASSWORD}, format="json")
+        else:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+            response = client.get(reverse("personal_data"))
+        return kind, response.status_code, (time.perf_counter() - queued_at) * 1000
+
+    def run_burst(self):
+        jobs = ["login"] * LOGINS + ["read"] * READS
+        random.Random(0).shuffle(jobs)
+        with ThreadPoolExecutor(max_workers=REQUEST_WORKERS) as workers:
+            start = time.perf_counter()
+            futures = [workers.submit(self.send, kind, start) for kind in jobs]
+            return [future.result() for future in futures]
+
+    def summarize_burst(self, label, results):
+        reads = [ms for kind, code, ms in results if kind == "read"]
+        logins = [ms for kind, code, ms in results if kind == "login" and code == 200]
+        rejected = sum(1 for kind, code, _ in results if kind == "login" and code == 503)
+        self.assertTrue(all(code == 200 for kind, code, _ in results if kind == "read"))
+        return f"{label:<14} reads {summarize(reads)} | logins ok {summarize(logins)} | 503s {rejected}"
+
+    def test_mixed_read_and_login_traffic(self):
+        lines = []
+        for label, workers, queue in (("inline", 0, 0), ("pool 1+1", 1, 1)):
+            hashing_pool.shutdown()
+            with self.settings(PASSWORD_HASHING_WORKERS=workers, PASSWORD_HASHING_QUEUE_SIZE=queue,
+                               AUTH_THROTTLE_RATES={}):
+                lines.append(self.summarize_burst(label, self.run_burst()))
+        write_report("hashing", lines)
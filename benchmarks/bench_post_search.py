@@ -0,0 +1,80 @@
+"""``LIKE`` scans versus the FTS5 index for post search.
+
+Run with::
+
+    python manage.py test benchmarks.bench_post_search --pattern="bench_*.py"
+
+``BENCH_SEARCH_POSTS`` synthetic posts (random words from a vocabulary of
+``BENCH_SEARCH_VOCABULARY``) are written to an in-memory
+``principal_post`` table carrying the project's FTS5 schema; the project
+database is not touched. ``BENCH_SEARCH_QUERIES`` single-term searches
+are timed both ways and the mean per query goes to the ``post_search``
+report.
+"""
+import os
+import random
+import sqlite3
+import string
+import time
+
+from django.test import SimpleTestCase
+
+from principal.search import FTS_SCHEMA, FTS_TABLE
+
+from .report import write_report
+
+POSTS = int(os.environ.get("BENCH_SEARCH_POSTS", 50_000))
+QUERIES = int(os.environ.get("BENCH_SEARCH_QUERIES", 20))
+VOCABULARY = int(os.environ.get("BENCH_SEARCH_VOCABULARY", 50_000))
+SEED = int(os.environ.get("BENCH_SEARCH_SEED", 0))
+
+LIKE_SQL = "SELECT id FROM principal_post WHERE title LIKE ? OR content LIKE ? LIMIT 20"
+FTS_SQL = (
+    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? "
+    f"ORDER BY bm25({FTS_TABLE}) LIMIT 20"
+)
+
+
+def time_queries(db, sql, params_list):
+    start = time.perf_counter()
+    for params in params_list:
+        db.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / len(params_list)
+
+
+class PostSearchBenchmark(SimpleTestCase):
+    def seed(self, rng, words):
+        db = sqlite3.connect(":memory:")
+        self.addCleanup(db.close)
+        db.execute("CREATE TABLE principal_post (id INTEGER PRIMARY KEY, title TEXT, content TEXT)")
+        for statement in FTS_SCHEMA:
+            db.execute(statement)
+        batch = []
+        for i in range(1, POSTS + 1):
+            batch.append((i, " ".join(rng.choices(words, k=6)), " ".join(rng.choices(words, k=80))))
+            if len(batch) == 10_000:
+                db.executemany("INSERT INTO principal_post VALUES (?, ?, ?)", batch)
+                batch.clear()
+        db.executemany("INSERT INTO principal_post VALUES (?, ?, ?)", batch)
+        db.commit()
+        return db
+
+    def test_like_versus_fts(self):
+        rng = random.Random(SEED)
+        words = [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+            for _ in range(VOCABULARY)
+        ]
+        start = time.perf_counter()
+        db = self.seed(rng, words)
+        seeded = time.perf_counter() - start
+
+        terms = [rng.choice(words) for _ in range(QUERIES)]
+        like = time_queries(db, LIKE_SQL, [(f"%{term}%", f"%{term}%") for term in terms])
+        fts = time_queries(db, FTS_SQL, [(term,) for term in terms])
+        write_report("post_search", [
+            f"Seeded {POSTS} posts in {seeded:.1f}s",
+            f"LIKE  mean {like * 1000:.2f} ms/query",
+            f"FTS5  mean {fts * 1000:.2f} ms/query",
+        ])
+        self.assertLess(fts, like)
@@ -0,0 +1,70 @@
+"""DRF post serializers versus the compiled field plans.
+
+Run with::
+
+    python manage.py test benchmarks.bench_serializers --pattern="bench_*.py"
+
+For each size in ``BENCH_SERIALIZER_SIZES`` (comma separated), that many
+posts with ``BENCH_COMMENTS_PER_POST`` comments each are rendered through
+``PostWithCommentsSerializerResponse`` and through
+``POST_WITH_COMMENTS_PLAN`` (used when ``FAST_READ_SERIALIZERS = True``).
+The best of ``BENCH_SERIALIZER_REPEAT`` runs goes to the ``serializers``
+report, and both must render the same JSON.
+"""
+import os
+import timeit
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from principal.fast_serializers import POST_WITH_COMMENTS_PLAN
+from principal.models import Comment, Post
+from principal.repositories.post_repository import PostRepository
+from principal.serializers import PostWithCommentsSerializerResponse
+
+from .report import write_report
+
+SIZES = [int(size) for size in os.environ.get("BENCH_SERIALIZER_SIZES", "10,100,1000").split(",")]
+COMMENTS_PER_POST = int(os.environ.get("BENCH_COMMENTS_PER_POST", 3))
+REPEAT = int(os.environ.get("BENCH_SERIALIZER_REPEAT", 5))
+
+
+class SerializerBenchmark(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="benchuser", password="benchmark")
+
+    def seed(self, size):
+        Post.objects.filter(author=self.author).delete()
+        posts = Post.objects.bulk_create(
+            Post(author=self.author, title=f"Post {i}", content="x" * 200) for i in range(size)
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.author, content="comment")
+            for post in posts
+            for _ in range(COMMENTS_PER_POST)
+        )
+
+    def measure(self, size):
+        self.seed(size)
+        queryset = Post.objects.filter(author=self.author).order_by("id")
+
+        def default():
+            return PostWithCommentsSerializerResponse(
+                PostRepository.posts_with_comments().filter(author=self.author).order_by("id"),
+                many=True,
+            ).data
+
+        def fast():
+            return POST_WITH_COMMENTS_PLAN.render(POST_WITH_COMMENTS_PLAN.values(queryset))
+
+        self.assertEqual(JSONRenderer().render(fast()), JSONRenderer().render(default()))
+        number = max(1, 1000 // size)
+        default_time = min(timeit.repeat(default, number=number, repeat=REPEAT)) / number
+        fast_time = min(timeit.repeat(fast, number=number, repeat=REPEAT)) / number
+        return (f"{size:>6} rows  serializer {default_time * 1000:8.2f} ms  "
+                f"plan {fast_time * 1000:8.2f} ms  speedup {default_time / fast_time:5.1f}x")
+
+    def test_serializer_versus_field_plan(self):
+        write_report("serializers", [self.measure(size) for size in SIZES])
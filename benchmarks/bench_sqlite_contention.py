@@ -0,0 +1,134 @@
+"""Concurrent comment writes and post reads under each SQLite profile.
+
+Run with::
+
+    python manage.py test benchmarks.bench_sqlite_contention --pattern="bench_*.py"
+
+For every profile in ``BENCH_SQLITE_PROFILES`` (comma separated, default
+all of ``PROFILES``), a scratch SQLite file is seeded with
+``BENCH_CONTENTION_POSTS`` posts. ``BENCH_WRITERS`` threads then add
+comments and ``BENCH_READERS`` threads read posts, each thread doing
+``BENCH_CONTENTION_OPERATIONS`` operations. Throughput, p50/p95 latency
+and "database is locked" errors go to the ``sqlite_contention`` report.
+The ``concurrent`` profile must not drop any write.
+
+The scratch databases are added to ``connections`` for the duration of
+the run. That is why this is a plain ``unittest.TestCase``: Django's test
+cases refuse threaded connections to aliases they do not manage.
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.db.utils import ConnectionHandler
+
+from ApiDjangoRest.sqlite_backend.profiles import PROFILES, sqlite_database
+from principal.models import Comment, Post
+
+from .report import write_report
+
+SQLITE_PROFILES = os.environ.get("BENCH_SQLITE_PROFILES", ",".join(PROFILES)).split(",")
+WRITERS = int(os.environ.get("BENCH_WRITERS", 8))
+READERS = int(os.environ.get("BENCH_READERS", 8))
+OPERATIONS = int(os.environ.get("BENCH_CONTENTION_OPERATIONS", 200))
+POSTS = int(os.environ.get("BENCH_CONTENTION_POSTS", 50))
+
+
+class SQLiteContentionBenchmark(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp(prefix="sqlite-contention-"))
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def open_scratch(self, profile):
+        alias = f"contention_{profile}"
+        database = sqlite_database(self.directory / f"{profile}.sqlite3", profile)
+        # Fill in Django's defaults (AUTOCOMMIT, TIME_ZONE...) for the scratch alias.
+        connections.settings[alias] = ConnectionHandler(
+            {"default": database}).settings["default"]
+        self.addCleanup(connections.settings.pop, alias)
+        self.addCleanup(connections[alias].close)
+        return alias
+
+    def seed(self, alias):
+        with connections[alias].schema_editor() as editor:
+            for model in (User, Post, Comment):
+                editor.create_model(model)
+        author = User.objects.using(alias).create(username="benchmark-contention")
+        posts = [
+            Post.objects.using(alias).create(author=author, title=f"Post {i}", content="x" * 200)
+            for i in range(POSTS)
+        ]
+        return author, [post.pk for post in posts]
+
+    def run_profile(self, alias):
+        author, post_ids = self.seed(alias)
+        latencies = {"write": [], "read": []}
+        errors = {"write": 0, "read": 0}
+        lock = threading.Lock()
+
+        def write(i):
+            post_id = post_ids[i % len(post_ids)]
+            with transaction.atomic(using=alias):
+                comment = Comment.objects.using(alias).create(
+                    post_id=post_id, author=author, content=f"Comment {i}")
+                Post.objects.using(alias).filter(pk=post_id).update(
+                    comment_count=F("comment_count") + 1, last_comment_at=comment.created_at)
+
+        def read(i):
+            post_id = post_ids[i % len(post_ids)]
+            Post.objects.using(alias).get(pk=post_id)
+            list(Comment.objects.using(alias).filter(post_id=post_id)
+                 .order_by("-created_at", "-id")[:20])
+
+        def worker(kind, operation, offset):
+            for i in range(OPERATIONS):
+                start = time.perf_counter()
+                try:
+                    operation(offset + i)
+                except OperationalError:
+                    with lock:
+                        errors[kind] += 1
+                else:
+                    with lock:
+                        latencies[kind].append((time.perf_counter() - start) * 1000)
+                # End of a "request": non-persistent connections are closed here.
+                connections[alias].close_if_unusable_or_obsolete()
+            connections[alias].close()
+
+        threads = [
+            threading.Thread(target=worker, args=("write", write, n * OPERATIONS))
+            for n in range(WRITERS)
+        ] + [
+            threading.Thread(target=worker, args=("read", read, n))
+            for n in range(READERS)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors, time.perf_counter() - start
+
+    def test_contention_per_profile(self):
+        lines = []
+        for profile in SQLITE_PROFILES:
+            latencies, errors, elapsed = self.run_profile(self.open_scratch(profile))
+            for kind in ("write", "read"):
+                samples = sorted(latencies[kind]) or [0.0]
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                lines.append(
+                    f"{profile:<11} {kind:<5} {len(latencies[kind]) / elapsed:8.0f} ops/s  "
+                    f"p50 {statistics.median(samples):7.2f} ms  p95 {p95:7.2f} ms  "
+                    f"errors {errors[kind]}"
+                )
+            if profile == "concurrent":
+                self.assertEqual(errors["write"], 0)
+        write_report("sqlite_contention", lines)
@@ -0,0 +1,95 @@
+"""Wire size, CPU and peak memory of large JSON reads.
+
+Run with::
+
+    python manage.py test benchmarks.bench_streaming --pattern="bench_*.py"
+
+``GET /api/posts/`` (every post with its comments) is requested through
+three pipelines:
+
+- ``JSONRenderer``: the previous setup, one string built in memory;
+- ``streaming``: ``StreamingJSONRenderer`` without ``Accept-Encoding``;
+- ``streaming+gzip``: the same, negotiated to gzip.
+
+The body is consumed chunk by chunk and discarded, like a server writing to
+a socket. Reported per request: bytes sent, process CPU time, and the
+tracemalloc peak over the request and the body (measured in a separate
+request, since tracing distorts CPU time). The three rows go to the
+``streaming`` report.
+"""
+import os
+import statistics
+import time
+import tracemalloc
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from principal.models import Comment, Post
+from principal.views import PostGetAllView
+
+from .report import write_report
+
+ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", 10))
+POSTS = int(os.environ.get("BENCH_POSTS", 300))
+COMMENTS_PER_POST = int(os.environ.get("BENCH_COMMENTS_PER_POST", 10))
+
+
+class StreamingRenderBenchmark(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="benchuser", password="benchmark")
+        posts = Post.objects.bulk_create(
+            Post(author=cls.user, title=f"Post {i}", content=f"Seeded content {i} " * 20)
+            for i in range(POSTS)
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.user, content=f"Seeded comment {j} " * 5)
+            for post in posts
+            for j in range(COMMENTS_PER_POST)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def fetch(self, headers):
+        response = self.client.get(reverse("get_posts"), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return sum(len(chunk) for chunk in response.streaming_content)
+        return len(response.content)
+
+    def measure(self, **headers):
+        cpu = []
+        for _ in range(ITERATIONS):
+            start = time.process_time()
+            size = self.fetch(headers)
+            cpu.append((time.process_time() - start) * 1000)
+        # tracemalloc slows allocation down, so memory gets its own pass.
+        tracemalloc.start()
+        self.fetch(headers)
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+        return size, statistics.median(cpu), peak
+
+    def row(self, name, result):
+        size, cpu, peak = result
+        return f"{name:<16} bytes={size:>9} cpu_p50={cpu:7.1f}ms peak={peak:9.1f}KB"
+
+    def test_render_pipelines(self):
+        with mock.patch.object(PostGetAllView, "renderer_classes", [JSONRenderer]):
+            baseline = self.measure()
+        streaming = self.measure()
+        compressed = self.measure(accept_encoding="gzip")
+        write_report("streaming", [
+            self.row("JSONRenderer", baseline),
+            self.row("streaming", streaming),
+            self.row("streaming+gzip", compressed),
+        ])
+        self.assertEqual(streaming[0], baseline[0])
+        self.assertLess(compressed[0], baseline[0])
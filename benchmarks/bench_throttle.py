@@ -0,0 +1,80 @@
+"""Cost of the credential-endpoint throttle.
+
+Run with::
+
+    python manage.py test benchmarks.bench_throttle --pattern="bench_*.py"
+
+Reports the limiter's own time per check (the overhead every login,
+register and password-reset request pays), and the latency of a login
+rejected by the throttle next to one that goes through to hashing, in the
+``throttle_check`` and ``throttle_login`` reports.
+"""
+import os
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from authentication.throttling import auth_limiter
+
+from .report import write_report
+
+PASSWORD = "benchmark-password"
+ITERATIONS = int(os.environ.get("BENCH_ITERATIONS", 15))
+CHECKS = int(os.environ.get("BENCH_THROTTLE_CHECKS", 5000))
+RATES = {"login": {"ip": "1000000/min", "username": "1000000/min"}}
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"p50={statistics.median(samples):.3f}ms p95={p95:.3f}ms"
+
+
+class ThrottleOverheadBenchmark(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username="benchuser", password=PASSWORD)
+
+    def setUp(self):
+        auth_limiter.reset()
+        self.client = APIClient()
+
+    def test_limiter_check_overhead(self):
+        with self.settings(AUTH_THROTTLE_RATES=RATES):
+            samples = []
+            for i in range(CHECKS):
+                start = time.perf_counter()
+                auth_limiter.hit("login", "127.0.0.1", f"user{i % 100}")
+                samples.append((time.perf_counter() - start) * 1000)
+        write_report("throttle_check", [f"{'limiter check (ip + username)':<32} {summarize(samples)}"])
+
+    def test_rejected_versus_allowed_login(self):
+        body = {"username": "benchuser", "password": PASSWORD}
+        allowed = []
+        with self.settings(AUTH_THROTTLE_RATES=RATES):
+            for _ in range(ITERATIONS):
+                start = time.perf_counter()
+                response = self.client.post(reverse("login"), body, format="json")
+                allowed.append((time.perf_counter() - start) * 1000)
+                self.assertEqual(response.status_code, 200)
+
+        rejected = []
+        with self.settings(AUTH_THROTTLE_RATES={"login": {"username": "1/min"}}):
+            self.client.post(reverse("login"), body, format="json")
+            for _ in range(ITERATIONS):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = self.client.post(reverse("login"), body, format="json")
+                    rejected.append((time.perf_counter() - start) * 1000)
+                self.assertEqual(response.status_code, 429)
+                self.assertEqual(len(ctx.captured_queries), 0)
+        write_report("throttle_login", [
+            f"{'login allowed':<32} {summarize(allowed)}",
+            f"{'login rejected (429)':<32} {summarize(rejected)}",
+        ])
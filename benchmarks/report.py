@@ -0,0 +1,19 @@
+"""Where the benchmark modules write their numbers.
+
+Benchmarks run under the test runner, so instead of printing, each one
+writes a plain-text report to ``BENCH_REPORT_DIR`` (``benchmarks/reports/``
+by default), one file per benchmark.
+"""
+import os
+from pathlib import Path
+
+REPORT_DIR = Path(os.environ.get(
+    "BENCH_REPORT_DIR", Path(__file__).resolve().parent / "reports"))
+
+
+def write_report(name, lines):
+    """Write ``lines`` to ``<name>.txt`` in the report directory and return its path."""
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    path = REPORT_DIR / f"{name}.txt"
+    path.write_text("\n".join(lines) + "\n")
+    return path
@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def create_post_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from .search import install_post_search
+
+    install_post_search(connections[using])
 
 
 class PrincipalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'principal'
+
+    def ready(self):
+        from ApiDjangoRest.metrics import install_instrumentation, metrics_enabled
+
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(create_post_search_index, sender=self)
+        # Before any connection opens, so every one reports to the metrics.
+        if metrics_enabled():
+            install_instrumentation()
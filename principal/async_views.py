@@ -0,0 +1,157 @@
+"""Async variants of the blog read endpoints.
+
+Served natively under ASGI (``ApiDjangoRest/asgi.py``): the posts, their
+authors and comments are loaded with the async ORM (async iteration,
+``aget``, ``aprefetch_related_objects``), so the view itself is never
+wrapped in ``sync_to_async``. Responses match ``PostGetAllView`` and
+``GetPostView``, including ``pagination=cursor``, the conditional-GET
+validators and the ``fields``/``exclude`` sparse fieldsets. A cursor page
+is located by one ``sync_to_async`` call into DRF's paginator, the same
+thread hop the async ORM makes for every query.
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from authentication.authentication import CachedJWTAuthentication
+
+from .conditional import (
+    apost_validators,
+    not_modified_response,
+    page_validators,
+    set_validators,
+    with_validator_fields,
+)
+from .fast_serializers import FAST_PLANS
+from .fieldsets import narrow_serializer, requested_fields
+from .models import Post
+from .pagination import PostCursorPagination
+from .repositories.post_repository import PostRepository
+from .serializers import (
+    PostDetailSerializerResponse,
+    PostSummarySerializerResponse,
+    PostWithCommentsSerializerResponse,
+)
+from .views import embed_comments_link
+
+
+def _json(data, status=status.HTTP_200_OK):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+async def _authenticate(request):
+    """Return an error response, or ``None`` once ``request.user`` is set."""
+    try:
+        result = await CachedJWTAuthentication().aauthenticate(request, from_claims=True)
+    except AuthenticationFailed as e:
+        detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+        return _json(detail, status.HTTP_401_UNAUTHORIZED)
+    if result is None:
+        return _json(
+            {"detail": "Authentication credentials were not provided."},
+            status.HTTP_401_UNAUTHORIZED,
+        )
+    request.user = result[0]
+    return None
+
+
+async def _filter_posts(request):
+    """Apply the ``author`` and ``search`` filters of ``PostGetAllView``.
+
+    Returns ``(queryset, errors)``.
+    """
+    queryset = Post.objects.all()
+    author = request.GET.get("author")
+    if author:
+        if not author.isdigit() or not await User.objects.filter(pk=author).aexists():
+            return None, {"author": [
+                "Select a valid choice. That choice is not one of the available choices."]}
+        queryset = queryset.filter(author_id=author)
+    # SearchFilter semantics: every term must match the author's username.
+    for term in re.split(r"[\s,]+", request.GET.get("search", "").strip()):
+        if term:
+            queryset = queryset.filter(author__username__icontains=term)
+    return queryset, None
+
+
+@require_GET
+async def get_posts(request):
+    denied = await _authenticate(request)
+    if denied:
+        return denied
+    summary = request.GET.get("view") == "summary"
+    serializer_class = (
+        PostSummarySerializerResponse if summary else PostWithCommentsSerializerResponse)
+    try:
+        fields = requested_fields(request.GET, serializer_class)
+    except ValidationError as e:
+        return _json(e.detail, status.HTTP_400_BAD_REQUEST)
+    queryset, errors = await _filter_posts(request)
+    if errors:
+        return _json(errors, status.HTTP_400_BAD_REQUEST)
+
+    paginator = page_ids = None
+    if request.GET.get("pagination") == "cursor":
+        # Validate the page from its ids and timestamps, as PostGetAllView does.
+        paginator = PostCursorPagination()
+        try:
+            page = await sync_to_async(paginator.paginate_queryset)(
+                with_validator_fields(queryset), Request(request))
+        except NotFound as e:
+            return _json({"detail": e.detail}, status.HTTP_404_NOT_FOUND)
+        page_ids = [row["id"] for row in page]
+        etag, last_modified = page_validators(
+            page, paginator.get_next_link(), paginator.get_previous_link())
+        queryset = Post.objects.filter(pk__in=page_ids)
+    else:
+        etag, last_modified = await apost_validators(queryset)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    if fields is not None:
+        plan = FAST_PLANS[serializer_class].subset(fields)
+        posts = await PostRepository.alist_posts(
+            PostRepository.only_fields(queryset, plan), with_comments="comments" in plan.nested)
+    elif summary:
+        posts = await PostRepository.alist_posts(
+            queryset.select_related("author").defer("content"), with_comments=False)
+    else:
+        posts = await PostRepository.alist_posts(queryset.select_related("author"))
+    if paginator is not None:
+        position = {pk: index for index, pk in enumerate(page_ids)}
+        posts.sort(key=lambda post: position[post.pk])
+    data = narrow_serializer(serializer_class(posts, many=True), fields).data
+    if paginator is not None:
+        data = paginator.get_paginated_response(data).data
+    return set_validators(_json(data), etag, last_modified)
+
+
+@require_GET
+async def get_post(request, pk):
+    denied = await _authenticate(request)
+    if denied:
+        return denied
+    try:
+        fields = requested_fields(request.GET, PostDetailSerializerResponse)
+    except ValidationError as e:
+        return _json(e.detail, status.HTTP_400_BAD_REQUEST)
+    etag, last_modified = await apost_validators(Post.objects.filter(pk=pk))
+    if etag is None:
+        return _json({"message": "Post not found"}, status.HTTP_404_NOT_FOUND)
+    not_modified = not_modified_response(request, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    try:
+        data = embed_comments_link(request, await PostRepository.aget_post_detail(pk, fields))
+    except Post.DoesNotExist:
+        return _json({"message": "Post not found"}, status.HTTP_404_NOT_FOUND)
+    return set_validators(_json(data), etag, last_modified)
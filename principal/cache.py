@@ -0,0 +1,95 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from ApiDjangoRest.db_router import primary_reads
+
+
+class PostDetailCache:
+    """Read-through cache for serialized post detail responses.
+
+    Entries are keyed by post id and hold the serialized data. They are not
+    checked against the post on read: saving or deleting a post or comment
+    drops its entry through ``invalidate`` (``principal.signals``), and bulk
+    writes that send no signal call it themselves. Misses are loaded from the
+    primary: the cache is shared, so an entry filled from a lagging replica
+    right after an invalidation would serve the old post to everyone.
+    Eviction is delegated to the configured Django cache backend
+    (LocMemCache evicts least recently used entries once ``MAX_ENTRIES`` is
+    reached).
+    """
+
+    key_prefix = "post-detail"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[getattr(settings, "POST_DETAIL_CACHE_ALIAS", "default")]
+
+    @property
+    def timeout(self):
+        return getattr(settings, "POST_DETAIL_CACHE_TIMEOUT", 300)
+
+    def key(self, pk):
+        return f"{self.key_prefix}:{pk}"
+
+    def _count(self, data):
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+    def get(self, pk):
+        """Cached data for ``pk``, or ``None``; counted like ``get_or_set``."""
+        data = self.backend.get(self.key(pk))
+        self._count(data)
+        return data
+
+    async def aget(self, pk):
+        data = await self.backend.aget(self.key(pk))
+        self._count(data)
+        return data
+
+    def get_or_set(self, pk, loader):
+        data = self.get(pk)
+        if data is not None:
+            return data
+        with primary_reads():
+            data = loader()
+        self.backend.set(self.key(pk), data, self.timeout)
+        return data
+
+    async def aget_or_set(self, pk, loader):
+        """``get_or_set`` for async views; ``loader`` is a coroutine function."""
+        data = await self.aget(pk)
+        if data is not None:
+            return data
+        with primary_reads():
+            data = await loader()
+        await self.backend.aset(self.key(pk), data, self.timeout)
+        return data
+
+    def invalidate(self, pk):
+        # Drop the entry now and again once the surrounding transaction
+        # commits, so a reader cannot re-cache rows that are being replaced.
+        self.backend.delete(self.key(pk))
+        transaction.on_commit(lambda: self.backend.delete(self.key(pk)))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+post_detail_cache = PostDetailCache()
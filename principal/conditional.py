@@ -0,0 +1,92 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Comment
+
+
+def _aggregate(queryset):
+    return queryset.order_by(), dict(
+        n_posts=Count("id", distinct=True),
+        n_comments=Count("comments", distinct=True),
+        post_updated=Max("updated_at"),
+        comment_updated=Max("comments__updated_at"),
+    )
+
+
+def _validators(state, extra=()):
+    if not state["n_posts"]:
+        return None, None
+    last_modified = max(
+        dt for dt in (state["post_updated"], state["comment_updated"]) if dt is not None
+    )
+    fingerprint = "|".join([
+        *(str(state[key]) for key in ("n_posts", "n_comments", "post_updated", "comment_updated")),
+        *(str(value) for value in extra),
+    ])
+    etag = 'W/"%s"' % hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest()
+    return etag, last_modified
+
+
+def post_validators(queryset, *extra):
+    """Return ``(etag, last_modified)`` for a Post queryset in one aggregate query.
+
+    Counts are part of the ETag so deleting a post or comment changes it even
+    when no ``updated_at`` moves forward; ``extra`` values (such as a page's
+    links) are hashed in too. Returns ``(None, None)`` when the queryset is
+    empty.
+    """
+    queryset, aggregates = _aggregate(queryset)
+    return _validators(queryset.aggregate(**aggregates), extra)
+
+
+def with_validator_fields(queryset):
+    """``queryset`` as ``values()`` rows carrying what ``page_validators`` needs.
+
+    Each row holds the post's id, created_at and updated_at plus its comment
+    count and newest comment ``updated_at``, read from the comment index
+    per row, so a paginated page can be validated before any post or
+    comment is loaded in full.
+    """
+    comments = Comment.objects.filter(post=OuterRef("pk")).order_by().values("post")
+    return queryset.values("id", "created_at", "updated_at").annotate(
+        n_comments=Coalesce(Subquery(comments.annotate(n=Count("id")).values("n")), 0),
+        comment_updated=Subquery(comments.annotate(last=Max("updated_at")).values("last")),
+    )
+
+
+def page_validators(rows, *extra):
+    """``post_validators`` for rows from ``with_validator_fields``, with no query."""
+    state = {
+        "n_posts": len(rows),
+        "n_comments": sum(row["n_comments"] for row in rows),
+        "post_updated": max((row["updated_at"] for row in rows), default=None),
+        "comment_updated": max(
+            (row["comment_updated"] for row in rows if row["comment_updated"] is not None),
+            default=None),
+    }
+    return _validators(state, extra)
+
+
+async def apost_validators(queryset):
+    queryset, aggregates = _aggregate(queryset)
+    return _validators(await queryset.aaggregate(**aggregates))
+
+
+def not_modified_response(request, etag, last_modified):
+    """Return a 304 response if the request's validators still match, else None."""
+    if etag is None:
+        return None
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp())
+    )
+
+
+def set_validators(response, etag, last_modified):
+    if etag is not None:
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
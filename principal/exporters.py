@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+
+from rest_framework import serializers
+
+from principal.models import Comment, Post
+
+CSV_COLUMNS = [
+    "record", "id", "post", "author", "title", "content", "created_at", "updated_at",
+]
+
+_datetime = serializers.DateTimeField()
+
+
+def iter_posts_with_comments(chunk_size=2000):
+    """Yield posts with their comments, shaped like PostWithCommentsSerializerResponse.
+
+    Posts and comments are read through two server-side cursors ordered by
+    post id and merged here, so memory stays constant and each chunk of rows
+    costs one fetch per cursor regardless of how many posts are exported.
+    """
+    posts = (
+        Post.objects.order_by("id")
+        .values("id", "title", "content", "author__username", "created_at", "updated_at")
+        .iterator(chunk_size=chunk_size)
+    )
+    comments = (
+        Comment.objects.order_by("post_id", "created_at", "id")
+        .values("id", "content", "created_at", "updated_at", "post_id", "author_id")
+        .iterator(chunk_size=chunk_size)
+    )
+    comment = next(comments, None)
+    for post in posts:
+        # Skip comments whose post sorts before this one (deleted meanwhile).
+        while comment is not None and comment["post_id"] < post["id"]:
+            comment = next(comments, None)
+        post_comments = []
+        while comment is not None and comment["post_id"] == post["id"]:
+            post_comments.append({
+                "id": comment["id"],
+                "content": comment["content"],
+                "created_at": _datetime.to_representation(comment["created_at"]),
+                "updated_at": _datetime.to_representation(comment["updated_at"]),
+                "post": comment["post_id"],
+                "author": comment["author_id"],
+            })
+            comment = next(comments, None)
+        yield {
+            "id": post["id"],
+            "title": post["title"],
+            "content": post["content"],
+            "author_username": post["author__username"],
+            "created_at": _datetime.to_representation(post["created_at"]),
+            "updated_at": _datetime.to_representation(post["updated_at"]),
+            "comments": post_comments,
+        }
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def csv_lines(records):
+    """Flatten posts into CSV rows, each post followed by its comments."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(CSV_COLUMNS)
+    yield flush()
+    for record in records:
+        writer.writerow([
+            "post", record["id"], "", record["author_username"], record["title"],
+            record["content"], record["created_at"], record["updated_at"],
+        ])
+        for comment in record["comments"]:
+            writer.writerow([
+                "comment", comment["id"], comment["post"], comment["author"], "",
+                comment["content"], comment["created_at"], comment["updated_at"],
+            ])
+        yield flush()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv"),
+}
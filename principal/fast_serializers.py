@@ -0,0 +1,112 @@
+import copy
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework import serializers
+
+from ApiDjangoRest.metrics import timed
+
+from principal.models import Comment
+from principal.serializers import (
+    CommentSerializerResponse,
+    PostSummarySerializerResponse,
+    PostWithCommentsSerializerResponse,
+)
+
+
+def fast_serializers_enabled():
+    return getattr(settings, "FAST_READ_SERIALIZERS", False)
+
+
+class FieldPlan:
+    """Precompiled output plan for a read-only ModelSerializer.
+
+    The plan is derived once from the serializer's fields: every output key
+    maps to a ``values()`` lookup and, for fields whose representation is not
+    the raw database value (datetimes), to the bound field's
+    ``to_representation``. Rendering a row is then a dict comprehension with
+    no field binding, producing the same output as the serializer.
+    """
+
+    def __init__(self, serializer_class, sources=None, nested=None):
+        sources = sources or {}
+        self.nested = nested or {}
+        self.serializer_class = serializer_class
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if name in self.nested:
+                self.columns.append((name, None, None))
+                continue
+            lookup = sources.get(name, field.source)
+            convert = (
+                field.to_representation
+                if isinstance(field, (serializers.DateTimeField, serializers.DateField))
+                else None
+            )
+            self.columns.append((name, lookup, convert))
+        self.lookups = [lookup for _, lookup, _ in self.columns if lookup is not None]
+
+    def subset(self, names, required=()):
+        """Plan rendering only ``names`` (in this plan's order); ``None`` keeps all.
+
+        ``required`` lookups are loaded even when not rendered, e.g. the
+        ordering column a cursor paginator reads. ``id`` is always required
+        while a nested field is kept, since the nested rows are matched on it.
+        """
+        if names is None:
+            return self
+        plan = copy.copy(self)
+        plan.columns = [column for column in self.columns if column[0] in names]
+        plan.nested = {name: spec for name, spec in self.nested.items() if name in names}
+        plan.lookups = [lookup for _, lookup, _ in plan.columns if lookup is not None]
+        if plan.nested:
+            required = ("id", *required)
+        plan.lookups += [lookup for lookup in required if lookup not in plan.lookups]
+        return plan
+
+    def values(self, queryset):
+        return queryset.values(*self.lookups)
+
+    def render_row(self, row, nested_rows=None):
+        data = {}
+        for name, lookup, convert in self.columns:
+            if lookup is None:
+                data[name] = nested_rows.get(name, []) if nested_rows else []
+                continue
+            value = row[lookup]
+            data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+    @timed("serialize")
+    def render(self, rows):
+        rows = list(rows)
+        nested = defaultdict(dict)
+        for name, (plan, related_field, order_by) in self.nested.items():
+            ids = [row["id"] for row in rows]
+            grouped = defaultdict(list)
+            related = plan.serializer_class.Meta.model.objects.filter(
+                **{f"{related_field}__in": ids}).order_by(*order_by)
+            for child in plan.values(related):
+                grouped[child[related_field]].append(plan.render_row(child))
+            for pk, children in grouped.items():
+                nested[pk][name] = children
+        return [self.render_row(row, nested.get(row["id"])) for row in rows]
+
+
+COMMENT_PLAN = FieldPlan(CommentSerializerResponse)
+
+POST_WITH_COMMENTS_PLAN = FieldPlan(
+    PostWithCommentsSerializerResponse,
+    sources={"author_username": "author__username"},
+    nested={"comments": (COMMENT_PLAN, "post", ("post_id", "created_at", "id"))},
+)
+
+POST_SUMMARY_PLAN = FieldPlan(
+    PostSummarySerializerResponse,
+    sources={"author_username": "author__username"},
+)
+
+FAST_PLANS = {
+    PostWithCommentsSerializerResponse: POST_WITH_COMMENTS_PLAN,
+    PostSummarySerializerResponse: POST_SUMMARY_PLAN,
+}
@@ -0,0 +1,89 @@
+"""Sparse fieldsets for the blog read endpoints.
+
+``?fields=id,title`` keeps only the listed output fields and
+``?exclude=content`` drops the listed ones. The selection reaches the
+database too: ``only()`` loads just the columns behind the kept fields, the
+author join is skipped unless ``author_username`` is kept, and comments are
+not queried at all unless ``comments`` is.
+"""
+import re
+
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+
+FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        description="Comma-separated response fields to return, e.g. `id,title`",
+        required=False,
+        type=str,
+    ),
+    OpenApiParameter(
+        name="exclude",
+        description="Comma-separated response fields to leave out, e.g. `content,comments`",
+        required=False,
+        type=str,
+    ),
+]
+
+
+def _names(value):
+    return [name for name in re.split(r"[\s,]+", value or "") if name]
+
+
+def requested_fields(query_params, serializer_class):
+    """Output fields selected by ``?fields=``/``?exclude=``, or ``None`` for all.
+
+    Raises ``ValidationError`` for unknown names or an empty selection.
+    """
+    fields = _names(query_params.get("fields"))
+    exclude = _names(query_params.get("exclude"))
+    if not fields and not exclude:
+        return None
+    available = list(serializer_class().fields)
+    unknown = sorted(set(fields + exclude) - set(available))
+    if unknown:
+        raise ValidationError({"fields": [
+            f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}."]})
+    selected = [
+        name for name in available
+        if (not fields or name in fields) and name not in exclude
+    ]
+    if not selected:
+        raise ValidationError({"fields": ["Select at least one field."]})
+    return selected
+
+
+def narrow_serializer(serializer, fields):
+    """Drop the output fields of ``serializer`` (or its list child) not in ``fields``."""
+    if fields is not None:
+        target = getattr(serializer, "child", serializer)
+        for name in list(target.fields):
+            if name not in fields:
+                target.fields.pop(name)
+    return serializer
+
+
+def narrow_data(data, fields):
+    """Project an already-rendered representation onto ``fields``."""
+    if fields is None:
+        return data
+    return {name: value for name, value in data.items() if name in fields}
+
+
+class SparseFieldsMixin:
+    """``?fields=``/``?exclude=`` for generic views.
+
+    ``get_queryset`` should narrow itself with ``self.requested_fields()``;
+    the serializer output is narrowed here.
+    """
+
+    def requested_fields(self):
+        if not hasattr(self, "_requested_fields"):
+            self._requested_fields = requested_fields(
+                self.request.query_params, self.get_serializer_class())
+        return self._requested_fields
+
+    def get_serializer(self, *args, **kwargs):
+        return narrow_serializer(
+            super().get_serializer(*args, **kwargs), self.requested_fields())
@@ -0,0 +1,86 @@
+import json
+
+from django.db import transaction
+
+from principal.models import EXCERPT_LENGTH, Post
+from principal.serializers import PostSerializer
+
+MAX_REPORTED_ERRORS = 1000
+
+
+class PostImportReport:
+    def __init__(self):
+        self.lines = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line_number, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "lines": self.lines,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def import_posts_ndjson(lines, author, chunk_size=500, progress=None):
+    """Import posts from an iterable of NDJSON lines (bytes or str).
+
+    Lines are consumed lazily and written with ``bulk_create`` one chunk per
+    transaction, so memory stays bounded by ``chunk_size`` whatever the input
+    size. ``progress`` is called with the report after every chunk.
+    """
+    report = PostImportReport()
+    chunk = []
+    for line_number, raw in enumerate(lines, start=1):
+        report.lines = line_number
+        try:
+            line = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        except UnicodeDecodeError as e:
+            report.add_error(line_number, {"non_field_errors": [f"Invalid UTF-8: {e}"]})
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            report.add_error(line_number, {"non_field_errors": [f"Invalid JSON: {e}"]})
+            continue
+        if not isinstance(row, dict):
+            report.add_error(line_number, {"non_field_errors": ["Expected a JSON object"]})
+            continue
+        post_serializer = PostSerializer(data=row)
+        if not post_serializer.is_valid():
+            report.add_error(line_number, post_serializer.errors)
+            continue
+        chunk.append(post_serializer.validated_data)
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, author, report, progress)
+    if chunk:
+        _write_chunk(chunk, author, report, progress)
+    return report
+
+
+def _write_chunk(chunk, author, report, progress):
+    # bulk_create skips Post.save, so the excerpt is filled in here.
+    posts = [
+        Post(
+            author=author,
+            title=data["title"],
+            content=data["content"],
+            excerpt=data["content"][:EXCERPT_LENGTH],
+        )
+        for data in chunk
+    ]
+    with transaction.atomic():
+        Post.objects.bulk_create(posts)
+    report.imported += len(posts)
+    chunk.clear()
+    if progress is not None:
+        progress(report)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+from principal.models import EXCERPT_LENGTH, Comment, Post
+
+
+class Command(BaseCommand):
+    help = "Recompute comment_count, last_comment_at and excerpt for existing posts"
+
+    def handle(self, *args, **options):
+        comments = Comment.objects.filter(post=OuterRef("pk")).order_by().values("post")
+        with transaction.atomic():
+            updated = Post.objects.update(
+                comment_count=Coalesce(
+                    Subquery(comments.annotate(c=Count("id")).values("c")),
+                    Value(0),
+                    output_field=IntegerField(),
+                ),
+                last_comment_at=Subquery(
+                    comments.annotate(last=Max("created_at")).values("last")),
+                excerpt=Substr("content", 1, EXCERPT_LENGTH),
+            )
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} posts"))
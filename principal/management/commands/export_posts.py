@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from principal.exporters import EXPORT_FORMATS, iter_posts_with_comments
+
+
+class Command(BaseCommand):
+    help = "Stream every post with its comments as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="-", help="File path, '-' for stdout")
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        to_lines, _ = EXPORT_FORMATS[options["format"]]
+        lines = to_lines(iter_posts_with_comments(options["chunk_size"]))
+        if options["output"] == "-":
+            self.write_lines(self.stdout, lines)
+        else:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                self.write_lines(output, lines)
+
+    def write_lines(self, output, lines):
+        for line in lines:
+            output.write(line)
@@ -0,0 +1,40 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from principal.importers import import_posts_ndjson
+
+
+class Command(BaseCommand):
+    help = "Import posts from a newline-delimited JSON file ('-' reads stdin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--author", required=True, help="Username that will own the posts")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options["author"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['author']!r} does not exist")
+
+        def progress(report):
+            self.stdout.write(
+                f"line {report.lines}: {report.imported} imported, {report.failed} failed"
+            )
+
+        if options["path"] == "-":
+            report = import_posts_ndjson(
+                sys.stdin, author, options["chunk_size"], progress)
+        else:
+            with open(options["path"], encoding="utf-8") as lines:
+                report = import_posts_ndjson(
+                    lines, author, options["chunk_size"], progress)
+
+        for error in report.errors:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.imported} posts, {report.failed} failed"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from principal.search import fts_available, rebuild_post_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over post titles and content"
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING("Full-text search requires SQLite"))
+            return
+        rebuild_post_search()
+        self.stdout.write(self.style.SUCCESS("Post search index rebuilt"))
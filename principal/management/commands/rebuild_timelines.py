@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from ApiDjangoRest.db_router import primary_reads
+from principal.models import FeedAuthor, Follow, TimelineEntry
+from principal.repositories.feed_repository import FeedRepository
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute follower counts and fan-out modes from the follow graph and "
+        "rebuild every materialized home timeline"
+    )
+
+    def handle(self, *args, **options):
+        # Outside a request the router would spread these reads over the
+        # replicas; the rebuild must see the current follow graph and posts.
+        with primary_reads():
+            self.rebuild()
+
+    def rebuild(self):
+        threshold = getattr(settings, "FEED_FANOUT_ON_READ_FOLLOWERS", 10000)
+        counts = dict(
+            Follow.objects.order_by().values_list("followee").annotate(n=Count("id")))
+        following = {}
+        for follower_id, followee_id in Follow.objects.values_list("follower_id", "followee_id"):
+            following.setdefault(follower_id, []).append(followee_id)
+
+        with transaction.atomic():
+            FeedAuthor.objects.all().delete()
+            FeedAuthor.objects.bulk_create(
+                FeedAuthor(user_id=user_id, follower_count=n, fanout_on_read=n >= threshold)
+                for user_id, n in counts.items()
+            )
+            TimelineEntry.objects.all().delete()
+            for follower_id, followee_ids in following.items():
+                FeedRepository.backfill(
+                    follower_id, [pk for pk in followee_ids if counts[pk] < threshold])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(following)} timelines for {len(counts)} followed authors"))
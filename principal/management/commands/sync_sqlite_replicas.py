@@ -0,0 +1,39 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the local replica files"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "aliases", nargs="*",
+            help="Replica aliases to refresh (default: every SQLite alias besides default)",
+        )
+
+    def handle(self, *args, **options):
+        if connections["default"].vendor != "sqlite":
+            raise CommandError("The primary database is not SQLite")
+        aliases = options["aliases"] or [
+            alias for alias in settings.DATABASES
+            if alias != "default" and connections[alias].vendor == "sqlite"
+        ]
+        source = sqlite3.connect(settings.DATABASES["default"]["NAME"])
+        try:
+            for alias in aliases:
+                if alias not in settings.DATABASES:
+                    raise CommandError(f"Unknown database alias: {alias}")
+                connections[alias].close()
+                target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+                try:
+                    # The online backup API gives a consistent snapshot even
+                    # while the primary is being written to.
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(self.style.SUCCESS(f"{alias} synced from default"))
+        finally:
+            source.close()
@@ -1,23 +1,103 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+EXCERPT_LENGTH = 200
+
+
 class Post(models.Model):
-    author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexed by post_author_created_idx, which also serves author_id lookups.
+    author = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=255)
     content = models.TextField(max_length=1000)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default="")
+    comment_count = models.PositiveIntegerField(default=0)
+    last_comment_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="post_created_id_idx"),
+            # `?author=` filtering, in creation order for cursor pagination.
+            models.Index(fields=["author", "created_at"], name="post_author_created_idx"),
+        ]
     
+    def save(self, *args, **kwargs):
+        self.excerpt = self.content[:EXCERPT_LENGTH]
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "content" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "excerpt"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.title
 
 class Comment(models.Model):
-    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
+    # Indexed by comment_post_created_idx, which also serves post_id lookups.
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="comments", db_index=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
+
+    class Meta:
+        indexes = [
+            # A post's comments in creation order, and its count/latest
+            # comment aggregates, straight from the index. id breaks ties for
+            # the keyset pagination of /api/post/<pk>/comments/.
+            models.Index(fields=["post", "created_at", "id"], name="comment_post_created_idx"),
+        ]
+
     def __str__(self):
         return self.content
     
+
+class Follow(models.Model):
+    # Indexed by follow_unique on (follower, followee) for "who do I follow".
+    follower = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="following", db_index=False)
+    followee = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="followers", db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["follower", "followee"], name="follow_unique"),
+            models.CheckConstraint(
+                condition=~models.Q(follower=models.F("followee")), name="follow_not_self"),
+        ]
+        indexes = [
+            # An author's followers, read in batches when fanning out a post.
+            models.Index(fields=["followee", "follower"], name="follow_followee_idx"),
+        ]
+
+
+class FeedAuthor(models.Model):
+    """Follower count of an author and how their posts reach timelines.
+
+    Once ``follower_count`` reaches ``FEED_FANOUT_ON_READ_FOLLOWERS`` the
+    author switches to fan-out on read for good: later posts are merged into
+    feeds at read time instead of being copied to every follower's timeline.
+    """
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="feed_author")
+    follower_count = models.PositiveIntegerField(default=0)
+    fanout_on_read = models.BooleanField(default=False)
+
+
+class TimelineEntry(models.Model):
+    # Materialized home timeline: one row per (reader, post) fanned out on
+    # write. created_at is the post's, so a page of a feed is one range scan
+    # of timeline_user_created_idx.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_index=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"], name="timeline_user_post_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "created_at", "post"], name="timeline_user_created_idx"),
+        ]
@@ -0,0 +1,39 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PostCursorPagination(CursorPagination):
+    # Keyset pagination over (created_at, id), backed by the
+    # post_created_id_idx index. Avoids the COUNT(*) and OFFSET of page numbers.
+    ordering = ("-created_at", "-id")
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class CommentCursorPagination(CursorPagination):
+    # A post's comments oldest first, read from comment_post_created_idx on
+    # (post_id, created_at, id), so every page costs the same however many
+    # comments the post has.
+    ordering = ("created_at", "id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def first_page(self, rows, url):
+        """Split already-fetched leading rows into a page and the next link.
+
+        ``rows`` holds up to ``page_size + 1`` items in ``ordering``; the
+        extra item only signals that more follow. Returns ``(page, next)``
+        where ``next`` is ``url`` carrying the cursor of the following page,
+        or ``None``. Lets a parent resource embed the first page without
+        going through a request.
+        """
+        rows = list(rows)
+        self.base_url = url
+        self.cursor = None
+        self.page = rows[:self.page_size]
+        self.has_previous = False
+        self.has_next = len(rows) > self.page_size
+        self.next_position = (
+            self._get_position_from_instance(rows[-1], self.ordering) if self.has_next else None)
+        return self.page, self.get_next_link()
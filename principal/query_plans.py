@@ -0,0 +1,67 @@
+"""``EXPLAIN QUERY PLAN`` checks for the SQL issued by views and repositories.
+
+``QueryPlanCapture`` records every query run on a connection, like
+``CaptureQueriesContext``, and ``problems()`` lists the plan steps that
+read a whole table in storage order or sort through a temporary B-tree.
+Only SQLite plans are inspected.
+"""
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+PROBLEMS = (
+    # "SCAN principal_post" without an index; index walks and virtual
+    # tables ("SCAN t USING INDEX ...", "... VIRTUAL TABLE INDEX ...") pass.
+    re.compile(r"^SCAN \w+( LEFT-JOIN)?$"),
+    re.compile(r"^USE TEMP B-TREE FOR .*(ORDER|GROUP) BY"),
+)
+
+
+def explain(connection, sql):
+    """Return the detail column of SQLite's query plan for ``sql``."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def plan_problems(connection, sql, allow=()):
+    if connection.vendor != "sqlite" or not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+    allowed = {detail for pattern, detail in allow if re.search(pattern, sql, re.DOTALL)}
+    return [
+        detail for detail in explain(connection, sql)
+        if detail not in allowed and any(pattern.search(detail) for pattern in PROBLEMS)
+    ]
+
+
+class QueryPlanCapture(CaptureQueriesContext):
+    def problems(self, allow=()):
+        """``[(sql, detail), ...]`` for every offending plan step.
+
+        ``allow`` lists ``(sql_pattern, detail)`` pairs for plan steps that
+        are expected for this workload, such as the table scan of an
+        unpaginated export. A detail is only accepted in queries whose SQL
+        matches the paired regular expression.
+        """
+        found = []
+        for query in self.captured_queries:
+            for detail in plan_problems(self.connection, query["sql"], allow):
+                found.append((query["sql"], detail))
+        return found
+
+
+class QueryPlanAssertions:
+    """``TestCase`` mixin that checks the plans of one request's queries."""
+
+    def assert_indexed(self, method, url, data=None, allow=(), **extra):
+        with QueryPlanCapture(connection) as ctx:
+            response = getattr(self.client, method)(url, data, **extra)
+        self.assertLess(response.status_code, 400, url)
+        if getattr(response, "streaming", False):
+            with QueryPlanCapture(connection) as stream_ctx:
+                b"".join(response.streaming_content)
+            ctx.captured_queries.extend(stream_ctx.captured_queries)
+        self.assertEqual(ctx.problems(allow), [], f"{method.upper()} {url}")
+        return response
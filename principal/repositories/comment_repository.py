@@ -1,5 +1,13 @@
-from principal.serializers import Comment, CommentSerializer, CommentUpdateSerializer, CommentSerializerResponse
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, F, Max, Value, When
+from collections import Counter
+from principal.serializers import Comment, CommentSerializer, CommentUpdateSerializer, CommentSerializerResponse, CommentBulkItemSerializer
 from principal.models import User, Post  # Import Post model
+from principal.cache import post_detail_cache
+from ApiDjangoRest.db_router import pin_to_primary
+
+
+COUNTER_UPDATE_CHUNK = 200
 
 
 def error_formater(errors):
@@ -9,6 +17,10 @@ def error_formater(errors):
 
 
 class CommentRepository:
+    @staticmethod
+    def comments_for_post(pk: int):
+        return Comment.objects.filter(post_id=pk)
+
     @staticmethod
     def create_comment(comment_serializer: CommentSerializer, user: User):
         if not comment_serializer.is_valid():
@@ -16,19 +28,81 @@ class CommentRepository:
             raise ValueError(f"Invalid comment data: {error_messages}")
         post = comment_serializer.validated_data["post"]
         content = comment_serializer.validated_data["content"]
-        comment = Comment.objects.create(
-            author=user, post=post, content=content)
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                author=user, post_id=post, content=content)
+            Post.objects.filter(id=post).update(
+                comment_count=F("comment_count") + 1,
+                last_comment_at=comment.created_at,
+            )
+        pin_to_primary()
         return comment
 
+    @staticmethod
+    def bulk_create_comments(items: list, user: User):
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            item_serializer = CommentBulkItemSerializer(data=item)
+            if item_serializer.is_valid():
+                valid.append((index, item_serializer.validated_data))
+            else:
+                results[index] = {
+                    "index": index, "status": "error", "errors": item_serializer.errors}
+
+        existing = set(Post.objects.filter(
+            id__in={data["post"] for _, data in valid}).values_list("id", flat=True))
+        to_create = []
+        for index, data in valid:
+            if data["post"] in existing:
+                to_create.append((index, Comment(
+                    author=user, post_id=data["post"], content=data["content"])))
+            else:
+                results[index] = {
+                    "index": index, "status": "error",
+                    "errors": {"post": ["Post does not exist"]}}
+
+        if to_create:
+            with transaction.atomic():
+                created = Comment.objects.bulk_create(
+                    [comment for _, comment in to_create], batch_size=500)
+                counts = Counter(c.post_id for c in created)
+                last_comment_at = {}
+                for comment in created:
+                    last_comment_at[comment.post_id] = max(
+                        comment.created_at, last_comment_at.get(comment.post_id, comment.created_at))
+                # One UPDATE per chunk of posts, each post getting its own
+                # count and latest comment time; chunks keep the CASE
+                # parameters under SQLite's variable limit.
+                post_ids = list(counts)
+                for start in range(0, len(post_ids), COUNTER_UPDATE_CHUNK):
+                    chunk = post_ids[start:start + COUNTER_UPDATE_CHUNK]
+                    Post.objects.filter(id__in=chunk).update(
+                        comment_count=F("comment_count") + Case(
+                            *(When(id=pk, then=Value(counts[pk])) for pk in chunk)),
+                        last_comment_at=Case(
+                            *(When(id=pk, then=Value(last_comment_at[pk])) for pk in chunk),
+                            output_field=DateTimeField(),
+                        ),
+                    )
+                # bulk_create sends no post_save.
+                for post_id in counts:
+                    post_detail_cache.invalidate(post_id)
+            pin_to_primary()
+            for (index, _), comment in zip(to_create, created):
+                results[index] = {"index": index, "status": "created", "id": comment.id}
+        return results
+
     @staticmethod
     def update_comment(pk: int, request, update_data: CommentUpdateSerializer):
         if update_data.is_valid():
             try:
                 comment = Comment.objects.get(id=pk)
                 if comment is not None:
-                    if comment.author == request.user:
+                    if comment.author_id == request.user.id:
                         comment.content = update_data.validated_data["content"]
                         comment.save()
+                        pin_to_primary()
                         return comment
                     else:
                         raise ValueError("You can't update this comment")
@@ -41,8 +115,16 @@ class CommentRepository:
     def comment_delete(pk: int, request):
         try:
             comment = Comment.objects.get(id=pk)
-            if comment.author == request.user:
-                comment.delete()
+            if comment.author_id == request.user.id:
+                with transaction.atomic():
+                    comment.delete()
+                    remaining = Comment.objects.filter(post_id=comment.post_id).aggregate(
+                        count=Count("id"), last=Max("created_at"))
+                    Post.objects.filter(id=comment.post_id).update(
+                        comment_count=remaining["count"],
+                        last_comment_at=remaining["last"],
+                    )
+                pin_to_primary()
             else:
                 raise ValueError("You can't delete this comment")
         except Exception as e:
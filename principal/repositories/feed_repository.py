@@ -0,0 +1,143 @@
+import base64
+import binascii
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from principal.models import FeedAuthor, Follow, Post, TimelineEntry, User
+from ApiDjangoRest.db_router import pin_to_primary
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def encode_cursor(created_at, post_id):
+    return base64.urlsafe_b64encode(
+        f"{created_at.isoformat()}|{post_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """``(created_at, post_id)`` from ``encode_cursor``; ``ValueError`` if malformed."""
+    try:
+        created_at, post_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _before(queryset, cursor, post_field):
+    # Keyset condition (created_at, post) < cursor. The created_at bound is the
+    # index range; ties on the boundary timestamp are filtered within it.
+    if cursor is None:
+        return queryset
+    created_at, post_id = cursor
+    return queryset.filter(created_at__lte=created_at).exclude(
+        created_at=created_at, **{f"{post_field}__gte": post_id})
+
+
+class FeedRepository:
+    @staticmethod
+    def follow(follower: User, followee: User):
+        """Follow ``followee``; returns ``False`` if already following."""
+        with transaction.atomic():
+            _, created = Follow.objects.get_or_create(follower=follower, followee=followee)
+            if created:
+                FeedAuthor.objects.get_or_create(user=followee)
+                FeedAuthor.objects.filter(user=followee).update(
+                    follower_count=F("follower_count") + 1)
+                state = FeedAuthor.objects.get(user=followee)
+                threshold = _setting("FEED_FANOUT_ON_READ_FOLLOWERS", 10000)
+                if not state.fanout_on_read and state.follower_count >= threshold:
+                    FeedAuthor.objects.filter(user=followee).update(fanout_on_read=True)
+                elif not state.fanout_on_read:
+                    FeedRepository.backfill(follower.pk, [followee.pk])
+        pin_to_primary()
+        return created
+
+    @staticmethod
+    def unfollow(follower: User, followee: User):
+        """Stop following ``followee``; returns ``False`` if not following."""
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(follower=follower, followee=followee).delete()
+            if deleted:
+                FeedAuthor.objects.filter(user=followee).update(
+                    follower_count=F("follower_count") - 1)
+                TimelineEntry.objects.filter(
+                    user=follower, post__author=followee).delete()
+        pin_to_primary()
+        return bool(deleted)
+
+    @staticmethod
+    def backfill(user_id: int, author_ids):
+        """Copy the latest ``FEED_BACKFILL_POSTS`` posts of each author to a timeline."""
+        limit = _setting("FEED_BACKFILL_POSTS", 50)
+        entries = [
+            TimelineEntry(user_id=user_id, post_id=post_id, created_at=created_at)
+            for author_id in author_ids
+            for post_id, created_at in Post.objects.filter(author_id=author_id)
+            .order_by("-created_at", "-id").values_list("id", "created_at")[:limit]
+        ]
+        TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+    @staticmethod
+    def fan_out(post: Post):
+        """Copy ``post`` to its author's followers' timelines, in batches.
+
+        Returns the number of timelines written; 0 for authors on fan-out
+        on read, whose posts are merged at read time instead.
+        """
+        if FeedAuthor.objects.filter(user_id=post.author_id, fanout_on_read=True).exists():
+            return 0
+        size = _setting("FEED_FANOUT_BATCH_SIZE", 1000)
+        followers = (
+            Follow.objects.filter(followee_id=post.author_id)
+            .values_list("follower_id", flat=True).iterator(chunk_size=size)
+        )
+        written = 0
+        while batch := list(islice(followers, size)):
+            TimelineEntry.objects.bulk_create(
+                [TimelineEntry(user_id=user_id, post=post, created_at=post.created_at)
+                 for user_id in batch],
+                ignore_conflicts=True,
+            )
+            written += len(batch)
+        return written
+
+    @staticmethod
+    def feed_page(user_id: int, cursor=None, page_size=20):
+        """One page of the home feed of user ``user_id``, newest first.
+
+        Returns ``(posts, next_cursor)``. Timeline entries are one range scan
+        of ``timeline_user_created_idx``; posts of followed fan-out-on-read
+        authors are read from ``post_author_created_idx`` and merged in.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        entries = _before(
+            TimelineEntry.objects.filter(user_id=user_id), position, "post_id"
+        ).select_related("post__author").defer("post__content").order_by(
+            "-created_at", "-post_id")[:page_size + 1]
+        # Sort keys are the timeline's own (created_at, post) so the cursor
+        # matches the index even if an entry's timestamp differs from the post's.
+        keyed = [(entry.created_at, entry.post_id, entry.post) for entry in entries]
+
+        popular = list(Follow.objects.filter(
+            follower_id=user_id, followee__feed_author__fanout_on_read=True
+        ).values_list("followee_id", flat=True))
+        if popular:
+            merged = _before(
+                Post.objects.filter(author_id__in=popular), position, "id"
+            ).select_related("author").defer("content").order_by(
+                "-created_at", "-id")[:page_size + 1]
+            # Posts from before an author switched can be in both sources.
+            unique = {
+                key[1]: key for key in
+                [*((post.created_at, post.pk, post) for post in merged), *keyed]
+            }
+            keyed = sorted(unique.values(), key=lambda key: key[:2], reverse=True)
+
+        page = keyed[:page_size]
+        next_cursor = encode_cursor(*page[-1][:2]) if len(keyed) > page_size else None
+        return [post for _, _, post in page], next_cursor
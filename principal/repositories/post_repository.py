@@ -1,20 +1,182 @@
-from principal.models import Post
-from principal.serializers import PostSerializer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, aprefetch_related_objects
+from django.urls import reverse
+from principal.models import Post, Comment
+from principal.cache import post_detail_cache
+from principal.fieldsets import narrow_data, narrow_serializer
+from principal.fast_serializers import (
+    COMMENT_PLAN,
+    POST_WITH_COMMENTS_PLAN,
+    fast_serializers_enabled,
+)
+from principal.pagination import CommentCursorPagination
+from principal.repositories.feed_repository import FeedRepository
+from principal.serializers import PostSerializer, PostDetailSerializerResponse
 from principal.models import User
+from ApiDjangoRest.db_router import pin_to_primary
 
 
 class PostRepository:
+    @staticmethod
+    def comments_prefetch():
+        # Leading with post_id lets the IN (...) lookup read
+        # comment_post_created_idx in order instead of sorting.
+        return Prefetch(
+            "comments", queryset=Comment.objects.order_by("post_id", "created_at", "id"))
+
+    @staticmethod
+    def posts_with_comments():
+        # Author is joined and comments are loaded in one batched query so
+        # the cost of a page does not grow with the number of posts.
+        return Post.objects.select_related("author").prefetch_related(
+            PostRepository.comments_prefetch()
+        )
+
+    @staticmethod
+    def only_fields(queryset, plan):
+        """Load only the columns behind the fields ``plan`` renders.
+
+        The author is joined only for ``author_username``. Prefetches are
+        dropped; add the comments back when ``"comments" in plan.nested``.
+        """
+        queryset = queryset.select_related(None).prefetch_related(None).only(*plan.lookups)
+        if "author__username" in plan.lookups:
+            queryset = queryset.select_related("author")
+        return queryset
+
+    @staticmethod
+    def posts_with_fields(plan):
+        """Posts loading only what ``plan`` renders; comments only if nested."""
+        queryset = PostRepository.only_fields(Post.objects.all(), plan)
+        if "comments" in plan.nested:
+            queryset = queryset.prefetch_related(PostRepository.comments_prefetch())
+        return queryset
+
+    @staticmethod
+    async def alist_posts(queryset, with_comments=True):
+        """Evaluate ``queryset`` with the async ORM, then load the comments of
+        all posts in one async prefetch query."""
+        posts = [post async for post in queryset]
+        if with_comments:
+            await aprefetch_related_objects(posts, PostRepository.comments_prefetch())
+        return posts
+
+    @staticmethod
+    def post_summaries():
+        # Summaries read the denormalized counters instead of comment rows.
+        return Post.objects.select_related("author").defer("content")
+
+    @staticmethod
+    def get_post_with_comments(pk: int):
+        return PostRepository.posts_with_comments().get(pk=pk)
+
+    @staticmethod
+    def embedded_comments(pk: int):
+        """Paginator and query for the comments embedded in a post detail.
+
+        The query fetches one row past the page so ``first_page`` can tell
+        whether a cursor to the rest is needed. The ``comments_next`` link is
+        relative so the cached detail does not depend on the request host.
+        """
+        paginator = CommentCursorPagination()
+        paginator.page_size = getattr(
+            settings, "POST_DETAIL_EMBEDDED_COMMENTS", paginator.page_size)
+        comments = Comment.objects.filter(post_id=pk).order_by(
+            *paginator.ordering)[:paginator.page_size + 1]
+        return paginator, comments, reverse("post-comments", args=[pk])
+
+    @staticmethod
+    def _post_detail_plan(fields):
+        # comments_next is not a column of the plan; it comes with the comments.
+        plan = POST_WITH_COMMENTS_PLAN.subset(fields)
+        embed = fields is None or "comments" in fields or "comments_next" in fields
+        return plan, embed
+
+    @staticmethod
+    def _post_detail_queryset(plan, fields):
+        if fields is None:
+            return Post.objects.select_related("author")
+        return PostRepository.only_fields(Post.objects.all(), plan)
+
+    @staticmethod
+    def _load_post_detail(pk: int, fields=None):
+        plan, embed = PostRepository._post_detail_plan(fields)
+        paginator, comments, url = PostRepository.embedded_comments(pk)
+        if fast_serializers_enabled():
+            rows = list(plan.values(Post.objects.filter(pk=pk)))
+            if not rows:
+                raise Post.DoesNotExist
+            data = plan.render_row(rows[0])
+            if embed:
+                page, data["comments_next"] = paginator.first_page(
+                    COMMENT_PLAN.values(comments), url)
+                if "comments" in plan.nested:
+                    data["comments"] = [COMMENT_PLAN.render_row(row) for row in page]
+            return narrow_data(data, fields)
+        post = PostRepository._post_detail_queryset(plan, fields).get(pk=pk)
+        post.embedded_comments, post.comments_next = (
+            paginator.first_page(comments, url) if embed else ([], None))
+        return narrow_serializer(PostDetailSerializerResponse(post), fields).data
+
+    @staticmethod
+    def get_post_detail(pk: int, fields=None):
+        """Serialized post detail, narrowed to ``fields`` when given.
+
+        The cache only holds full details: a narrowed request is answered
+        from a cached one when present, else from a narrowed query that is
+        not cached.
+        """
+        if fields is None:
+            return post_detail_cache.get_or_set(
+                pk, lambda: PostRepository._load_post_detail(pk))
+        data = post_detail_cache.get(pk)
+        if data is None:
+            return PostRepository._load_post_detail(pk, fields)
+        return narrow_data(data, fields)
+
+    @staticmethod
+    async def _aload_post_detail(pk: int, fields=None):
+        plan, embed = PostRepository._post_detail_plan(fields)
+        post = await PostRepository._post_detail_queryset(plan, fields).aget(pk=pk)
+        post.embedded_comments, post.comments_next = [], None
+        if embed:
+            paginator, comments, url = PostRepository.embedded_comments(pk)
+            post.embedded_comments, post.comments_next = paginator.first_page(
+                [comment async for comment in comments], url)
+        return narrow_serializer(PostDetailSerializerResponse(post), fields).data
+
+    @staticmethod
+    async def aget_post_detail(pk: int, fields=None):
+        if fields is None:
+            return await post_detail_cache.aget_or_set(
+                pk, lambda: PostRepository._aload_post_detail(pk))
+        data = await post_detail_cache.aget(pk)
+        if data is None:
+            return await PostRepository._aload_post_detail(pk, fields)
+        return narrow_data(data, fields)
+
+    @staticmethod
+    def delete_post(post: Post):
+        post.delete()
+        pin_to_primary()
+
     @staticmethod
     def create_post(post_serializer: PostSerializer, user: User):
         if post_serializer.is_valid():
             title = post_serializer.validated_data["title"]
             content = post_serializer.validated_data["content"]
             try:
-                post = Post.objects.create(
-                    title=title, content=content, author=user)
-                return post
+                # A failed fan-out rolls the post back, so a retry cannot
+                # leave a duplicate behind.
+                with transaction.atomic():
+                    post = Post.objects.create(
+                        title=title, content=content, author=user)
+                    FeedRepository.fan_out(post)
             except Exception as e:
                 raise ValueError(str(e))
+            pin_to_primary()
+            return post
         else:
             raise ValueError("Invalid data")
 
@@ -24,7 +186,8 @@ class PostRepository:
             try:
                 post.title = update_data.validated_data["title"]
                 post.content = update_data.validated_data["content"]
-                post.save()
+                post.save(update_fields=["title", "content", "updated_at"])
+                pin_to_primary()
                 return post
             except Exception as e:
                 raise ValueError(str(e))
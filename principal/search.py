@@ -0,0 +1,98 @@
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from principal.models import Post
+
+FTS_TABLE = "principal_post_fts"
+# snippet() wraps matches in these control characters; the text is escaped
+# before they become <mark> tags, so post content never reaches the
+# response as markup.
+MATCH_START, MATCH_END = "\x02", "\x03"
+
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, content='principal_post', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON principal_post BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON principal_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, content ON principal_post BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content)
+        VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+
+def fts_available(using=connection):
+    return using.vendor == "sqlite"
+
+
+def install_post_search(using=connection):
+    """Create the FTS5 index and the triggers that keep it in sync with principal_post."""
+    if not fts_available(using):
+        return
+    with using.cursor() as cursor:
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement)
+
+
+def rebuild_post_search(using=connection):
+    install_post_search(using)
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query):
+    # Quote every term so user input cannot inject FTS5 query syntax.
+    terms = ['"%s"' % term.replace('"', '""') for term in query.split()]
+    return " ".join(terms)
+
+
+def highlight(snippet):
+    """HTML-escape ``snippet`` and turn the match delimiters into ``<mark>`` tags."""
+    return escape(snippet).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+def search_posts(query, limit=20):
+    """Return ``(post, rank, snippet)`` tuples ordered by BM25 relevance.
+
+    ``snippet`` is HTML: escaped post text with the matches in ``<mark>``.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return []
+    if not fts_available():
+        posts = Post.objects.select_related("author").filter(
+            Q(title__icontains=query) | Q(content__icontains=query))[:limit]
+        return [(post, None, escape(post.excerpt)) for post in posts]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid, bm25({FTS_TABLE}),
+                   snippet({FTS_TABLE}, -1, char(2), char(3), '...', 12)
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY bm25({FTS_TABLE})
+            LIMIT %s
+            """,
+            [expression, limit],
+        )
+        rows = cursor.fetchall()
+    posts = Post.objects.select_related("author").in_bulk([row[0] for row in rows])
+    return [(posts[pk], rank, highlight(snippet)) for pk, rank, snippet in rows if pk in posts]
@@ -28,6 +28,18 @@ class PostSerializerResponse(serializers.ModelSerializer):
         return obj.author.username
 
 
+class PostImportErrorSerializer(serializers.Serializer):
+    line = serializers.IntegerField()
+    errors = serializers.DictField()
+
+
+class PostImportReportSerializer(serializers.Serializer):
+    lines = serializers.IntegerField()
+    imported = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    errors = PostImportErrorSerializer(many=True)
+
+
 class CommentSerializer(serializers.ModelSerializer):
     post = serializers.IntegerField()
 
@@ -41,6 +53,34 @@ class CommentSerializer(serializers.ModelSerializer):
         return value
 
 
+class CommentBulkItemSerializer(serializers.ModelSerializer):
+    # Post existence is checked for the whole batch by CommentRepository.
+    post = serializers.IntegerField()
+
+    class Meta:
+        model = Comment
+        fields = ["content", "post"]
+
+
+class CommentBulkSerializer(serializers.Serializer):
+    comments = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=5000
+    )
+
+
+class CommentBulkResultSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=["created", "error"])
+    id = serializers.IntegerField(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class CommentBulkResponseSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    results = CommentBulkResultSerializer(many=True)
+
+
 class CommentUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -76,5 +116,52 @@ class PostWithCommentsSerializerResponse(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.ListField)
     def get_comments(self, obj):
-        comments = Comment.objects.filter(post=obj)
+        comments = obj.comments.all()
         return CommentSerializerResponse(comments, many=True).data
+
+
+class PostDetailSerializerResponse(PostWithCommentsSerializerResponse):
+    # Only the first page of comments is embedded; `comments_next` links to
+    # the rest on /api/post/<pk>/comments/ and is null once all are shown.
+    comments_next = serializers.CharField(allow_null=True, read_only=True)
+
+    class Meta(PostWithCommentsSerializerResponse.Meta):
+        fields = PostWithCommentsSerializerResponse.Meta.fields + ["comments_next"]
+
+    @extend_schema_field(CommentSerializerResponse(many=True))
+    def get_comments(self, obj):
+        return CommentSerializerResponse(obj.embedded_comments, many=True).data
+
+
+class PostSummarySerializerResponse(serializers.ModelSerializer):
+    author_username = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = [
+            "id",
+            "title",
+            "excerpt",
+            "author_username",
+            "comment_count",
+            "last_comment_at",
+            "created_at",
+            "updated_at",
+        ]
+
+    @extend_schema_field(serializers.CharField)
+    def get_author_username(self, obj):
+        return obj.author.username
+
+
+class PostSearchSerializerResponse(PostSummarySerializerResponse):
+    rank = serializers.FloatField(allow_null=True)
+    snippet = serializers.CharField()
+
+    class Meta(PostSummarySerializerResponse.Meta):
+        fields = PostSummarySerializerResponse.Meta.fields + ["rank", "snippet"]
+
+
+class FeedResponseSerializer(serializers.Serializer):
+    next = serializers.CharField(allow_null=True)
+    results = PostSummarySerializerResponse(many=True)
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import post_detail_cache
+from .models import Comment, Post
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def drop_cached_post_detail(sender, instance, created=False, **kwargs):
+    # Covers edits and deletes from the API, the admin, user cascades and
+    # queryset .delete(). bulk_create and .update() send no signal; their
+    # callers invalidate themselves.
+    if not created:
+        post_detail_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def drop_cached_post_detail_of_comment(sender, instance, **kwargs):
+    post_detail_cache.invalidate(instance.post_id)
@@ -1,3 +1,1371 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, redirect_stderr
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import DatabaseError, OperationalError, connection, connections
+from django.db.utils import ConnectionHandler
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ApiDjangoRest.metrics import PerformanceMetricsMiddleware, registry
+from ApiDjangoRest.streaming import StreamingJSONRenderer
+from ApiDjangoRest.sqlite_backend.base import DatabaseWrapper, _write_lock
+from ApiDjangoRest.sqlite_backend.profiles import sqlite_database
+
+from .cache import post_detail_cache
+from .query_plans import QueryPlanAssertions, QueryPlanCapture
+from .models import FeedAuthor, Follow, Post, Comment, TimelineEntry
+from .repositories.feed_repository import FeedRepository
+from .repositories.post_repository import PostRepository
+from .serializers import PostSerializer
+
+
+def create_posts(author, count, comments_per_post=2):
+    posts = []
+    for i in range(count):
+        post = Post.objects.create(
+            author=author, title=f"Post {i}", content=f"Content {i}")
+        for j in range(comments_per_post):
+            Comment.objects.create(
+                post=post, author=author, content=f"Comment {i}-{j}")
+        posts.append(post)
+    return posts
+
+
+class PostQueryCountTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_posts_list_query_count_does_not_grow_with_page_size(self):
+        create_posts(self.user, 2)
+        small, _ = self.count_queries(reverse("get_posts"))
+        create_posts(self.user, 10)
+        large, response = self.count_queries(reverse("get_posts"))
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data), 12)
+
+    def test_posts_list_keeps_response_shape(self):
+        post = create_posts(self.user, 1)[0]
+        _, response = self.count_queries(reverse("get_posts"))
+        item = response.data[0]
+        self.assertEqual(item["author_username"], "reader")
+        self.assertEqual(
+            [c["content"] for c in item["comments"]],
+            ["Comment 0-0", "Comment 0-1"],
+        )
+        self.assertEqual(item["comments"][0]["post"], post.id)
+
+    def test_post_detail_query_count_does_not_grow_with_comments(self):
+        post = create_posts(self.user, 1, comments_per_post=1)[0]
+        url = reverse("get_post", args=[post.id])
+        small, _ = self.count_queries(url)
+        for i in range(10):
+            Comment.objects.create(post=post, author=self.user, content=str(i))
+        post_detail_cache.invalidate(post.id)
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data["comments"]), 11)
+
+    def test_post_detail_not_found(self):
+        response = self.client.get(reverse("get_post", args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class PostCursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.other = User.objects.create_user(
+            username="writer", password="password123")
+        self.client.force_authenticate(self.user)
+
+    def collect_pages(self, url):
+        titles = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            titles.extend(item["title"] for item in response.data["results"])
+            url = response.data["next"]
+            pages += 1
+        return titles, pages
+
+    def test_cursor_pages_cover_all_posts_newest_first(self):
+        posts = create_posts(self.user, 25, comments_per_post=0)
+        titles, pages = self.collect_pages(
+            reverse("get_posts") + "?pagination=cursor")
+        self.assertEqual(pages, 3)
+        self.assertEqual(titles, [p.title for p in reversed(posts)])
+
+    def test_cursor_previous_link(self):
+        create_posts(self.user, 15, comments_per_post=0)
+        first = self.client.get(reverse("get_posts") + "?pagination=cursor")
+        second = self.client.get(first.data["next"])
+        self.assertIsNone(first.data["previous"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["results"], first.data["results"])
+
+    def test_cursor_pagination_with_author_filter_and_search(self):
+        create_posts(self.user, 5, comments_per_post=0)
+        create_posts(self.other, 12, comments_per_post=0)
+        titles, _ = self.collect_pages(
+            reverse("get_posts")
+            + f"?pagination=cursor&author={self.other.id}&page_size=5")
+        self.assertEqual(len(titles), 12)
+        titles, _ = self.collect_pages(
+            reverse("get_posts") + "?pagination=cursor&search=reader")
+        self.assertEqual(len(titles), 5)
+
+    def test_default_pagination_is_unchanged(self):
+        create_posts(self.user, 3, comments_per_post=0)
+        response = self.client.get(reverse("get_posts"))
+        self.assertEqual(len(response.data), 3)
+
+
+@override_settings(POST_DETAIL_EMBEDDED_COMMENTS=3)
+class PostCommentsPaginationTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.post = create_posts(self.user, 1, comments_per_post=8)[0]
+        comments = list(self.post.comments.order_by("id"))
+        # Tied timestamps straddling the embedded page must not be skipped.
+        Comment.objects.filter(pk__in=[c.pk for c in comments[2:5]]).update(
+            created_at=comments[2].created_at)
+        self.expected = [c.content for c in comments]
+
+    def collect(self, url):
+        contents = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            contents.extend(item["content"] for item in response.data["results"])
+            url = response.data["next"]
+        return contents
+
+    def test_detail_embeds_first_page_and_links_to_the_rest(self):
+        detail = self.client.get(reverse("get_post", args=[self.post.id])).data
+        self.assertEqual(
+            [c["content"] for c in detail["comments"]], self.expected[:3])
+        self.assertTrue(detail["comments_next"].startswith(
+            "http://testserver" + reverse("post-comments", args=[self.post.id])))
+        rest = self.collect(detail["comments_next"] + "&page_size=2")
+        self.assertEqual(rest, self.expected[3:])
+
+    def test_detail_without_more_comments_has_no_link(self):
+        with self.settings(POST_DETAIL_EMBEDDED_COMMENTS=8):
+            detail = self.client.get(reverse("get_post", args=[self.post.id])).data
+        self.assertEqual(len(detail["comments"]), 8)
+        self.assertIsNone(detail["comments_next"])
+
+    def test_pages_cover_all_comments_in_order(self):
+        url = reverse("post-comments", args=[self.post.id]) + "?page_size=3"
+        self.assertEqual(self.collect(url), self.expected)
+        with self.settings(FAST_READ_SERIALIZERS=True):
+            self.assertEqual(self.collect(url), self.expected)
+
+    def test_page_cost_does_not_grow_with_comments(self):
+        url = reverse("post-comments", args=[self.post.id]) + "?page_size=2"
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, content="More") for _ in range(200))
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_missing_post(self):
+        response = self.client.get(reverse("post-comments", args=[999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data, {"message": "Post not found"})
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.posts = create_posts(self.user, 4, comments_per_post=3)
+
+    def get_posts(self, query):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("get_posts") + query)
+        self.assertEqual(response.status_code, 200)
+        return response.data, [q["sql"] for q in ctx.captured_queries]
+
+    def test_fields_narrow_output_and_columns(self):
+        data, queries = self.get_posts("?fields=id,title")
+        self.assertEqual([list(item) for item in data], [["id", "title"]] * 4)
+        # Validators, then only the post columns: no author join, no comments.
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"content"', queries[1])
+        self.assertNotIn("auth_user", queries[1])
+
+    def test_exclude_and_comments_prefetch(self):
+        data, queries = self.get_posts("?exclude=content,comments")
+        self.assertEqual(
+            list(data[0]), ["id", "title", "author_username", "created_at", "updated_at"])
+        self.assertEqual(len(queries), 2)
+        data, queries = self.get_posts("?fields=title,comments")
+        self.assertEqual(len(data[0]["comments"]), 3)
+        self.assertEqual(len(queries), 3)
+
+    def test_summary_and_cursor_pages(self):
+        data, _ = self.get_posts("?view=summary&fields=title,comment_count")
+        self.assertEqual(list(data[0]), ["title", "comment_count"])
+        titles = []
+        url = reverse("get_posts") + "?pagination=cursor&page_size=3&fields=title"
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            titles.extend(item["title"] for item in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(titles, [f"Post {i}" for i in range(3, -1, -1)])
+
+    def test_fast_serializers_match(self):
+        for url in (reverse("get_posts") + "?fields=title,comments",
+                    reverse("get_posts") + "?pagination=cursor&page_size=2&exclude=comments",
+                    reverse("get_post", args=[self.posts[0].id]) + "?fields=title,comments_next",
+                    reverse("post-comments", args=[self.posts[0].id]) + "?fields=content"):
+            default = self.client.get(url)
+            with self.settings(FAST_READ_SERIALIZERS=True):
+                fast = self.client.get(url)
+            self.assertEqual(fast.content, default.content, url)
+
+    def test_post_detail(self):
+        url = reverse("get_post", args=[self.posts[0].id])
+        # Uncached: a narrowed query that leaves the cache alone.
+        with self.assertNumQueries(2):
+            narrowed = self.client.get(url + "?fields=id,title").data
+        self.assertEqual(narrowed, {"id": self.posts[0].id, "title": "Post 0"})
+        self.assertIsNone(post_detail_cache.backend.get(post_detail_cache.key(self.posts[0].id)))
+        full = self.client.get(url).data
+        # Cached: projected from the full detail without loading the post.
+        with self.assertNumQueries(1):
+            cached = self.client.get(url + "?exclude=content").data
+        self.assertEqual(cached, {k: v for k, v in full.items() if k != "content"})
+
+    def test_comments_endpoint(self):
+        response = self.client.get(
+            reverse("post-comments", args=[self.posts[0].id]) + "?fields=content&page_size=2")
+        self.assertEqual(response.data["results"], [
+            {"content": "Comment 0-0"}, {"content": "Comment 0-1"}])
+        self.assertEqual(len(self.client.get(response.data["next"]).data["results"]), 1)
+
+    def test_unknown_fields_are_rejected(self):
+        for url in (reverse("get_posts") + "?fields=title,secret",
+                    reverse("get_post", args=[self.posts[0].id]) + "?exclude=secret",
+                    reverse("post-comments", args=[self.posts[0].id]) + "?fields=secret"):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn("fields", response.data)
+        response = self.client.get(reverse("get_posts") + "?fields=title&exclude=title")
+        self.assertEqual(response.status_code, 400)
+
+    def test_schema_documents_parameters(self):
+        # Silence drf-spectacular's warnings about views outside this change.
+        with redirect_stderr(StringIO()):
+            response = self.client.get(reverse("schema") + "?format=json")
+        paths = json.loads(response.content)["paths"]
+        for path in ("/api/posts/", "/api/post/{id}/get/", "/api/post/{id}/comments/"):
+            names = {p["name"] for p in paths[path]["get"]["parameters"]}
+            self.assertLessEqual({"fields", "exclude"}, names, path)
+
+
+class PostCommentCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            author=self.user, title="Title", content="x" * 500)
+
+    def test_comment_create_and_delete_keep_counters_in_sync(self):
+        first = self.client.post(
+            reverse("comment-create"), {"content": "one", "post": self.post.id})
+        self.assertEqual(first.status_code, 201)
+        second = self.client.post(
+            reverse("comment-create"), {"content": "two", "post": self.post.id})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(
+            self.post.last_comment_at,
+            Comment.objects.get(id=second.data["id"]).created_at)
+
+        self.client.delete(reverse("comment-delete", args=[second.data["id"]]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(
+            self.post.last_comment_at,
+            Comment.objects.get(id=first.data["id"]).created_at)
+
+    def test_summary_view_returns_counts_and_excerpt(self):
+        self.client.post(
+            reverse("comment-create"), {"content": "one", "post": self.post.id})
+        response = self.client.get(reverse("get_posts") + "?view=summary")
+        item = response.data[0]
+        self.assertNotIn("comments", item)
+        self.assertNotIn("content", item)
+        self.assertEqual(item["comment_count"], 1)
+        self.assertEqual(item["excerpt"], "x" * 200)
+
+    def test_backfill_command(self):
+        Comment.objects.create(post=self.post, author=self.user, content="a")
+        Comment.objects.create(post=self.post, author=self.user, content="b")
+        Post.objects.update(comment_count=0, last_comment_at=None, excerpt="")
+        call_command("backfill_post_counters", stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertIsNotNone(self.post.last_comment_at)
+        self.assertEqual(self.post.excerpt, "x" * 200)
+
+
+class PostDetailCacheTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        post_detail_cache.reset_stats()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            author=self.user, title="Title", content="Content")
+        self.url = reverse("get_post", args=[self.post.id])
+
+    def test_repeat_reads_are_served_from_cache(self):
+        self.client.get(self.url)
+        # Only the validator aggregate runs on a cache hit.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["title"], "Title")
+        self.assertEqual(post_detail_cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_post_update_invalidates(self):
+        self.client.get(self.url)
+        self.client.put(
+            reverse("update_post", args=[self.post.id]),
+            {"title": "New title", "content": "Content"})
+        self.assertEqual(self.client.get(self.url).data["title"], "New title")
+
+    def test_comment_mutations_invalidate(self):
+        self.client.get(self.url)
+        created = self.client.post(
+            reverse("comment-create"), {"content": "one", "post": self.post.id})
+        self.assertEqual(len(self.client.get(self.url).data["comments"]), 1)
+
+        self.client.put(
+            reverse("comment-update", args=[created.data["id"]]),
+            {"content": "edited"})
+        comments = self.client.get(self.url).data["comments"]
+        self.assertEqual(comments[0]["content"], "edited")
+
+        self.client.delete(reverse("comment-delete", args=[created.data["id"]]))
+        self.assertEqual(self.client.get(self.url).data["comments"], [])
+
+    def test_post_delete_invalidates(self):
+        self.client.get(self.url)
+        self.client.delete(reverse("delete_post", args=[self.post.id]))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_deletes_outside_the_api_invalidate(self):
+        async_url = reverse("async-get-post", args=[self.post.id])
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(
+            self.client.get(async_url, HTTP_AUTHORIZATION=f"Bearer {token}").status_code, 404)
+
+        other = User.objects.create_user(username="other", password="password123")
+        post = Post.objects.create(author=other, title="Theirs", content="Content")
+        url = reverse("get_post", args=[post.id])
+        self.client.get(url)
+        other.delete()
+        self.assertIsNone(post_detail_cache.backend.get(post_detail_cache.key(post.id)))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_missing_post_is_not_served_from_cache(self):
+        # An entry left behind by a write that bypassed the signals.
+        self.client.get(self.url)
+        Post.objects.filter(pk=self.post.pk)._raw_delete(connection.alias)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_stats_endpoint_requires_admin(self):
+        response = self.client.get(reverse("post_cache_stats"))
+        self.assertEqual(response.status_code, 403)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.post = create_posts(self.user, 1, comments_per_post=1)[0]
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(cached.status_code, 304)
+        return etag
+
+    def test_post_detail_returns_304_until_a_comment_changes(self):
+        url = reverse("get_post", args=[self.post.id])
+        etag = self.assert_revalidates(url)
+        comment = self.post.comments.get()
+        self.client.delete(reverse("comment-delete", args=[comment.id]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["comments"], [])
+
+    def test_posts_list_returns_304_until_a_post_is_added(self):
+        url = reverse("get_posts")
+        etag = self.assert_revalidates(url)
+        create_posts(self.user, 1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+
+    def test_cursor_pages_validate_their_own_rows(self):
+        create_posts(self.user, 2, comments_per_post=1)
+        url = reverse("get_posts") + "?pagination=cursor&page_size=1"
+        first = self.client.get(url)
+        second = self.client.get(first.data["next"])
+        self.assertNotEqual(first["ETag"], second["ETag"])
+        # Only the page's ids, timestamps and comment counts are read; the
+        # posts and their comments are not loaded for a 304.
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        # A change outside the page leaves it valid; a change on it does not.
+        self.post.comments.update(content="Edited", updated_at=timezone.now())
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        page_post = Post.objects.get(pk=first.data["results"][0]["id"])
+        page_post.comments.update(content="Edited", updated_at=timezone.now())
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+
+class PostSearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.title_hit = Post.objects.create(
+            author=self.user, title="Tuning sqlite", content="Notes on pragmas")
+        self.content_hit = Post.objects.create(
+            author=self.user, title="Other", content="We moved away from sqlite")
+        Post.objects.create(author=self.user, title="Unrelated", content="Nothing")
+
+    def search(self, q):
+        response = self.client.get(reverse("search_posts"), {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_search_matches_title_and_content_with_snippets(self):
+        results = self.search("sqlite")
+        self.assertEqual(
+            {r["id"] for r in results}, {self.title_hit.id, self.content_hit.id})
+        self.assertTrue(all("<mark>sqlite</mark>" in r["snippet"] for r in results))
+
+    def test_snippets_escape_post_content(self):
+        Post.objects.create(
+            author=self.user, title="Payload",
+            content='<script>alert("x")</script> sqlite <b onmouseover="x">bold</b>')
+        snippet = next(r["snippet"] for r in self.search("sqlite") if r["title"] == "Payload")
+        self.assertNotIn("<script>", snippet)
+        self.assertNotIn("<b ", snippet)
+        self.assertIn("&lt;script&gt;", snippet)
+        self.assertIn("<mark>sqlite</mark>", snippet)
+
+    def test_index_follows_updates_and_deletes(self):
+        self.title_hit.title = "Tuning postgres"
+        self.title_hit.save()
+        self.content_hit.delete()
+        self.assertEqual(self.search("sqlite"), [])
+        self.assertEqual([r["id"] for r in self.search("postgres")], [self.title_hit.id])
+
+    def test_query_syntax_is_escaped(self):
+        self.assertEqual(self.search('"NEAR( OR'), [])
+
+    def test_missing_query(self):
+        response = self.client.get(reverse("search_posts"))
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_command(self):
+        call_command("rebuild_post_search", stdout=StringIO())
+        self.assertEqual(len(self.search("sqlite")), 2)
+
+
+class CommentBulkCreateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.posts = create_posts(self.user, 3, comments_per_post=0)
+
+    def bulk(self, comments):
+        return self.client.post(
+            reverse("comment-bulk-create"), {"comments": comments}, format="json")
+
+    def test_per_item_results_and_counters(self):
+        response = self.bulk([
+            {"content": "a", "post": self.posts[0].id},
+            {"content": "b", "post": 999},
+            {"post": self.posts[1].id},
+            {"content": "c", "post": self.posts[0].id},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(
+            [r["status"] for r in response.data["results"]],
+            ["created", "error", "error", "created"])
+        self.assertIn("post", response.data["results"][1]["errors"])
+        self.assertIn("content", response.data["results"][2]["errors"])
+        self.posts[0].refresh_from_db()
+        self.assertEqual(self.posts[0].comment_count, 2)
+
+    def test_last_comment_at_is_per_post(self):
+        self.bulk([
+            {"content": "a", "post": self.posts[0].id},
+            {"content": "b", "post": self.posts[1].id},
+            {"content": "c", "post": self.posts[1].id},
+            {"content": "d", "post": self.posts[0].id},
+            {"content": "e", "post": self.posts[2].id},
+        ])
+        for post in self.posts:
+            post.refresh_from_db()
+            self.assertEqual(
+                post.last_comment_at, post.comments.latest("created_at").created_at)
+        self.assertEqual(
+            [post.comment_count for post in self.posts], [2, 2, 1])
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def items(n):
+            return [{"content": str(i), "post": self.posts[i % 3].id} for i in range(n)]
+
+        with CaptureQueriesContext(connection) as small:
+            self.bulk(items(3))
+        # Stay within one SQLite insert batch (999 variables).
+        with CaptureQueriesContext(connection) as large:
+            self.bulk(items(150))
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(Comment.objects.count(), 153)
+
+    def test_all_invalid_returns_400(self):
+        response = self.bulk([{"content": "a", "post": 999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["failed"], 1)
+
+
+class PostImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+
+    def ndjson(self, rows):
+        return "\n".join(rows) + "\n"
+
+    def test_import_endpoint_reports_per_line_errors(self):
+        body = self.ndjson([
+            '{"title": "One", "content": "First"}',
+            '{"content": "no title"}',
+            "not json",
+            "",
+            '{"title": "Two", "content": "Second"}',
+        ])
+        response = self.client.post(
+            reverse("post-import") + "?chunk_size=1",
+            data=body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["imported"], 2)
+        self.assertEqual([e["line"] for e in response.data["errors"]], [2, 3])
+        self.assertEqual(
+            list(Post.objects.order_by("id").values_list("title", "author")),
+            [("One", self.user.id), ("Two", self.user.id)])
+        self.assertEqual(Post.objects.get(title="One").excerpt, "First")
+
+    def test_badly_encoded_line_is_a_line_error(self):
+        body = b'{"title": "One", "content": "First"}\n{"title": "\xff"}\n' \
+            b'{"title": "Two", "content": "Second"}\n'
+        response = self.client.post(
+            reverse("post-import"), data=body, content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["imported"], 2)
+        self.assertEqual([e["line"] for e in response.data["errors"]], [2])
+        self.assertIn("Invalid UTF-8", response.data["errors"][0]["errors"]["non_field_errors"][0])
+
+    def test_import_command_writes_in_chunks(self):
+        path = self.temp_dir() / "posts.ndjson"
+        path.write_text(self.ndjson(
+            [f'{{"title": "T{i}", "content": "C{i}"}}' for i in range(7)]))
+        out = StringIO()
+        call_command(
+            "import_posts", str(path), author="reader", chunk_size=3, stdout=out)
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertIn("line 3: 3 imported", out.getvalue())
+        self.assertIn("Imported 7 posts, 0 failed", out.getvalue())
+
+    def temp_dir(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        return directory
+
+
+class PostExportTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.admin = User.objects.create_superuser(
+            username="admin", password="password123")
+        self.client.force_authenticate(self.admin)
+        self.posts = create_posts(self.admin, 3, comments_per_post=2)
+        Post.objects.create(author=self.admin, title="Quiet", content="No comments")
+
+    def export(self, output):
+        response = self.client.get(reverse("export_posts"), {"output": output})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_matches_post_detail_representation(self):
+        lines = [json.loads(line) for line in self.export("ndjson").splitlines()]
+        self.assertEqual(len(lines), 4)
+        detail = json.loads(
+            self.client.get(reverse("get_post", args=[self.posts[1].id])).content)
+        # The export carries every comment; the detail links to the rest.
+        self.assertIsNone(detail.pop("comments_next"))
+        self.assertEqual(lines[1], detail)
+        self.assertEqual(lines[3]["comments"], [])
+
+    def test_csv_lists_each_post_followed_by_its_comments(self):
+        rows = list(csv.reader(StringIO(self.export("csv"))))
+        self.assertEqual(rows[0][:2], ["record", "id"])
+        self.assertEqual(
+            [row[0] for row in rows[1:]],
+            ["post", "comment", "comment"] * 3 + ["post"])
+
+    def test_query_count_is_fixed(self):
+        with self.assertNumQueries(2):
+            self.export("ndjson")
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(
+            User.objects.create_user(username="reader", password="password123"))
+        response = self.client.get(reverse("export_posts"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_command(self):
+        out = StringIO()
+        call_command("export_posts", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+
+class FastSerializerTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.posts = create_posts(self.user, 12, comments_per_post=2)
+        Post.objects.create(author=self.user, title="Quiet", content="No comments")
+
+    def assert_same_bytes(self, url):
+        default = self.client.get(url)
+        post_detail_cache.backend.clear()
+        with self.settings(FAST_READ_SERIALIZERS=True):
+            fast = self.client.get(url)
+        self.assertEqual(default.status_code, 200)
+        self.assertEqual(fast.content, default.content)
+
+    def test_posts_list_is_byte_identical(self):
+        self.assert_same_bytes(reverse("get_posts"))
+        self.assert_same_bytes(reverse("get_posts") + "?view=summary")
+        self.assert_same_bytes(
+            reverse("get_posts") + f"?author={self.user.id}&search=reader")
+
+    def test_cursor_pages_are_byte_identical(self):
+        url = reverse("get_posts") + "?pagination=cursor&page_size=5"
+        self.assert_same_bytes(url)
+        next_url = self.client.get(url).data["next"]
+        self.assert_same_bytes(next_url)
+
+    def test_post_detail_is_byte_identical(self):
+        self.assert_same_bytes(reverse("get_post", args=[self.posts[3].id]))
+
+    def test_post_detail_not_found(self):
+        with self.settings(FAST_READ_SERIALIZERS=True):
+            response = self.client.get(reverse("get_post", args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        self.posts = create_posts(self.user, 5, comments_per_post=3)
+
+    def assert_same_bytes(self, sync_url, async_url):
+        expected = self.client.get(sync_url)
+        post_detail_cache.backend.clear()
+        response = self.client.get(async_url)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get("ETag"), expected.get("ETag"))
+        return response
+
+    def test_posts_list_matches_sync_view(self):
+        for query in ("", "?view=summary", f"?author={self.user.id}&search=read", "?search=x"):
+            self.assert_same_bytes(
+                reverse("get_posts") + query, reverse("async-get-posts") + query)
+
+    def test_cursor_pages_match_sync_view(self):
+        query = "?pagination=cursor&page_size=2&view=summary"
+        sync_page = self.client.get(reverse("get_posts") + query)
+        async_page = self.client.get(reverse("async-get-posts") + query)
+        pages = 0
+        while sync_page is not None:
+            pages += 1
+            self.assertEqual(async_page.status_code, 200)
+            self.assertEqual(json.loads(async_page.content)["results"],
+                             json.loads(sync_page.content)["results"])
+            with self.assertNumQueries(1):
+                cached = self.client.get(
+                    async_page.wsgi_request.get_full_path(),
+                    HTTP_IF_NONE_MATCH=async_page["ETag"])
+            self.assertEqual(cached.status_code, 304)
+            sync_next = json.loads(sync_page.content)["next"]
+            async_next = json.loads(async_page.content)["next"]
+            self.assertEqual(async_next is None, sync_next is None)
+            sync_page = sync_next and self.client.get(sync_next)
+            async_page = async_next and self.client.get(async_next)
+        self.assertEqual(pages, 3)
+        response = self.client.get(reverse("async-get-posts") + "?pagination=cursor&cursor=bad")
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_detail_matches_sync_view(self):
+        pk = self.posts[2].id
+        self.assert_same_bytes(
+            reverse("get_post", args=[pk]), reverse("async-get-post", args=[pk]))
+        response = self.client.get(reverse("async-get-post", args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_sparse_fieldsets_match_sync_view(self):
+        for query in ("?fields=id,title", "?exclude=content,comments",
+                      "?view=summary&fields=title,comment_count", "?fields=nope"):
+            self.assert_same_bytes(
+                reverse("get_posts") + query, reverse("async-get-posts") + query)
+        pk = self.posts[2].id
+        for query in ("?fields=title,comments", "?exclude=comments,comments_next"):
+            self.assert_same_bytes(
+                reverse("get_post", args=[pk]) + query,
+                reverse("async-get-post", args=[pk]) + query)
+
+    def test_comments_are_prefetched_in_one_query(self):
+        url = reverse("async-get-posts")
+        self.client.get(url)
+        create_posts(self.user, 5, comments_per_post=3)
+        # Validators, posts with authors, then every post's comments.
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(json.loads(response.content)), 10)
+
+    def test_conditional_get_and_authentication(self):
+        url = reverse("async-get-posts")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.client.credentials()
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer invalid")
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+
+class StreamingJSONTests(APITestCase):
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(
+            username="reader", password="password123")
+        self.client.force_authenticate(self.user)
+        self.posts = create_posts(self.user, 6, comments_per_post=3)
+        self.url = reverse("get_posts")
+
+    def body(self, response):
+        if response.streaming:
+            content = b"".join(response.streaming_content)
+        else:
+            content = response.content
+        if response.get("Content-Encoding") == "gzip":
+            content = gzip.decompress(content)
+        return content
+
+    def test_renderer_matches_json_renderer(self):
+        data = {"results": [{"title": "caf\u00e9 \u2028", "n": 1.5, "tags": [1, None]}],
+                "next": None, 3: "int key"}
+        for value in (data, [data, data], "text", None):
+            self.assertEqual(
+                StreamingJSONRenderer().render(value), JSONRenderer().render(value))
+        self.assertEqual(
+            StreamingJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"))
+
+    def test_small_bodies_are_sent_whole(self):
+        plain = self.client.get(self.url)
+        self.assertFalse(plain.streaming)
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        self.assertEqual(plain["Content-Type"], "application/json")
+        compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(self.body(compressed), plain.content)
+        self.assertEqual(compressed["ETag"], plain["ETag"])
+        with self.settings(STREAMING_JSON_GZIP_MIN_BYTES=len(plain.content) + 1):
+            response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_large_bodies_are_streamed(self):
+        expected = self.client.get(self.url).content
+        with self.settings(STREAMING_JSON_CHUNK_SIZE=256):
+            plain = self.client.get(self.url)
+            compressed = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+            page = self.client.get(self.url + "?pagination=cursor&page_size=4",
+                                   HTTP_ACCEPT_ENCODING="gzip")
+        self.assertTrue(plain.streaming)
+        self.assertEqual(self.body(plain), expected)
+        self.assertTrue(compressed.streaming)
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(self.body(compressed), expected)
+        self.assertEqual(len(json.loads(self.body(page))["results"]), 4)
+
+    def test_other_responses_are_untouched(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            reverse("get_post", args=[999]), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("Content-Encoding", response)
+        detail = self.client.get(
+            reverse("get_post", args=[self.posts[0].id]), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(json.loads(self.body(detail))["title"], "Post 0")
+
+
+class PerformanceMetricsTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.admin = User.objects.create_superuser(
+            username="admin", password="password123")
+        self.client.force_authenticate(self.admin)
+        self.posts = create_posts(self.admin, 2)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("get_posts"))
+        timing = dict(
+            part.split(";", 1)[0:2] for part in response["Server-Timing"].split(", "))
+        self.assertEqual(
+            set(timing), {"db", "auth", "serialize", "render", "total"})
+        self.assertIn('desc="', timing["db"])
+
+    async def test_server_timing_counts_queries_under_asgi(self):
+        token = RefreshToken.for_user(self.admin).access_token
+        for url in (reverse("get_posts"), reverse("get_post", args=[self.posts[0].id])):
+            response = await AsyncClient().get(url, headers={"Authorization": f"Bearer {token}"})
+            self.assertEqual(response.status_code, 200)
+            db = response["Server-Timing"].split(", ")[0]
+            self.assertNotIn('"0 queries"', db, url)
+
+    def test_instrumentation_is_installed_once_by_the_app(self):
+        with mock.patch("ApiDjangoRest.metrics.install_drf_instrumentation") as install:
+            PerformanceMetricsMiddleware(lambda request: None)
+        install.assert_not_called()
+        config = apps.get_app_config("principal")
+        without_metrics = [
+            middleware for middleware in settings.MIDDLEWARE
+            if not middleware.startswith("ApiDjangoRest.metrics.")
+        ]
+        with mock.patch("ApiDjangoRest.metrics.install_instrumentation") as install:
+            with self.settings(MIDDLEWARE=without_metrics):
+                config.ready()
+            install.assert_not_called()
+            config.ready()
+            install.assert_called_once_with()
+
+    def test_metrics_endpoint_exposes_route_histograms(self):
+        self.client.get(reverse("get_posts"))
+        self.client.get(reverse("get_posts"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{route="/api/posts/",method="GET"} 2', body)
+        self.assertIn("# TYPE http_request_db_queries histogram", body)
+
+    def test_metrics_endpoint_requires_admin(self):
+        self.client.force_authenticate(
+            User.objects.create_user(username="reader", password="password123"))
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+
+class ReplicaRoutingTests(APITransactionTestCase):
+    # The replica alias mirrors the test database on its own connection,
+    # which only sees committed rows.
+    databases = {"default", "replica1"}
+
+    def setUp(self):
+        cache.clear()
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(username="reader", password="password123")
+        self.other = User.objects.create_user(username="other", password="password123")
+        self.post = create_posts(self.user, 1)[0]
+
+    def authenticate(self, user):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+
+    def queries_by_alias(self, method, url, data=None):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica1"]) as replica:
+            response = getattr(self.client, method)(url, data, format="json")
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+        return len(primary.captured_queries), len(replica.captured_queries)
+
+    def test_reads_go_to_replicas_and_writes_to_primary(self):
+        self.authenticate(self.user)
+        with self.settings(DATABASE_READ_REPLICAS=["replica1"]):
+            primary, replica = self.queries_by_alias("get", reverse("get_posts"))
+            self.assertEqual(primary, 0)
+            self.assertGreater(replica, 0)
+            primary, replica = self.queries_by_alias(
+                "post", reverse("comment-create"), {"content": "New", "post": self.post.id})
+            self.assertGreater(primary, 0)
+            self.assertEqual(replica, 0)
+
+    def test_writer_stays_on_primary_for_the_sticky_window(self):
+        self.authenticate(self.user)
+        with self.settings(DATABASE_READ_REPLICAS=["replica1"]):
+            self.client.post(
+                reverse("comment-create"), {"content": "New", "post": self.post.id},
+                format="json")
+            self.assertEqual(self.queries_by_alias("get", reverse("get_posts"))[1], 0)
+            # Other users keep reading from the replicas.
+            self.authenticate(self.other)
+            self.assertEqual(self.queries_by_alias("get", reverse("get_posts"))[0], 0)
+            # Once the pin expires the writer goes back to the replicas.
+            cache.clear()
+            self.authenticate(self.user)
+            self.assertEqual(self.queries_by_alias("get", reverse("get_posts"))[0], 0)
+
+    def test_a_request_reads_from_one_replica(self):
+        admin = User.objects.create_superuser(username="admin", password="password123")
+        self.authenticate(admin)
+        # The primary doubles as a second replica, so a per-query choice
+        # would split a request's reads between the two aliases.
+        with self.settings(DATABASE_READ_REPLICAS=["replica1", "default"]):
+            for url in [reverse("get_posts"), reverse("export_posts")] * 5:
+                self.assertIn(0, self.queries_by_alias("get", url))
+
+    def test_post_detail_cache_is_filled_from_the_primary(self):
+        self.authenticate(self.other)
+        with self.settings(DATABASE_READ_REPLICAS=["replica1"]):
+            for url in (reverse("get_post", args=[self.post.id]),
+                        reverse("async-get-post", args=[self.post.id])):
+                post_detail_cache.backend.clear()
+                with CaptureQueriesContext(connections["replica1"]) as replica:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                # Only the conditional GET validators may read the replica.
+                self.assertFalse([
+                    q for q in replica.captured_queries
+                    if '"principal_post"."title"' in q["sql"]
+                    or '"principal_comment"."content"' in q["sql"]
+                ])
+
+    def test_rebuild_timelines_reads_from_the_primary(self):
+        Follow.objects.create(follower=self.other, followee=self.user)
+        with self.settings(DATABASE_READ_REPLICAS=["replica1"]):
+            with CaptureQueriesContext(connections["replica1"]) as replica:
+                call_command("rebuild_timelines", stdout=StringIO())
+        self.assertEqual(replica.captured_queries, [])
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list("user_id", "post_id")),
+            [(self.other.id, self.post.id)])
+
+    def test_without_replicas_everything_reads_from_primary(self):
+        self.authenticate(self.user)
+        primary, replica = self.queries_by_alias("get", reverse("get_posts"))
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+class SQLiteProfileTests(APITestCase):
+    def test_concurrent_profile_sets_pragmas_and_write_queue(self):
+        database = sqlite_database("app.sqlite3", "concurrent")
+        self.assertEqual(database["ENGINE"], "ApiDjangoRest.sqlite_backend")
+        self.assertIn("PRAGMA journal_mode=WAL", database["OPTIONS"]["init_command"])
+        self.assertEqual(database["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+        self.assertEqual(sqlite_database("app.sqlite3", "stock")["ENGINE"],
+                         "django.db.backends.sqlite3")
+
+
+class SQLiteWriteQueueTests(APITestCase):
+    """Two connections to one scratch file, through the concurrent profile."""
+
+    def setUp(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = directory / "queue.sqlite3"
+        self.lock = _write_lock(self.path)
+        self.options = {}
+        with self.connect() as connection, connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE item (n integer)")
+
+    @contextmanager
+    def connect(self):
+        database = sqlite_database(self.path, "concurrent")
+        # No busy-handler wait: a writer that is not queued fails at once.
+        database["OPTIONS"]["init_command"] += ";PRAGMA busy_timeout=0"
+        database["OPTIONS"].update(self.options)
+        settings_dict = ConnectionHandler({"default": database}).settings["default"]
+        connection = DatabaseWrapper(settings_dict, alias="write_queue")
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextmanager
+    def atomic(self, connection):
+        # What transaction.atomic() does, for a connection outside DATABASES.
+        connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            yield
+        except BaseException:
+            connection.rollback()
+            raise
+        else:
+            connection.commit()
+        finally:
+            connection.set_autocommit(True)
+
+    def insert(self, connection, n):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO item (n) VALUES (%s)", [n])
+
+    def items(self):
+        with self.connect() as connection, connection.cursor() as cursor:
+            cursor.execute("SELECT n FROM item ORDER BY n")
+            return [row[0] for row in cursor.fetchall()]
+
+    def write_while_held(self, write, hold=0.2):
+        """Run ``write(connection)`` in a second thread while a first one holds a transaction."""
+        held, outcome = threading.Event(), {}
+
+        def second_writer():
+            held.wait()
+            try:
+                with self.connect() as connection:
+                    write(connection)
+            except OperationalError as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=second_writer)
+        thread.start()
+        with self.connect() as connection, self.atomic(connection):
+            self.insert(connection, 1)
+            held.set()
+            time.sleep(hold)
+        thread.join()
+        return outcome.get("error")
+
+    def test_lock_is_released_on_commit_rollback_and_close(self):
+        with self.connect() as connection:
+            with self.atomic(connection):
+                self.insert(connection, 1)
+                self.assertTrue(self.lock.locked())
+            self.assertFalse(self.lock.locked())
+
+            with self.assertRaises(ValueError), self.atomic(connection):
+                self.insert(connection, 2)
+                self.assertTrue(self.lock.locked())
+                raise ValueError
+            self.assertFalse(self.lock.locked())
+
+            connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            self.insert(connection, 3)
+            self.assertTrue(self.lock.locked())
+        self.assertFalse(self.lock.locked())
+        self.assertEqual(self.items(), [1])
+
+    def test_autocommit_writes_wait_for_the_writer(self):
+        self.assertIsNone(self.write_while_held(lambda connection: self.insert(connection, 2)))
+        self.assertFalse(self.lock.locked())
+        self.assertEqual(self.items(), [1, 2])
+
+        self.options = {"serialize_writes": False, "write_retries": 0}
+        error = self.write_while_held(lambda connection: self.insert(connection, 3))
+        self.assertIn("locked", str(error))
+
+    def test_locked_writes_are_retried(self):
+        self.options = {"serialize_writes": False, "write_retries": 5, "write_retry_delay": 0.05}
+
+        def write_in_transaction(connection):
+            with self.atomic(connection):
+                self.insert(connection, 3)
+
+        with mock.patch("ApiDjangoRest.sqlite_backend.base.time") as backend_time:
+            backend_time.sleep.side_effect = time.sleep
+            self.assertIsNone(self.write_while_held(lambda connection: self.insert(connection, 2)))
+            self.assertIsNone(self.write_while_held(write_in_transaction))
+        self.assertGreaterEqual(backend_time.sleep.call_count, 2)
+        self.assertEqual(self.items(), [1, 1, 2, 3])
+
+class QueryPlanTests(QueryPlanAssertions, APITestCase):
+    # Whole-table reads that are the point of the endpoint: the unfiltered
+    # list and export queries, and the list's conditional-GET validators.
+    POST_LIST_SCAN = (
+        r'^SELECT "principal_post"\."id", (?!.*\b(WHERE|LIMIT)\b)', "SCAN principal_post")
+    VALIDATORS_SCAN = (
+        r'^SELECT COUNT\(DISTINCT "principal_post"\."id"\) AS "n_posts", (?!.*\bWHERE\b)',
+        "SCAN principal_post")
+    FULL_POST_SCAN = (POST_LIST_SCAN, VALIDATORS_SCAN)
+    # bm25 ranking has to sort the matches.
+    BM25_SORT = (r"ORDER BY bm25\(principal_post_fts\)", "USE TEMP B-TREE FOR ORDER BY")
+
+    def setUp(self):
+        post_detail_cache.backend.clear()
+        self.user = User.objects.create_user(username="reader", password="password123")
+        self.other = User.objects.create_user(username="other", password="password123")
+        self.admin = User.objects.create_superuser(username="admin", password="password123")
+        self.posts = create_posts(self.user, 5, comments_per_post=3)
+        create_posts(self.other, 5, comments_per_post=3)
+        self.post = self.posts[0]
+        self.comment = self.post.comments.first()
+        self.client.force_authenticate(self.user)
+
+    def test_post_reads(self):
+        posts = reverse("get_posts")
+        self.assert_indexed("get", posts, allow=self.FULL_POST_SCAN)
+        self.assert_indexed("get", posts + "?view=summary", allow=self.FULL_POST_SCAN)
+        self.assert_indexed("get", posts + f"?author={self.user.id}")
+        self.assert_indexed("get", posts + f"?author={self.user.id}&pagination=cursor&page_size=2")
+        self.assert_indexed("get", posts + "?pagination=cursor&page_size=2")
+        self.assert_indexed("get", reverse("get_post", args=[self.post.id]))
+        comments = reverse("post-comments", args=[self.post.id]) + "?page_size=1"
+        self.assert_indexed("get", comments)
+        self.assert_indexed("get", self.client.get(comments).data["next"])
+        self.assert_indexed(
+            "get", reverse("search_posts") + "?q=content", allow=(self.BM25_SORT,))
+
+    def test_fast_serializer_reads(self):
+        with self.settings(FAST_READ_SERIALIZERS=True):
+            self.assert_indexed("get", reverse("get_posts"), allow=self.FULL_POST_SCAN)
+            self.assert_indexed("get", reverse("get_post", args=[self.post.id]))
+
+    def test_export(self):
+        self.client.force_authenticate(self.admin)
+        for output in ("ndjson", "csv"):
+            self.assert_indexed(
+                "get", reverse("export_posts") + f"?output={output}",
+                allow=(self.POST_LIST_SCAN,))
+
+    def test_writes(self):
+        self.assert_indexed("post", reverse("post"), {"title": "New", "content": "New"})
+        self.assert_indexed(
+            "put", reverse("update_post", args=[self.post.id]),
+            {"title": "Edited", "content": "Edited"})
+        self.assert_indexed(
+            "post", reverse("comment-create"), {"content": "New", "post": self.post.id})
+        self.assert_indexed(
+            "post", reverse("comment-bulk-create"),
+            {"comments": [{"content": "Bulk", "post": self.post.id}] * 3}, format="json")
+        self.assert_indexed(
+            "put", reverse("comment-update", args=[self.comment.id]), {"content": "Edited"})
+        self.assert_indexed("delete", reverse("comment-delete", args=[self.comment.id]))
+        self.assert_indexed(
+            "post", reverse("post-import"),
+            '{"title": "Imported", "content": "Imported"}\n',
+            content_type="application/x-ndjson")
+        self.assert_indexed("delete", reverse("delete_post", args=[self.posts[1].id]))
+
+    def test_harness_flags_unindexed_queries(self):
+        with QueryPlanCapture(connection) as ctx:
+            list(Comment.objects.filter(content="missing"))
+            list(Post.objects.order_by("title")[:5])
+        details = [detail for _, detail in ctx.problems()]
+        self.assertIn("SCAN principal_comment", details)
+        self.assertIn("USE TEMP B-TREE FOR ORDER BY", details)
+
+    def test_allowances_only_cover_their_own_sql(self):
+        with QueryPlanCapture(connection) as ctx:
+            list(Post.objects.select_related("author"))
+            list(Post.objects.select_related("author").filter(title="missing"))
+        problems = ctx.problems(self.FULL_POST_SCAN)
+        self.assertEqual([detail for _, detail in problems], ["SCAN principal_post"])
+        self.assertIn("WHERE", problems[0][0])
+
+
+@override_settings(FEED_FANOUT_BATCH_SIZE=2, FEED_BACKFILL_POSTS=2)
+class FeedTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader", password="password123")
+        self.author = User.objects.create_user(username="author", password="password123")
+        self.other = User.objects.create_user(username="other", password="password123")
+        self.client.force_authenticate(self.reader)
+
+    def follow(self, user, followee):
+        self.client.force_authenticate(user)
+        response = self.client.post(reverse("user-follow", args=[followee.id]))
+        self.client.force_authenticate(self.reader)
+        return response
+
+    def publish(self, author, title):
+        self.client.force_authenticate(author)
+        response = self.client.post(reverse("post"), {"title": title, "content": title})
+        self.client.force_authenticate(self.reader)
+        self.assertEqual(response.status_code, 201)
+        return response.data["id"]
+
+    def feed_titles(self, query="?page_size=2"):
+        titles, url = [], reverse("feed") + query
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            titles.extend(post["title"] for post in response.data["results"])
+            url = response.data["next"]
+        return titles
+
+    def test_follow_and_unfollow(self):
+        url = reverse("user-follow", args=[self.author.id])
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(FeedAuthor.objects.get(user=self.author).follower_count, 1)
+        self.assertEqual(
+            self.client.post(reverse("user-follow", args=[self.reader.id])).status_code, 400)
+        self.assertEqual(
+            self.client.post(reverse("user-follow", args=[999])).status_code, 404)
+        self.assertEqual(self.client.delete(url).status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(FeedAuthor.objects.get(user=self.author).follower_count, 0)
+
+    def test_follow_backfills_and_unfollow_removes_posts(self):
+        create_posts(self.author, 3, comments_per_post=0)
+        self.follow(self.reader, self.author)
+        self.assertEqual(self.feed_titles(), ["Post 2", "Post 1"])
+        self.client.delete(reverse("user-follow", args=[self.author.id]))
+        self.assertEqual(self.feed_titles(), [])
+
+    def test_new_posts_fan_out_in_batches(self):
+        followers = [
+            User.objects.create_user(username=f"follower{i}", password="password123")
+            for i in range(5)
+        ]
+        for follower in followers:
+            self.follow(follower, self.author)
+        with CaptureQueriesContext(connection) as ctx:
+            post_id = self.publish(self.author, "Fanned out")
+        inserts = [q for q in ctx.captured_queries
+                   if q["sql"].startswith('INSERT OR IGNORE INTO "principal_timelineentry"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(post_id=post_id).values_list("user_id", flat=True)),
+            {follower.id for follower in followers})
+
+    def test_failed_fan_out_rolls_back_the_post(self):
+        self.follow(self.reader, self.author)
+        serializer = PostSerializer(data={"title": "Lost", "content": "Lost"})
+        with mock.patch.object(FeedRepository, "fan_out", side_effect=DatabaseError("down")):
+            with self.assertRaises(ValueError):
+                PostRepository.create_post(serializer, self.author)
+        self.assertFalse(Post.objects.filter(title="Lost").exists())
+
+    def test_feed_pages_merge_authors_newest_first(self):
+        self.follow(self.reader, self.author)
+        self.follow(self.reader, self.other)
+        for i in range(3):
+            self.publish(self.author, f"A{i}")
+            self.publish(self.other, f"O{i}")
+        self.publish(self.reader, "Own post")
+        self.assertEqual(self.feed_titles(), ["O2", "A2", "O1", "A1", "O0", "A0"])
+        # Timestamp ties are ordered by post id.
+        TimelineEntry.objects.filter(user=self.reader).update(
+            created_at=TimelineEntry.objects.filter(user=self.reader).first().created_at)
+        self.assertEqual(self.feed_titles("?page_size=4"), ["O2", "A2", "O1", "A1", "O0", "A0"])
+
+    def test_feed_read_is_one_range_scan(self):
+        self.follow(self.reader, self.author)
+        for i in range(4):
+            self.publish(self.author, f"A{i}")
+        url = self.client.get(reverse("feed") + "?page_size=2").data["next"]
+        with QueryPlanCapture(connection) as ctx:
+            response = self.client.get(url)
+        # Timeline page, then the (empty) fan-out-on-read followees.
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(ctx.problems(), [])
+        self.assertEqual([p["title"] for p in response.data["results"]], ["A1", "A0"])
+
+    @override_settings(FEED_FANOUT_ON_READ_FOLLOWERS=2)
+    def test_popular_authors_are_merged_on_read(self):
+        self.follow(self.reader, self.author)
+        self.publish(self.author, "Before")
+        self.follow(self.other, self.author)
+        self.assertTrue(FeedAuthor.objects.get(user=self.author).fanout_on_read)
+        post_id = self.publish(self.author, "After")
+        self.assertFalse(TimelineEntry.objects.filter(post_id=post_id).exists())
+        self.assertEqual(self.feed_titles("?page_size=1"), ["After", "Before"])
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.feed_titles(), ["After", "Before"])
+        with QueryPlanCapture(connection) as ctx:
+            self.client.get(reverse("feed"))
+        # Several authors' index ranges have to be sorted together.
+        merged_posts = (r'FROM "principal_post" .*WHERE "principal_post"\."author_id" IN \(',
+                        "USE TEMP B-TREE FOR ORDER BY")
+        self.assertEqual(ctx.problems(allow=(merged_posts,)), [])
+
+    def test_deleted_posts_leave_feeds_and_bad_cursor(self):
+        self.follow(self.reader, self.author)
+        post_id = self.publish(self.author, "Gone")
+        Post.objects.filter(pk=post_id).delete()
+        self.assertEqual(self.feed_titles(), [])
+        response = self.client.get(reverse("feed") + "?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"message": "Invalid cursor"})
@@ -4,19 +4,38 @@ from .views import (
     UpdatePostView,
     DeletePostView,
     GetPostView,
+    PostCommentsView,
     CommentCreateView,
     CommentDeleteView,
     CommentUpdateView,
+    PostCacheStatsView,
+    PostSearchView,
+    CommentBulkCreateView,
+    PostImportView,
+    PostExportView,
+    FollowView,
+    FeedView,
 )
 from django.urls import path
+from . import async_views
 
 urlpatterns = [
     path("post/", NewPostView.as_view(), name="post"),
+    path("post/import/", PostImportView.as_view(), name="post-import"),
     path("posts/", PostGetAllView.as_view(), name="get_posts"),
+    path("posts/export/", PostExportView.as_view(), name="export_posts"),
+    path("posts/search/", PostSearchView.as_view(), name="search_posts"),
     path("post/<int:pk>/", UpdatePostView.as_view(), name="update_post"),
     path("post/<int:pk>/delete/", DeletePostView.as_view(), name="delete_post"),
     path("post/<int:pk>/get/", GetPostView.as_view(), name="get_post"),
+    path("post/<int:pk>/comments/", PostCommentsView.as_view(), name="post-comments"),
+    path("async/posts/", async_views.get_posts, name="async-get-posts"),
+    path("async/post/<int:pk>/get/", async_views.get_post, name="async-get-post"),
+    path("post/cache/stats/", PostCacheStatsView.as_view(), name="post_cache_stats"),
+    path("feed/", FeedView.as_view(), name="feed"),
+    path("users/<int:pk>/follow/", FollowView.as_view(), name="user-follow"),
     path("comment/", CommentCreateView.as_view(), name="comment-create"),
+    path("comment/bulk/", CommentBulkCreateView.as_view(), name="comment-bulk-create"),
     path("comment/<int:pk>/", CommentUpdateView.as_view(), name="comment-update"),
     path("comment/<int:pk>/delete/",
          CommentDeleteView.as_view(), name="comment-delete"),
@@ -4,9 +4,9 @@ from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.permissions import BasePermission
+from rest_framework.permissions import BasePermission, IsAdminUser
 from .models import Post, Comment
-from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
+from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse, OpenApiParameter
 from .serializers import (
     CommentUpdateSerializer,
     PostSerializer,
@@ -14,26 +14,159 @@ from .serializers import (
     CommentSerializer,
     CommentSerializerResponse,
     PostWithCommentsSerializerResponse,
+    PostDetailSerializerResponse,
+    PostSummarySerializerResponse,
+    PostSearchSerializerResponse,
+    CommentBulkSerializer,
+    CommentBulkResponseSerializer,
+    PostImportReportSerializer,
+    FeedResponseSerializer,
 )
 from .repositories.post_repository import PostRepository
 from .repositories.comment_repository import CommentRepository
+from .repositories.feed_repository import FeedRepository
+from .cache import post_detail_cache
+from .search import search_posts
+from .importers import import_posts_ndjson
+from .exporters import EXPORT_FORMATS, iter_posts_with_comments
+from .fast_serializers import COMMENT_PLAN, FAST_PLANS, fast_serializers_enabled
+from ApiDjangoRest.streaming import StreamingJSONMixin
+from .fieldsets import FIELDSET_PARAMETERS, SparseFieldsMixin, requested_fields
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from rest_framework.utils.urls import replace_query_param
+from .conditional import (
+    not_modified_response,
+    page_validators,
+    post_validators,
+    set_validators,
+    with_validator_fields,
+)
 from rest_framework.pagination import PageNumberPagination
+from .pagination import CommentCursorPagination, PostCursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
 
 
-class PostGetAllView(ListAPIView):
+def embed_comments_link(request, data):
+    # Cached details carry a relative link; answer with an absolute one like
+    # the `next`/`previous` links of the paginated endpoints.
+    if data.get("comments_next"):
+        data = {**data, "comments_next": request.build_absolute_uri(data["comments_next"])}
+    return data
+
+
+class PostGetAllView(StreamingJSONMixin, SparseFieldsMixin, ListAPIView):
     permission_classes = [IsAuthenticated]
-    queryset = Post.objects.all()
+    authenticate_from_claims = True
     serializer_class = PostWithCommentsSerializerResponse
     pagination_class = PageNumberPagination
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = ['author']
     search_fields = ['author__username']
 
+    def is_summary(self):
+        return self.request.query_params.get("view") == "summary"
+
+    def is_cursor(self):
+        return self.request.query_params.get("pagination") == "cursor"
+
+    def get_plan(self):
+        # Page rows are matched back to the paginated ids, selected or not.
+        return FAST_PLANS[self.get_serializer_class()].subset(
+            self.requested_fields(), required=("id",))
+
+    def get_queryset(self):
+        if self.requested_fields() is not None:
+            return PostRepository.posts_with_fields(self.get_plan())
+        if self.is_summary():
+            return PostRepository.post_summaries()
+        return PostRepository.posts_with_comments()
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return PostSummarySerializerResponse
+        return PostWithCommentsSerializerResponse
+
+    def page_rows(self, rows, page):
+        """The full ``rows`` of the posts in ``page``, in page order."""
+        ids = [item["id"] for item in page]
+        by_id = {
+            row["id"] if isinstance(row, dict) else row.pk: row
+            for row in rows.filter(pk__in=ids)
+        }
+        return [by_id[pk] for pk in ids if pk in by_id]
+
+    def serialize(self, items):
+        return self.get_serializer(items, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        """Answer 304 before any post or comment is loaded in full.
+
+        The unpaginated list reads every post anyway, so its validators
+        aggregate over the filtered table. A cursor page is first paginated
+        over its ids, timestamps and comment counts, validated from those
+        rows and its links, and only then fetched and rendered, keeping the
+        cost of a page constant.
+        """
+        if fast_serializers_enabled():
+            plan = self.get_plan()
+            rows = plan.values(self.filter_queryset(Post.objects.all()))
+            render = plan.render
+        else:
+            rows = self.filter_queryset(self.get_queryset())
+            render = self.serialize
+        page = self.paginate_queryset(
+            with_validator_fields(self.filter_queryset(Post.objects.all())))
+        if page is None:
+            etag, last_modified = post_validators(self.filter_queryset(Post.objects.all()))
+        else:
+            etag, last_modified = page_validators(
+                page, self.paginator.get_next_link(), self.paginator.get_previous_link())
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        if page is not None:
+            response = self.get_paginated_response(render(self.page_rows(rows, page)))
+        else:
+            response = Response(render(rows))
+        return set_validators(response, etag, last_modified)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.is_cursor():
+                self._paginator = PostCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     @extend_schema(
         tags=["Blog"],
         summary="Get all posts",
+        parameters=[
+            OpenApiParameter(
+                name="view",
+                description="Use `summary` to return comment counts and an excerpt instead of full comments",
+                required=False,
+                type=str,
+                enum=["summary"],
+            ),
+            OpenApiParameter(
+                name="pagination",
+                description="Use `cursor` for keyset pagination ordered by creation date",
+                required=False,
+                type=str,
+                enum=["cursor"],
+            ),
+            OpenApiParameter(
+                name="cursor",
+                description="Opaque cursor returned in `next`/`previous` when `pagination=cursor`",
+                required=False,
+                type=str,
+            ),
+            *FIELDSET_PARAMETERS,
+        ],
         responses={
             200: OpenApiResponse(
                 description="Posts retrieved successfully",
@@ -52,13 +185,59 @@ class PostGetAllView(ListAPIView):
                         },
                     )
                 ],
-            )
+            ),
+            304: OpenApiResponse(description="Posts not modified since the given validators"),
         },
     )
     def get(self, request):
+        self.requested_fields()  # Reject unknown fields before any query.
         return super().get(request)
 
 
+class PostExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="Export all posts with their comments",
+        parameters=[
+            OpenApiParameter(
+                name="output",
+                description="Export format",
+                required=False,
+                type=str,
+                enum=sorted(EXPORT_FORMATS),
+                default="ndjson",
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="Streamed export, one post per NDJSON line or CSV rows per post and comment"
+            ),
+            400: OpenApiResponse(
+                description="Bad request",
+                examples=[
+                    OpenApiExample(
+                        "Response Example", value={"message": "Unsupported output format"}
+                    )
+                ],
+            ),
+        },
+    )
+    def get(self, request):
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"message": "Unsupported output format"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        to_lines, content_type = EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(
+            to_lines(iter_posts_with_comments()), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="posts.{output}"'
+        return response
+
+
 class NewPostView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -108,6 +287,65 @@ class NewPostView(APIView):
             return Response(post_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PostImportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="Import posts from newline-delimited JSON",
+        description=(
+            "The body is read line by line (`application/x-ndjson`), each line being "
+            '`{"title": ..., "content": ...}`. Posts are written in chunks and '
+            "owned by the authenticated user."
+        ),
+        request={"application/x-ndjson": {"type": "string", "format": "binary"}},
+        parameters=[
+            OpenApiParameter(
+                name="chunk_size",
+                description="Rows per bulk insert (1-5000, default 500)",
+                required=False,
+                type=int,
+            ),
+        ],
+        responses={
+            201: OpenApiResponse(
+                description="At least one post was imported",
+                response=PostImportReportSerializer,
+                examples=[
+                    OpenApiExample(
+                        "Response Example",
+                        value={
+                            "lines": 3,
+                            "imported": 2,
+                            "failed": 1,
+                            "errors": [
+                                {"line": 2, "errors": {"title": ["This field is required."]}}
+                            ],
+                        },
+                    )
+                ],
+            ),
+            400: OpenApiResponse(
+                description="No post was imported",
+                response=PostImportReportSerializer,
+            ),
+        },
+    )
+    def post(self, request):
+        try:
+            chunk_size = min(max(int(request.query_params.get("chunk_size", 500)), 1), 5000)
+        except ValueError:
+            return Response(
+                {"message": "chunk_size must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        report = import_posts_ndjson(request.stream or [], request.user, chunk_size)
+        return Response(
+            report.as_dict(),
+            status=status.HTTP_201_CREATED if report.imported else status.HTTP_400_BAD_REQUEST,
+        )
+
+
 class UpdatePostView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -189,7 +427,7 @@ class DeletePostView(APIView):
     def delete(self, request, pk):
         post = Post.objects.get(pk=pk)
         if post.author == request.user:
-            post.delete()
+            PostRepository.delete_post(post)
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             return Response(
@@ -198,16 +436,18 @@ class DeletePostView(APIView):
             )
 
 
-class GetPostView(APIView):
+class GetPostView(StreamingJSONMixin, APIView):
     permission_classes = [IsAuthenticated]
+    authenticate_from_claims = True
 
     @extend_schema(
         tags=["Blog"],
         summary="Get a post",
+        parameters=FIELDSET_PARAMETERS,
         responses={
             200: OpenApiResponse(
                 description="Post retrieved successfully",
-                response=PostWithCommentsSerializerResponse,
+                response=PostDetailSerializerResponse,
                 examples=[
                     OpenApiExample(
                         "Response Example",
@@ -228,10 +468,12 @@ class GetPostView(APIView):
                                     "updated_at": "2021-07-16T15:30:00",
                                 }
                             ],
+                            "comments_next": "http://localhost:8000/api/post/1/comments/?cursor=cD0yMDIx",
                         },
                     )
                 ],
             ),
+            304: OpenApiResponse(description="Post not modified since the given validators"),
             404: OpenApiResponse(
                 description="Post not found",
                 examples=[
@@ -243,16 +485,89 @@ class GetPostView(APIView):
         },
     )
     def get(self, request, pk):
+        fields = requested_fields(request.query_params, PostDetailSerializerResponse)
+        etag, last_modified = post_validators(Post.objects.filter(pk=pk))
+        if etag is None:
+            # No row: never answer from a cache entry the post outlived.
+            return Response({"message": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+        not_modified = not_modified_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
         try:
-            post = Post.objects.get(pk=pk)
-            response_serializer = PostWithCommentsSerializerResponse(post)
-            return Response(response_serializer.data, status=status.HTTP_200_OK)
+            data = embed_comments_link(request, PostRepository.get_post_detail(pk, fields))
+            return set_validators(
+                Response(data, status=status.HTTP_200_OK), etag, last_modified)
         except Post.DoesNotExist:
             return Response(
                 {"message": "Post not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
 
+class PostCommentsView(StreamingJSONMixin, SparseFieldsMixin, ListAPIView):
+    permission_classes = [IsAuthenticated]
+    authenticate_from_claims = True
+    serializer_class = CommentSerializerResponse
+    pagination_class = CommentCursorPagination
+
+    def get_plan(self):
+        # The cursor position is read from created_at, selected or not.
+        return COMMENT_PLAN.subset(self.requested_fields(), required=("created_at",))
+
+    def get_queryset(self):
+        queryset = CommentRepository.comments_for_post(self.kwargs["pk"])
+        if self.requested_fields() is not None:
+            queryset = queryset.only(*self.get_plan().lookups)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not fast_serializers_enabled():
+            return super().list(request, *args, **kwargs)
+        plan = self.get_plan()
+        page = self.paginate_queryset(plan.values(self.get_queryset()))
+        return self.get_paginated_response([plan.render_row(row) for row in page])
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="List the comments of a post",
+        parameters=[
+            OpenApiParameter(
+                name="cursor",
+                description="Opaque cursor from `next`/`previous`, or from `comments_next` of the post detail",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="page_size",
+                description="Comments per page (at most 100)",
+                required=False,
+                type=int,
+            ),
+            *FIELDSET_PARAMETERS,
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="Comments retrieved successfully, oldest first",
+                response=CommentSerializerResponse(many=True),
+            ),
+            404: OpenApiResponse(
+                description="Post not found",
+                examples=[
+                    OpenApiExample(
+                        "Response Example", value={"message": "Post not found"}
+                    )
+                ],
+            ),
+        },
+    )
+    def get(self, request, pk):
+        self.requested_fields()  # Reject unknown fields before any query.
+        if not Post.objects.filter(pk=pk).exists():
+            return Response(
+                {"message": "Post not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return super().get(request, pk)
+
+
 class CommentCreateView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -300,6 +615,54 @@ class CommentCreateView(APIView):
             return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CommentBulkCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="Create comments in bulk",
+        request=CommentBulkSerializer,
+        responses={
+            201: OpenApiResponse(
+                description="At least one comment was created",
+                response=CommentBulkResponseSerializer,
+                examples=[
+                    OpenApiExample(
+                        "Response Example",
+                        value={
+                            "created": 1,
+                            "failed": 1,
+                            "results": [
+                                {"index": 0, "status": "created", "id": 10},
+                                {
+                                    "index": 1,
+                                    "status": "error",
+                                    "errors": {"post": ["Post does not exist"]},
+                                },
+                            ],
+                        },
+                    )
+                ],
+            ),
+            400: OpenApiResponse(
+                description="No comment was created",
+                response=CommentBulkResponseSerializer,
+            ),
+        },
+    )
+    def post(self, request):
+        bulk_serializer = CommentBulkSerializer(data=request.data)
+        if not bulk_serializer.is_valid():
+            return Response(bulk_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        results = CommentRepository.bulk_create_comments(
+            bulk_serializer.validated_data["comments"], request.user)
+        created = sum(1 for result in results if result["status"] == "created")
+        return Response(
+            {"created": created, "failed": len(results) - created, "results": results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+
 class CommentUpdateView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -372,3 +735,229 @@ class CommentDeleteView(APIView):
             return Response({"message": "Comment deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
         except ValueError as e:
             return Response({"message": str(e)}, status=status.HTTP_403_FORBIDDEN)
+
+
+class PostCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="Post detail cache hit/miss counters",
+        responses={
+            200: OpenApiResponse(
+                description="Counters for the current process",
+                examples=[
+                    OpenApiExample(
+                        "Response Example", value={"hits": 120, "misses": 15}
+                    )
+                ],
+            ),
+        },
+    )
+    def get(self, request):
+        return Response(post_detail_cache.stats(), status=status.HTTP_200_OK)
+
+
+class PostSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+    authenticate_from_claims = True
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="Full-text search over post titles and content",
+        parameters=[
+            OpenApiParameter(
+                name="q", description="Search terms", required=True, type=str
+            ),
+            OpenApiParameter(
+                name="limit",
+                description="Maximum number of results (1-100, default 20)",
+                required=False,
+                type=int,
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="Posts ordered by relevance",
+                response=PostSearchSerializerResponse(many=True),
+                examples=[
+                    OpenApiExample(
+                        "Response Example",
+                        value=[
+                            {
+                                "id": 1,
+                                "title": "Post title",
+                                "excerpt": "Post content",
+                                "author_username": "user123",
+                                "comment_count": 0,
+                                "last_comment_at": None,
+                                "created_at": "2021-07-16T15:00:00",
+                                "updated_at": "2021-07-16T15:00:00",
+                                "rank": -1.25,
+                                "snippet": "Post <mark>content</mark>",
+                            }
+                        ],
+                    )
+                ],
+            ),
+            400: OpenApiResponse(
+                description="Bad request",
+                examples=[
+                    OpenApiExample(
+                        "Response Example", value={"message": "q is required"}
+                    )
+                ],
+            ),
+        },
+    )
+    def get(self, request):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"message": "q is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+        except ValueError:
+            return Response(
+                {"message": "limit must be an integer"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = []
+        for post, rank, snippet in search_posts(query, limit):
+            post.rank = rank
+            post.snippet = snippet
+            results.append(post)
+        serializer = PostSearchSerializerResponse(results, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class FollowView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_followee(self, request, pk):
+        if pk == request.user.pk:
+            return None, Response(
+                {"message": "You cannot follow yourself"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            return User.objects.get(pk=pk), None
+        except User.DoesNotExist:
+            return None, Response(
+                {"message": "User not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="Follow a user",
+        request=None,
+        responses={
+            201: OpenApiResponse(
+                description="Now following the user; their recent posts join your feed",
+                examples=[
+                    OpenApiExample(
+                        "Response Example", value={"message": "You are now following user123"}
+                    )
+                ],
+            ),
+            200: OpenApiResponse(description="Already following the user"),
+            400: OpenApiResponse(description="Cannot follow yourself"),
+            404: OpenApiResponse(description="User not found"),
+        },
+    )
+    def post(self, request, pk):
+        followee, error = self.get_followee(request, pk)
+        if error:
+            return error
+        created = FeedRepository.follow(request.user, followee)
+        return Response(
+            {"message": f"You are now following {followee.username}"},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="Unfollow a user",
+        responses={
+            200: OpenApiResponse(
+                description="Unfollowed; their posts leave your feed",
+                examples=[
+                    OpenApiExample(
+                        "Response Example", value={"message": "You unfollowed user123"}
+                    )
+                ],
+            ),
+            404: OpenApiResponse(description="User not found or not followed"),
+        },
+    )
+    def delete(self, request, pk):
+        followee, error = self.get_followee(request, pk)
+        if error:
+            return error
+        if not FeedRepository.unfollow(request.user, followee):
+            return Response(
+                {"message": "You are not following this user"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(
+            {"message": f"You unfollowed {followee.username}"}, status=status.HTTP_200_OK
+        )
+
+
+class FeedView(StreamingJSONMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    authenticate_from_claims = True
+    page_size = 20
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        value = request.query_params.get("page_size", "")
+        if value.isdigit() and int(value) > 0:
+            return min(int(value), self.max_page_size)
+        return self.page_size
+
+    @extend_schema(
+        tags=["Blog"],
+        summary="Home feed: posts of the users you follow, newest first",
+        parameters=[
+            OpenApiParameter(
+                name="cursor",
+                description="Opaque cursor returned in `next`",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="page_size",
+                description="Posts per page (at most 100)",
+                required=False,
+                type=int,
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="Feed page retrieved successfully",
+                response=FeedResponseSerializer,
+            ),
+            400: OpenApiResponse(
+                description="Invalid cursor",
+                examples=[
+                    OpenApiExample(
+                        "Response Example", value={"message": "Invalid cursor"}
+                    )
+                ],
+            ),
+        },
+    )
+    def get(self, request):
+        try:
+            posts, cursor = FeedRepository.feed_page(
+                request.user.pk, request.query_params.get("cursor"), self.get_page_size(request))
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        next_url = (
+            replace_query_param(request.build_absolute_uri(), "cursor", cursor)
+            if cursor else None)
+        return Response(
+            {"next": next_url, "results": PostSummarySerializerResponse(posts, many=True).data},
+            status=status.HTTP_200_OK,
+        )